@@ -0,0 +1,283 @@
+# analysis.py
+# Statistische Auswertungen ohne Streamlit-Abhängigkeit (nutzbar in UI und cli.py)
+import pandas as pd
+import numpy as np
+import json
+import os
+from profiling import profiled, span
+from config import SPORT_PROGRESSION_METRICS, CACHE_DIR, PHASE_STATS_CACHE_FILE, ensure_directories
+from database import derived_versions
+from snapshot import UNSAVED, current_snapshot
+
+# --- Kernmetriken für den Phasenvergleich (Spalte, Titel, Einheit) ---
+PHASE_COMPARISON_METRICS = [
+    # Schlaf & Regeneration
+    ("sleep_hours", "Schlafdauer", "h"),
+    ("sleep_score", "Schlafqualität", "Score"),
+    ("hrv_sleep_avg", "HRV (Schlaf Ø)", "ms"),
+    ("rhr_sleep_avg", "Ruhepuls (Schlaf Ø)", "bpm"),
+    ("spo2_sleep_avg", "SpO₂ (Schlaf Ø)", "%"),
+    ("deep_sleep_percent", "Tiefschlaf (%)", "%"),
+    ("awakenings", "Aufwachhäufigkeit", "Anz."),
+
+    # Aktivität & Energie
+    ("total_steps", "Gesamtschritte", "Anz."),
+    ("total_kcal_burn", "Kalorienverbrauch", "kcal"),
+    ("intake_kcal", "Kalorienaufnahme", "kcal"),
+    ("energy_balance", "Energiebilanz (Aufnahme–Verbrauch)", "kcal"),
+
+    # Makros & Wasser (wie im Analyse-Tab)
+    ("protein_g_per_kg", "Protein (g/kg Körpergewicht)", "g/kg"),
+    ("protein_g", "Protein gesamt", "g"),
+    ("carbs_g", "Kohlenhydrate", "g"),
+    ("fat_g", "Fette", "g"),
+    ("water_ml", "Wasseraufnahme", "ml"),
+
+    # Körper & Kreislauf
+    ("body_weight", "Körpergewicht", "kg"),
+    ("bp_sys", "Blutdruck systolisch", "mmHg"),
+    ("bp_dia", "Blutdruck diastolisch", "mmHg"),
+
+    # Wohlbefinden (einzeln)
+    ("energy", "Energielevel", "Score (1–10)"),
+    ("mood", "Stimmung", "Score (1–10)"),
+    ("motivation", "Motivation", "Score (1–10)"),
+    ("concentration", "Konzentration", "Score (1–10)"),
+
+    # Stress
+    ("stress_avg", "Stress-Ø", "Score (0–100)"),
+    ("stress_peak", "Stress-Spitzenwert", "Score (0–100)")
+]
+
+# --- Tageswerte im Vorfeld von Blut-/Sporttests (Spalte, Titel, Einheit) ---
+TEST_CONTEXT_METRICS = [
+    ("protein_g_per_kg", "Protein", "g/kg"),
+    ("intake_kcal", "Kalorienaufnahme", "kcal"),
+    ("energy_balance", "Energiebilanz", "kcal"),
+    ("hrv_sleep_avg", "HRV (Schlaf Ø)", "ms"),
+    ("rhr_sleep_avg", "Ruhepuls (Schlaf Ø)", "bpm"),
+    ("sleep_hours", "Schlafdauer", "h"),
+]
+TEST_CONTEXT_WINDOWS = (7, 28)
+
+@profiled
+def perform_statistical_tests(df, metric):
+    """Führt statistische Tests zwischen den Phasen durch und gibt die Ergebnisse zurück."""
+    # scipy erst bei der ersten Auswertung laden (spart Importzeit beim Kaltstart)
+    from scipy import stats
+
+    omnivor_df = df[df['phase'] == 'Omnivor'][metric].dropna()
+    vegan_df = df[df['phase'] == 'Vegan'][metric].dropna()
+
+    if omnivor_df.empty or vegan_df.empty:
+        return None
+
+    # Normalverteilung prüfen (Shapiro-Wilk-Test)
+    with span("stats.shapiro"):
+        omnivor_normal = stats.shapiro(omnivor_df)
+        vegan_normal = stats.shapiro(vegan_df)
+
+    # Je nach Normalverteilung den passenden Test auswählen
+    if omnivor_normal.pvalue > 0.05 and vegan_normal.pvalue > 0.05:
+        # Beide Stichproben normalverteilt -> t-Test
+        with span("stats.ttest_ind"):
+            test_result = stats.ttest_ind(omnivor_df, vegan_df)
+        test_name = "t-Test (unabhängige Stichproben)"
+    else:
+        # Mindestens eine Stichprobe nicht normalverteilt -> Mann-Whitney-U-Test
+        with span("stats.mannwhitneyu"):
+            test_result = stats.mannwhitneyu(omnivor_df, vegan_df, alternative='two-sided')
+        test_name = "Mann-Whitney-U-Test"
+
+    # Effektstärke berechnen (Cohen's d für t-Test, r für Mann-Whitney-U)
+    if test_name == "t-Test (unabhängige Stichproben)":
+        # Cohen's d
+        pooled_std = np.sqrt(((len(omnivor_df) - 1) * omnivor_df.var() +
+                            (len(vegan_df) - 1) * vegan_df.var()) /
+                            (len(omnivor_df) + len(vegan_df) - 2))
+        effect_size = (omnivor_df.mean() - vegan_df.mean()) / pooled_std
+        effect_name = "Cohen's d"
+    else:
+        # r für Mann-Whitney-U
+        n1, n2 = len(omnivor_df), len(vegan_df)
+        z_score = stats.norm.ppf(test_result.pvalue / 2) * np.sign(omnivor_df.mean() - vegan_df.mean())
+        effect_size = z_score / np.sqrt(n1 + n2)
+        effect_name = "Effektstärke r"
+
+    return {
+        'test_name': test_name,
+        'statistic': test_result.statistic,
+        'p_value': test_result.pvalue,
+        'effect_size': effect_size,
+        'effect_name': effect_name,
+        'omnivor_mean': omnivor_df.mean(),
+        'vegan_mean': vegan_df.mean(),
+        'omnivor_normal': omnivor_normal.pvalue > 0.05,
+        'vegan_normal': vegan_normal.pvalue > 0.05
+    }
+
+@profiled
+def phase_statistics_table(df: pd.DataFrame, metrics=None) -> pd.DataFrame:
+    """Führt die Phasen-Tests für alle (oder die angegebenen) Metriken aus und liefert eine Tabelle."""
+    metrics = metrics or PHASE_COMPARISON_METRICS
+    rows = []
+    for metric, title, unit in metrics:
+        if metric not in df.columns:
+            continue
+        values = pd.to_numeric(df[metric], errors="coerce")
+        try:
+            result = perform_statistical_tests(df.assign(**{metric: values}), metric)
+        except ValueError:
+            # z.B. zu wenige Werte für den Shapiro-Wilk-Test
+            continue
+        if result is None:
+            continue
+        rows.append({"metric": metric, "title": title, "unit": unit, **result})
+    return pd.DataFrame(rows)
+
+@profiled
+def phase_comparison_frame(df: pd.DataFrame, hidden_phases=()) -> pd.DataFrame:
+    """Zeilen für den Phasenvergleich ohne die ausgeblendeten Phasen.
+
+    Gefiltert wird in einem Schritt, ohne Spalten zu kopieren. Abgeleitete Metriken wie
+    energy_balance kommen unverändert aus compute_metrics.
+    """
+    if hidden_phases:
+        df = df[~df["phase"].isin(list(hidden_phases))]
+    return df
+
+def _phase_statistics(snapshot) -> pd.DataFrame:
+    versions = [snapshot.versions["daily"], snapshot.versions["nutrition"]]
+    # Ungespeicherte Stände haben keinen dauerhaften Datenstand: nicht in der Datei ablegen
+    persist = UNSAVED not in versions
+    key = [list(version or []) for version in versions] + [derived_versions()]
+    try:
+        with open(PHASE_STATS_CACHE_FILE, "r", encoding="utf-8") as f:
+            cached = json.load(f)
+        if persist and cached.get("versions") == key:
+            return pd.DataFrame(cached["rows"])
+    except (FileNotFoundError, json.JSONDecodeError):
+        pass
+
+    stats_df = phase_statistics_table(snapshot.daily_metrics())
+    if persist:
+        ensure_directories()
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        with open(PHASE_STATS_CACHE_FILE, "w", encoding="utf-8") as f:
+            # numpy-Zahlen/-Wahrheitswerte als normale JSON-Werte speichern
+            json.dump({"versions": key, "rows": json.loads(stats_df.to_json(orient="records", double_precision=15))}, f, ensure_ascii=False)
+    return stats_df
+
+@profiled
+def cached_phase_statistics(snapshot=None) -> pd.DataFrame:
+    """Phasen-Statistik aller Kernmetriken für den Stand von `snapshot` (Standard: gespeicherter Bestand).
+
+    Zwischengespeichert je Snapshot und zusätzlich je Datenstand von Tageswerten und
+    Ernährungstagebuch als JSON-Datei, damit auch einzelne cli.py-Läufe sie wiederverwenden.
+    Nicht verändern.
+    """
+    snapshot = snapshot or current_snapshot()
+    return snapshot.derive("phase_statistics", _phase_statistics)
+
+@profiled
+def sport_progression(sport_df: pd.DataFrame, disciplines=None) -> pd.DataFrame:
+    """Verlauf der Hauptkennzahl je Testdisziplin über alle Testtermine.
+
+    Liefert eine lange Tabelle (discipline, title, test_date, test_type, value) mit der Veränderung
+    zum vorherigen und zum ersten Test sowie der Angabe, ob sich der Wert verbessert hat.
+    Dauern (5 km, Plank) sind ganze Sekunden.
+    """
+    disciplines = disciplines or list(SPORT_PROGRESSION_METRICS)
+    columns = ["discipline", "title", "test_date", "test_type", "value", "change_prev", "change_first", "change_first_pct", "improved"]
+    metric_cols = {SPORT_PROGRESSION_METRICS[d][0]: d for d in disciplines if SPORT_PROGRESSION_METRICS[d][0] in sport_df.columns}
+    if sport_df.empty or not metric_cols:
+        return pd.DataFrame(columns=columns)
+
+    ordered = sport_df.sort_values("test_date", kind="stable")
+    long = ordered.melt(id_vars=["test_date", "test_type"], value_vars=list(metric_cols), var_name="metric", value_name="value")
+    long["value"] = pd.to_numeric(long["value"], errors="coerce").astype(float)
+    long = long.dropna(subset=["value"])
+    long["discipline"] = long["metric"].map(metric_cols)
+    long["title"] = long["discipline"].map(lambda d: SPORT_PROGRESSION_METRICS[d][1])
+
+    grouped = long.groupby("discipline", sort=False)["value"]
+    first = grouped.transform("first")
+    long["change_prev"] = grouped.diff()
+    long["change_first"] = long["value"] - first
+    long["change_first_pct"] = 100.0 * long["change_first"] / first.where(first != 0)
+    higher_is_better = long["discipline"].map(lambda d: SPORT_PROGRESSION_METRICS[d][2]).astype(bool)
+    long["improved"] = np.where(higher_is_better, long["change_first"] > 0, long["change_first"] < 0)
+    return long[columns].reset_index(drop=True)
+
+@profiled
+def attach_trailing_aggregates(tests_df: pd.DataFrame, daily_df: pd.DataFrame, metrics=None,
+                               windows=TEST_CONTEXT_WINDOWS, include_test_day: bool = False) -> pd.DataFrame:
+    """Hängt an jede Testzeile die Mittelwerte der Tageswerte der vorangehenden Tage an.
+
+    Für jedes Fenster w (Tage) entstehen `<metrik>_mean_<w>d` sowie `days_<w>d` (Anzahl Tage mit
+    Einträgen); `<metrik>_asof` ist der letzte vorhandene Wert bis zum Test (as-of-Join).
+    Standardmäßig zählt der Testtag selbst nicht mit (Fenster [Test - w, Test)).
+    Alle Tests werden gemeinsam über kumulierte Summen und sortierte Suche berechnet.
+    """
+    metrics = [m for m in (metrics or [m for m, _, _ in TEST_CONTEXT_METRICS]) if m in daily_df.columns]
+    result = tests_df.copy()
+    if tests_df.empty:
+        return result
+
+    test_days = pd.to_datetime(tests_df["test_date"]).to_numpy(dtype="datetime64[D]").astype(np.int64)
+    daily = daily_df.assign(_day=pd.to_datetime(daily_df["date"]).to_numpy(dtype="datetime64[D]").astype(np.int64))
+    daily = daily.sort_values("_day", kind="stable")
+    days = daily["_day"].to_numpy()
+
+    # Fenstergrenzen für alle Tests auf einmal (Indexbereiche im sortierten Tageslog)
+    offset = 1 if include_test_day else 0
+    right = np.searchsorted(days, test_days + offset, side="left")
+    lefts = {w: np.searchsorted(days, test_days - w + offset, side="left") for w in windows}
+    for window, left in lefts.items():
+        result[f"days_{window}d"] = right - left
+
+    values = daily[metrics].apply(pd.to_numeric, errors="coerce").to_numpy(dtype=float)
+    present = ~np.isnan(values)
+    # Kumulierte Summen mit führender Null: Summe über [left, right) = cs[right] - cs[left]
+    sums = np.vstack([np.zeros(len(metrics)), np.cumsum(np.where(present, values, 0.0), axis=0)])
+    counts = np.vstack([np.zeros(len(metrics)), np.cumsum(present, axis=0)])
+    for window, left in lefts.items():
+        n = counts[right] - counts[left]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            means = (sums[right] - sums[left]) / n
+        for pos, metric in enumerate(metrics):
+            result[f"{metric}_mean_{window}d"] = means[:, pos]
+
+    # As-of: letzter vorhandener Wert je Metrik bis zum Test
+    order = np.argsort(test_days, kind="stable")
+    for pos, metric in enumerate(metrics):
+        observed = daily.loc[present[:, pos], ["_day", metric]]
+        asof = pd.merge_asof(
+            pd.DataFrame({"_day": test_days[order]}), observed, on="_day",
+            allow_exact_matches=include_test_day,
+        )
+        latest = np.empty(len(test_days))
+        latest[order] = pd.to_numeric(asof[metric], errors="coerce").to_numpy(dtype=float)
+        result[f"{metric}_asof"] = latest
+    return result
+
+def _test_context(snapshot, kind: str, windows: tuple) -> pd.DataFrame:
+    tests_df = snapshot.table(kind)
+    if tests_df.empty:
+        return tests_df[["test_date", "test_type"]].copy()
+    # Tageswerte mit Metriken wie im Analyse-Tab (Makros ggf. aus dem Ernährungstagebuch ergänzt);
+    # nur die Kennzahlen-Spalten bis zum letzten Test (as-of-Werte dürfen beliebig weit zurückliegen)
+    daily_df = snapshot.daily_metrics()
+    metrics = [metric for metric, _, _ in TEST_CONTEXT_METRICS if metric in daily_df.columns]
+    daily_df = daily_df.loc[pd.to_datetime(daily_df["date"]) <= pd.to_datetime(max(tests_df["test_date"])), ["date"] + metrics]
+    return attach_trailing_aggregates(tests_df[["test_date", "test_type"]], daily_df, windows=windows)
+
+@profiled
+def tests_with_daily_context(kind: str, windows=TEST_CONTEXT_WINDOWS, snapshot=None) -> pd.DataFrame:
+    """Blut- (kind="blood") bzw. Sporttests mit den Tageswerten der Wochen davor.
+
+    Zwischengespeichert je Snapshot (Standard: gespeicherter Bestand); nicht verändern.
+    """
+    snapshot = snapshot or current_snapshot()
+    windows = tuple(windows)
+    return snapshot.derive(("test_context", kind, windows), lambda s: _test_context(s, kind, windows))
@@ -2,6 +2,8 @@
 # ===================================================================
 # DATEI: app.py
 # ===================================================================
+import profiling
+_rerun_started = profiling.now()
 import streamlit as st
 import pandas as pd
 import numpy as np
@@ -10,8 +12,13 @@ import os
 
 # Importiere die eigenen Module
 from config import *
-from database import load_json, save_json, load_data, save_data, compute_metrics, load_goals, update_data, load_nutrition_data, save_nutrition_data, update_nutrition_data, load_sport_tests_data, save_sport_tests_data, update_sport_tests_data, load_blood_tests_data, save_blood_tests_data, update_blood_tests_data
-from ui_components import render_settings_expander, render_daily_form, render_nutrition_form, render_analysis_section_v2, render_sport_tests_form, render_blood_tests_form, save_uploaded_file, generate_demo_data
+from database import load_json, save_json, load_goals, update_data, update_nutrition_data, UnitOfWork, save_sport_tests_data, update_sport_tests_data, save_blood_tests_data, update_blood_tests_data
+from ui_components import render_settings_expander, render_daily_form, render_nutrition_form, render_analysis_section_v2, render_sport_tests_form, render_blood_tests_form, generate_demo_data, render_profiling_panel, format_sport_durations, render_sport_progression, render_blood_reference_section, render_test_context, render_lab_import_section, render_search_section
+from lab_import import submit_lab_report, collect_finished_jobs
+from attachments import store_attachment
+from food_parser import estimate_meals
+import write_queue
+_imports_done = profiling.now()
 
 # --- Konfiguration der Seite ---
 st.set_page_config(page_title="ABA Selbsttest – Pflanzlich fit? Vegane Ernährung & sportliche Leistungsfähigkeit", layout="wide")
@@ -21,21 +28,33 @@ st.title("🌱 ABA Selbsttest – Pflanzlich fit? Vegane Ernährung & sportliche
 
 # --- Daten laden ---
 settings = load_json(SETTINGS_FILE, DEFAULT_SETTINGS)
+# Profiling-Schalter aus dem Widget-Status (wirkt sofort, auch ohne "Einstellungen speichern")
+profiling_enabled = st.session_state.get("profiling_enabled_checkbox", settings.get("profiling_enabled", False))
+profiling_dump = profiling_enabled and st.session_state.get("profiling_dump_checkbox", settings.get("profiling_dump", False))
+profiling.begin_rerun(profiling_enabled, started=_rerun_started)
+profiling.record("app.imports", _imports_done - _rerun_started, start=_rerun_started)
 mapping = load_json(MAPPING_FILE, DEFAULT_MAPPING)
 goals = load_goals()
-df = load_data()
-nutrition_df = load_nutrition_data()
-sport_tests_df = load_sport_tests_data()
-blood_tests_df = load_blood_tests_data()
-df = compute_metrics(df).sort_values("date")
+# Fertig ausgelesene Laborbefunde vor dem Laden der Tabellen übernehmen
+lab_import_summaries = collect_finished_jobs()
+# Alle Tabellen aus einem gemeinsamen Snapshot; Formulare speichern im Hintergrund, noch nicht
+# geschriebene Stände kommen aus der Warteschlange
+snapshot = write_queue.snapshot()
+nutrition_df = snapshot.table("nutrition")
+sport_tests_df = snapshot.table("sport")
+blood_tests_df = snapshot.table("blood")
+df = snapshot.daily_metrics()
 
 # --- UI-Elemente rendern ---
+for table, error in write_queue.collect_errors():
+    st.error(f"Speichern im Hintergrund fehlgeschlagen ({table}): {error}")
 render_settings_expander(settings, mapping)
+render_search_section()
 
 # --- Tabs für verschiedene Bereiche ---
 tab1, tab2, tab3, tab4, tab5 = st.tabs(["📊 Tageswerte", "🍽️ Ernährungstagebuch", "🏃‍♂️ Sporttests", "🩸 Bluttests", "📈 Analyse"])
 
-with tab1:
+with tab1, profiling.span("app.tab_daily"):
     st.header("Tagesformular")
     submitted, form_data = render_daily_form()
 
@@ -44,8 +63,6 @@ with tab1:
         sleep_hours = float(data["sh_h"]) + float(data["sh_m"]) / 60.0
         deep_sleep_hours = float(data["deep_hh"]) + float(data["deep_mm"]) / 60.0
         
-        base_df = df[df["date"] != data["d"]]
-        
         # Nährstoffdaten aus dem Formular extrahieren (NEUE SCHLÜSSEL)
         nutrition_data_to_save = {
             "intake_kcal": data["intake"],
@@ -55,10 +72,7 @@ with tab1:
             "water_ml": data["water"],
         }
 
-        # Nährstoffdaten im Ernährungstagebuch synchronisieren/aktualisieren
-        update_nutrition_data(data["d"], data["phase"], nutrition_data_to_save)
-        
-        new_row = pd.DataFrame([{
+        new_row = {
             "date": data["d"], "weekday": None, "phase": data["phase"],
             "sleep_hours": sleep_hours, "sleep_score": data["ss"], "hrv_sleep_avg": data["hrv_s"],
             "rhr_sleep_avg": data["rhr_s"], "rhr_sleep_min": data["rhr_s_min"], "spo2_sleep_avg": data["spo2_s_avg"], "spo2_sleep_min": data["spo2_s_min"],
@@ -74,11 +88,13 @@ with tab1:
             # Wohlbefinden
             "energy": data["energy"], "mood": data["mood"], "motivation": data["motivation"], "concentration": data["concentration"], "note": data["note"],
             "last_modified": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        }])
+        }
         
-        merged_df = pd.concat([base_df, new_row], ignore_index=True)
-        merged_df = compute_metrics(merged_df)
-        save_data(merged_df)
+        # Ernährungstagebuch synchronisieren und Tag ersetzen; Metriken werden einmal berechnet,
+        # jede Tabelle einmal im Hintergrund gespeichert
+        with UnitOfWork({"daily": df, "nutrition": nutrition_df}, save=write_queue.submit) as uow:
+            uow.update_nutrition(data["d"], data["phase"], nutrition_data_to_save)
+            uow.upsert("daily", new_row, keys=["date"])
         st.success("Gespeichert & automatisch gesichert ✅")
         st.rerun()
 
@@ -96,7 +112,8 @@ with tab1:
                            "total_steps", "total_kcal_burn", "intake_kcal", "carbs_g", "protein_g", "fat_g", "water_ml",
                            "body_weight", "stress_avg", "energy", "mood", "motivation"]
             display_cols = [c for c in display_cols if c in df.columns]
-        display_df = df[display_cols].copy()
+        # Spaltenauswahl ohne Kopie (pandas kopiert erst bei Änderungen, Copy-on-Write)
+        display_df = df[display_cols]
         
         # Tabelle mit Inline-Edit
         edited_df = st.data_editor(
@@ -115,6 +132,7 @@ with tab1:
         )
         
         # Prüfen auf Änderungen (Updates und Löschungen)
+        diff_started = profiling.now()
         changes_detected = False
         
         # 1. Prüfen auf gelöschte Zeilen
@@ -125,7 +143,7 @@ with tab1:
             
             if deleted_entries:
                 keep_mask = ~((df["date"].astype(str) + "_" + df["phase"].astype(str)).isin(deleted_entries))
-                df = df[keep_mask].copy()
+                df = df[keep_mask]
                 changes_detected = True
                 st.success(f"{len(deleted_entries)} Eintrag(e) gelöscht!")
         
@@ -156,23 +174,29 @@ with tab1:
                         changes_detected = True
                 else:
                     st.warning("Neue Zeilen können nur über das Tagesformular hinzugefügt werden.")
+        profiling.record("app.daily_editor_diff", profiling.now() - diff_started, start=diff_started)
         
         if changes_detected:
             st.rerun()
     else:
         st.info("Keine Daten vorhanden. Bitte erfassen Sie zuerst einige Daten.")
 
-with tab2:
+with tab2, profiling.span("app.tab_nutrition"):
     st.header("🍽️ Ernährungstagebuch")
     
     nutrition_submitted, nutrition_form_data = render_nutrition_form()
     
     if nutrition_submitted:
         data = nutrition_form_data
-        # Überschreiben nach (date, phase) – Werte kommen aus render_nutrition_form() via locals()
-        base_nutrition_df = nutrition_df[~((nutrition_df["date"] == data["d"]) & (nutrition_df["phase"] == data["phase"]))]
+        # Ohne eigene Angaben die Makros aus den Mahlzeiten schätzen
+        if not any([data["intake"], data["carbs"], data["protein"], data["fat"]]):
+            estimate = estimate_meals(data)
+            if estimate["intake_kcal"] > 0:
+                data.update(intake=estimate["intake_kcal"], carbs=estimate["carbs_g"], protein=estimate["protein_g"], fat=estimate["fat_g"])
+                unknown = f" Nicht erkannt: {', '.join(estimate['unknown'])}." if estimate["unknown"] else ""
+                st.info(f"Nährwerte aus {estimate['recognized']} erkannten Lebensmitteln geschätzt.{unknown}")
 
-        new_nutrition_row = pd.DataFrame([{
+        new_nutrition_row = {
             "date": data["d"],
             "phase": data["phase"],
             "breakfast": data["breakfast"],
@@ -188,10 +212,11 @@ with tab2:
             "fat_g": data["fat"],
             "water_ml": data["water"],
             "last_modified": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        }])
+        }
         
-        merged_nutrition_df = pd.concat([base_nutrition_df, new_nutrition_row], ignore_index=True)
-        save_nutrition_data(merged_nutrition_df)
+        # Überschreiben nach (date, phase) – Werte kommen aus render_nutrition_form() via locals()
+        with UnitOfWork({"nutrition": nutrition_df}, save=write_queue.submit) as uow:
+            uow.upsert("nutrition", new_nutrition_row)
         st.success("Ernährung gespeichert! ✅")
         st.rerun()
     
@@ -199,7 +224,7 @@ with tab2:
     
     if not nutrition_df.empty:
         nutrition_display_cols = ["date", "phase", "breakfast", "snack_1", "lunch", "snack_2", "dinner", "supplements", "intake_kcal", "carbs_g", "protein_g", "fat_g", "water_ml", "nutrition_note"]
-        nutrition_display_df = nutrition_df[nutrition_display_cols].copy()
+        nutrition_display_df = nutrition_df[nutrition_display_cols]
         
         nutrition_edited_df = st.data_editor(
             nutrition_display_df,
@@ -217,7 +242,10 @@ with tab2:
         )
         
         # Prüfen auf Änderungen
-        if not nutrition_edited_df.equals(nutrition_display_df):
+        diff_started = profiling.now()
+        nutrition_changed = not nutrition_edited_df.equals(nutrition_display_df)
+        profiling.record("app.nutrition_editor_diff", profiling.now() - diff_started, start=diff_started)
+        if nutrition_changed:
             for i, row in nutrition_edited_df.iterrows():
                 if i < len(nutrition_df):
                     original_row = nutrition_df.iloc[i]
@@ -238,7 +266,7 @@ with tab2:
     else:
         st.info("Keine Ernährungsdaten vorhanden.")
 
-with tab3:
+with tab3, profiling.span("app.tab_sport_tests"):
     st.header("🏃‍♂️ Sporttests")
     sport_submitted, sport_form_data = render_sport_tests_form()
 
@@ -252,16 +280,16 @@ with tab3:
             "cooper_distance": data["cooper_distance"], "cooper_avg_hr": data["cooper_avg_hr"], "cooper_max_hr": data["cooper_max_hr"], "cooper_pace": data["cooper_pace"], "cooper_kcal": data["cooper_kcal"],
             "cooper_warmup": data["cooper_warmup"], "cooper_aerob": data["cooper_aerob"], "cooper_anaerob": data["cooper_anaerob"], "cooper_intensive": data["cooper_intensive"],
             # 5km-Lauf
-            "run5k_time": f"{data['run5k_time_min']}:{data['run5k_time_sec']:02d}", "run5k_avg_hr": data["run5k_avg_hr"], "run5k_max_hr": data["run5k_max_hr"], "run5k_pace": data["run5k_pace"], "run5k_kcal": data["run5k_kcal"],
+            "run5k_time": data["run5k_time_min"] * 60 + data["run5k_time_sec"], "run5k_avg_hr": data["run5k_avg_hr"], "run5k_max_hr": data["run5k_max_hr"], "run5k_pace": data["run5k_pace"], "run5k_kcal": data["run5k_kcal"],
             "run5k_warmup": data["run5k_warmup"], "run5k_aerob": data["run5k_aerob"], "run5k_anaerob": data["run5k_anaerob"], "run5k_intensive": data["run5k_intensive"],
             # Liegestütze
             "pushups_reps": data["pushups_reps"], "pushups_avg_hr": data["pushups_avg_hr"], "pushups_max_hr": data["pushups_max_hr"],
             # Plank
-            "plank_time": f"{data['plank_time_min']}:{data['plank_time_sec']:02d}", "plank_avg_hr": data["plank_avg_hr"], "plank_max_hr": data["plank_max_hr"],
+            "plank_time": data["plank_time_min"] * 60 + data["plank_time_sec"], "plank_avg_hr": data["plank_avg_hr"], "plank_max_hr": data["plank_max_hr"],
             # Burpee-Test
             "burpee_reps": data["burpee_reps"], "burpee_avg_hr": data["burpee_avg_hr"], "burpee_max_hr": data["burpee_max_hr"],
             # VO2max-Test
-            "vo2max_value": data["vo2max_value"], "vo2max_avg_hr": data["vo2max_avg_hr"], "vo2max_max_hr": data["vo2max_max_hr"], "vo2max_duration": f"{data['vo2max_duration_min']}:{data['vo2max_duration_sec']:02d}", "vo2max_speed": data["vo2max_speed"],
+            "vo2max_value": data["vo2max_value"], "vo2max_avg_hr": data["vo2max_avg_hr"], "vo2max_max_hr": data["vo2max_max_hr"], "vo2max_duration": data["vo2max_duration_min"] * 60 + data["vo2max_duration_sec"], "vo2max_speed": data["vo2max_speed"],
         }
         
         # Handle file uploads
@@ -269,10 +297,7 @@ with tab3:
         for key in photo_keys:
             uploaded_file = data.get(key)
             if uploaded_file is not None:
-                filename = f"{data['test_date']}_{data['test_type']}_{key}.pdf"
-                file_path = save_uploaded_file(uploaded_file, SPORT_TESTS_DIR, filename)
-                if file_path:
-                    sport_data_to_save[key] = file_path
+                sport_data_to_save[key] = store_attachment(uploaded_file)
 
         update_sport_tests_data(data["test_date"], data["test_type"], sport_data_to_save)
         st.success("Sporttest gespeichert! ✅")
@@ -285,14 +310,16 @@ with tab3:
             display_cols = [c for c in SPORT_TESTS_COLUMNS if c in sport_tests_df.columns and c != "last_modified"]
         else:
             display_cols = [c for c in ["test_date", "test_type", "test_category", "distance_m", "time_sec", "vo2max", "notes"] if c in sport_tests_df.columns]
-        display_df = sport_tests_df[display_cols].copy()
+        display_df = format_sport_durations(sport_tests_df[display_cols])
         display_df = display_df.fillna("")
 
         st.dataframe(display_df, use_container_width=True)
+        render_sport_progression(sport_tests_df)
+        render_test_context("sport", snapshot)
     else:
         st.info("Keine Sporttest-Daten vorhanden.")
 
-with tab4:
+with tab4, profiling.span("app.tab_blood_tests"):
     st.header("🩸 Bluttests")
     blood_submitted, blood_form_data = render_blood_tests_form()
 
@@ -314,22 +341,24 @@ with tab4:
             "sodium": data["sodium"], "calcium": data["calcium"], "potassium": data["potassium"],
             # Schilddrüsenhormone
             "tsh_basal": data["tsh_basal"],
-            # Harnbefund
+            # Hämatokrit (Blutbild)
             "hk": data["hk"]
         }
         
         # Handle file upload
         uploaded_file = data.get("pdf_file")
         if uploaded_file is not None:
-            filename = f"{data['test_date']}_{data['test_type']}_lab_report.pdf"
-            file_path = save_uploaded_file(uploaded_file, BLOOD_TESTS_DIR, filename)
-            if file_path:
-                blood_data_to_save["pdf_file"] = file_path
+            blood_data_to_save["pdf_file"] = store_attachment(uploaded_file)
 
         update_blood_tests_data(data["test_date"], data["test_type"], blood_data_to_save)
+        if blood_data_to_save.get("pdf_file"):
+            # Auslesen im Hintergrund; leere Felder werden beim nächsten Rerun ergänzt
+            submit_lab_report(blood_data_to_save["pdf_file"], data["test_date"], data["test_type"])
         st.success("Bluttest gespeichert! ✅")
         st.rerun()
 
+    render_lab_import_section(lab_import_summaries)
+
     st.header("Daten (Bluttests)")
     if not blood_tests_df.empty:
         show_all_cols = st.checkbox("Alle Spalten anzeigen", value=False, key="blood_show_all_cols")
@@ -337,12 +366,17 @@ with tab4:
             display_cols = [c for c in BLOOD_TESTS_COLUMNS if c in blood_tests_df.columns and c != "last_modified"]
         else:
             display_cols = [c for c in ["test_date", "test_type", "hemoglobin", "ferritin", "cholesterol", "tsh_basal", "notes"] if c in blood_tests_df.columns]
-        display_df = blood_tests_df[display_cols].copy()
-        display_df = display_df.fillna("")
+        display_df = blood_tests_df[display_cols].fillna("")
 
         st.dataframe(display_df, use_container_width=True)
+        render_blood_reference_section(settings, snapshot)
+        render_test_context("blood", snapshot)
     else:
         st.info("Keine Bluttest-Daten vorhanden.")
 
-with tab5:
+with tab5, profiling.span("app.tab_analysis"):
     render_analysis_section_v2(df, goals)
+
+# --- Profiling-Auswertung des aktuellen Reruns ---
+render_profiling_panel(profiling.end_rerun(dump=profiling_dump), dumped=profiling_dump)
+
@@ -0,0 +1,150 @@
+# attachments.py
+# Inhaltsadressierter Ablageort für Anhänge (Fotos der Sporttests, Labor-PDFs).
+# Dateien werden beim Speichern blockweise gehasht und unter ihrem SHA-256 abgelegt:
+# gleiche Inhalte liegen nur einmal auf der Platte, nichts wird überschrieben.
+# Referenzen zählen die Sport-/Bluttest-Tabellen; nicht mehr referenzierte Dateien
+# entfernt collect_garbage (z.B. nach dem Löschen eines Tests).
+import hashlib
+import os
+import time
+import uuid
+from collections import Counter
+from config import ATTACHMENTS_DIR, SPORT_TESTS_LONG_FILE, BLOOD_TESTS_LONG_FILE, ensure_directories
+from profiling import profiled
+
+CHUNK_SIZE = 1 << 20
+# Frisch gespeicherte Dateien bleiben so lange erhalten, auch wenn der Test noch nicht gespeichert ist
+GC_GRACE_SECONDS = 3600
+ATTACHMENT_MEASURES = ["pdf_file", "cooper_photo", "run5k_photo", "pushups_photo", "plank_photo", "burpee_photo", "vo2max_photo"]
+_TMP_DIR = os.path.join(ATTACHMENTS_DIR, "tmp")
+
+def blob_path(sha256: str, suffix: str = "") -> str:
+    """Ablagepfad einer Datei: attachments/<2 Zeichen>/<sha256><endung>."""
+    return os.path.join(ATTACHMENTS_DIR, sha256[:2], f"{sha256}{suffix.lower()}")
+
+def _chunks(source):
+    """Liest Pfade, Upload-Objekte und Dateiobjekte blockweise (ohne den ganzen Inhalt im Speicher)."""
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "rb") as f:
+            yield from iter(lambda: f.read(CHUNK_SIZE), b"")
+        return
+    if hasattr(source, "seek"):
+        source.seek(0)
+    yield from iter(lambda: source.read(CHUNK_SIZE), b"")
+
+@profiled
+def store_attachment(source, suffix: str = "") -> str:
+    """Speichert eine Datei (Pfad oder Upload-Objekt) im Ablageort und gibt ihren Pfad zurück.
+
+    Ist derselbe Inhalt schon vorhanden, wird nur der bestehende Pfad geliefert.
+    """
+    if not suffix and hasattr(source, "name"):
+        suffix = os.path.splitext(source.name)[1]
+    ensure_directories()
+    os.makedirs(_TMP_DIR, exist_ok=True)
+    tmp_path = os.path.join(_TMP_DIR, uuid.uuid4().hex)
+    digest = hashlib.sha256()
+    try:
+        with open(tmp_path, "wb") as f:
+            for chunk in _chunks(source):
+                digest.update(chunk)
+                f.write(chunk)
+        path = blob_path(digest.hexdigest(), suffix)
+        if os.path.exists(path):
+            os.remove(tmp_path)
+            # Frist der Speicherbereinigung für die erneut hochgeladene Datei neu starten
+            os.utime(path)
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return path
+
+def is_blob(path: str) -> bool:
+    """True, wenn der Pfad im Ablageort liegt (ältere Anhänge liegen noch in den Testordnern)."""
+    try:
+        return os.path.commonpath([os.path.abspath(path), ATTACHMENTS_DIR]) == ATTACHMENTS_DIR
+    except ValueError:
+        # Windows: Pfad auf einem anderen Laufwerk als der Ablageort
+        return False
+
+@profiled
+def attachment_refcounts() -> Counter:
+    """Anzahl der Verweise je Anhang aus den aktuellen Sport- und Bluttests (Pfad -> Anzahl)."""
+    from database import read_long_table
+
+    counts = Counter()
+    for long_file in [SPORT_TESTS_LONG_FILE, BLOOD_TESTS_LONG_FILE]:
+        if not os.path.exists(long_file):
+            continue
+        refs = read_long_table(long_file, measures=ATTACHMENT_MEASURES)["text"].dropna()
+        counts.update(os.path.abspath(p) for p in refs if p)
+    return counts
+
+def _stored_blobs():
+    """Alle Dateien im Ablageort (ohne Zwischendateien)."""
+    if not os.path.isdir(ATTACHMENTS_DIR):
+        return
+    for shard in os.scandir(ATTACHMENTS_DIR):
+        if shard.is_dir() and shard.path != _TMP_DIR:
+            yield from (entry for entry in os.scandir(shard.path) if entry.is_file())
+
+@profiled
+def collect_garbage(grace_seconds: float = GC_GRACE_SECONDS, dry_run: bool = False) -> list:
+    """Entfernt Anhänge ohne Verweis, die älter als die Frist sind, sowie liegengebliebene Zwischendateien.
+
+    Gezählt werden nur die aktuellen Tabellen, nicht deren Backups. Gibt die (zu) löschenden Pfade zurück.
+    """
+    refs = attachment_refcounts()
+    cutoff = time.time() - grace_seconds
+    orphans = [entry.path for entry in _stored_blobs()
+               if refs[os.path.abspath(entry.path)] == 0 and entry.stat().st_mtime < cutoff]
+    if os.path.isdir(_TMP_DIR):
+        orphans += [entry.path for entry in os.scandir(_TMP_DIR) if entry.stat().st_mtime < cutoff]
+    if not dry_run:
+        for path in orphans:
+            os.remove(path)
+    return orphans
+
+@profiled
+def attachment_stats() -> dict:
+    """Kennzahlen des Ablageorts: Dateien, Bytes, Verweise und durch Deduplizierung gesparte Bytes."""
+    refs = attachment_refcounts()
+    stats = {"blobs": 0, "bytes": 0, "references": 0, "saved_bytes": 0, "unreferenced": 0, "legacy_references": 0}
+    for entry in _stored_blobs():
+        size, count = entry.stat().st_size, refs[os.path.abspath(entry.path)]
+        stats["blobs"] += 1
+        stats["bytes"] += size
+        stats["references"] += count
+        stats["saved_bytes"] += size * max(count - 1, 0)
+        stats["unreferenced"] += count == 0
+    stats["legacy_references"] = sum(count for path, count in refs.items() if not is_blob(path))
+    return stats
+
+@profiled
+def migrate_legacy_attachments() -> int:
+    """Übernimmt Anhänge aus den alten Testordnern in den Ablageort und passt die Verweise an.
+
+    Fehlende Dateien bleiben unverändert (check_integrity meldet sie). Gibt die Anzahl übernommener Verweise zurück.
+    """
+    from database import (load_sport_tests_data, save_sport_tests_data, load_blood_tests_data,
+                          save_blood_tests_data)
+
+    migrated = 0
+    for load, save in [(load_sport_tests_data, save_sport_tests_data), (load_blood_tests_data, save_blood_tests_data)]:
+        df = load()
+        changed = False
+        for col in [c for c in ATTACHMENT_MEASURES if c in df.columns]:
+            paths = df[col].dropna()
+            legacy = {p for p in paths if p and not is_blob(p) and os.path.isfile(p)}
+            if not legacy:
+                continue
+            moved = {p: store_attachment(p, os.path.splitext(p)[1]) for p in legacy}
+            df[col] = df[col].replace(moved)
+            migrated += int(paths.isin(legacy).sum())
+            changed = True
+        if changed:
+            save(df)
+    return migrated
@@ -0,0 +1,98 @@
+# benchmarks/import_time.py
+# ===================================================================
+# Misst die Importzeit (Kaltstart) der App-Module in frischen Interpretern.
+#   python benchmarks/import_time.py                 # aktueller Stand
+#   python benchmarks/import_time.py --compare HEAD~1 # vorher/nachher
+# Jeder Lauf startet einen eigenen Python-Prozess, damit keine Module
+# aus einem vorherigen Import im Cache liegen.
+# ===================================================================
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Module in Importreihenfolge der App (app.py selbst ist ein Streamlit-Skript)
+MODULES = ["config", "database", "analysis", "ui_components", "nutrition_diary"]
+
+# Schwere Abhängigkeiten, die nicht mehr beim Start geladen werden sollen
+LAZY_DEPENDENCIES = ["scipy", "plotly.express", "reportlab"]
+
+PROBE = """
+import sys, time
+t0 = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - t0
+loaded = [m for m in {lazy!r} if m in sys.modules]
+print(elapsed, ",".join(loaded))
+"""
+
+def measure(module: str, source_dir: str, runs: int):
+    """Importiert ein Modul `runs`-mal in frischen Prozessen; liefert (Median in ms, geladene schwere Abhängigkeiten)."""
+    timings = []
+    loaded = ""
+    with tempfile.TemporaryDirectory() as data_dir:
+        # Eigenes Datenverzeichnis, damit ältere Stände beim Import keine Ordner im Repo anlegen
+        env = dict(os.environ, ABA_DATA_DIR=data_dir, PYTHONDONTWRITEBYTECODE="1")
+        for _ in range(runs):
+            out = subprocess.run(
+                [sys.executable, "-c", PROBE.format(module=module, lazy=LAZY_DEPENDENCIES)],
+                cwd=source_dir, env=env, capture_output=True, text=True,
+            )
+            if out.returncode != 0:
+                return None, out.stderr.strip().splitlines()[-1]
+            parts = out.stdout.split()
+            timings.append(float(parts[0]) * 1000)
+            loaded = parts[1] if len(parts) > 1 else ""
+    return statistics.median(timings), loaded
+
+def export_ref(ref: str, target: str) -> None:
+    """Exportiert einen Git-Stand (z.B. HEAD~1) in ein temporäres Verzeichnis."""
+    archive = subprocess.run(["git", "archive", ref], cwd=REPO_DIR, capture_output=True, check=True)
+    subprocess.run(["tar", "-x", "-C", target], input=archive.stdout, check=True)
+
+def report(label: str, source_dir: str, runs: int) -> dict:
+    print(f"\n== {label} ==")
+    print(f"{'Modul':<18}{'Median (ms)':>12}  geladene schwere Abhängigkeiten")
+    results = {}
+    for module in MODULES:
+        if not os.path.exists(os.path.join(source_dir, f"{module}.py")):
+            continue
+        median_ms, loaded = measure(module, source_dir, runs)
+        results[module] = median_ms
+        if median_ms is None:
+            print(f"{module:<18}{'Fehler':>12}  {loaded}")
+        else:
+            print(f"{module:<18}{median_ms:>12.1f}  {loaded or '-'}")
+    return results
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Importzeit der App-Module messen")
+    parser.add_argument("--runs", type=int, default=5, help="Anzahl frischer Prozesse pro Modul (Median)")
+    parser.add_argument("--compare", metavar="GIT_REF", help="Zusätzlich einen älteren Stand messen (vorher/nachher)")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    before = None
+    if args.compare:
+        with tempfile.TemporaryDirectory() as old_dir:
+            export_ref(args.compare, old_dir)
+            before = report(f"vorher ({args.compare})", old_dir, args.runs)
+    after = report("aktuell", REPO_DIR, args.runs)
+
+    if before:
+        print(f"\n{'Modul':<18}{'vorher':>10}{'nachher':>10}{'Δ (ms)':>10}")
+        for module, new_ms in after.items():
+            old_ms = before.get(module)
+            if old_ms is None or new_ms is None:
+                continue
+            print(f"{module:<18}{old_ms:>10.1f}{new_ms:>10.1f}{new_ms - old_ms:>+10.1f}")
+    print(f"\nGesamtdauer: {time.perf_counter() - started:.1f} s")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,137 @@
+# benchmarks/memory.py
+# ===================================================================
+# Misst den Spitzen-Speicherbedarf (tracemalloc) der Speicher-, Metrik-
+# und Analysepfade mit synthetischen Datensätzen (Basis: Szenario-Demo).
+#   python benchmarks/memory.py                          # 10×/100×
+#   python benchmarks/memory.py --scales 100 --compare HEAD~1   # vorher/nachher
+# Angegeben wird der zusätzliche Speicher während einer Operation (MB)
+# über dem Stand davor. Jede Stufe läuft in einem eigenen Prozess mit
+# temporärem Datenverzeichnis.
+# ===================================================================
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_SCALES = "10,100"
+OPERATIONS = ["load_daily", "compute_metrics", "save_daily", "analysis_filter"]
+
+PROBE = """
+import inspect, json, sys, tracemalloc
+sys.path.insert(0, ".")
+import database as db
+from demo_data import build_demo_tables
+# Vor der Messung importieren: gemessen wird nur das Filtern, nicht das Laden der Module
+try:
+    from analysis import phase_comparison_frame
+    # Stände, in denen energy_balance hier noch neu berechnet wurde
+    FILTER_TAKES_METRIC = "metric" in inspect.signature(phase_comparison_frame).parameters
+except ImportError:
+    phase_comparison_frame = None
+
+def peak_mb(func) -> float:
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return (peak - base) / 2**20
+
+def analysis_filter(df):
+    # Wie im Analyse-Tab: Zeitraum wählen, eine Phase ausblenden, Energiebilanz anzeigen
+    sel_df = df[(df["date"] >= df["date"].min()) & (df["date"] <= df["date"].max())]
+    if phase_comparison_frame is None:
+        # Ältere Stände: Ablauf wie damals direkt im Analyse-Tab
+        sel_df = sel_df.copy()
+        filtered_df = sel_df.copy()
+        filtered_df = filtered_df.copy()
+        filtered_df["energy_balance"] = filtered_df["intake_kcal"] - filtered_df["total_kcal_burn"]
+        filtered_df = filtered_df[filtered_df["phase"] != "Vegan"]
+        filtered_df = filtered_df.copy()
+        filtered_df["energy_balance"] = filtered_df["intake_kcal"] - filtered_df["total_kcal_burn"]
+        return filtered_df
+    if FILTER_TAKES_METRIC:
+        return phase_comparison_frame(sel_df, "energy_balance", hidden_phases=["Vegan"])
+    return phase_comparison_frame(sel_df, hidden_phases=["Vegan"])
+
+tables = build_demo_tables(days={days}, athletes={scale}, seed=42)
+db.save_nutrition_data(tables["nutrition"])
+daily_df = db.compute_metrics(tables["daily"], tables["nutrition"])
+db.save_data(daily_df)
+db.load_data()  # Spaltenablage u.ä. anlegen, gemessen wird ein normaler Ladevorgang
+results = {{
+    "rows_daily": len(daily_df),
+    "load_daily": peak_mb(db.load_data),
+    "compute_metrics": peak_mb(lambda: db.compute_metrics(tables["daily"], tables["nutrition"])),
+    "save_daily": peak_mb(lambda: db.save_data(daily_df)),
+    "analysis_filter": peak_mb(lambda: analysis_filter(daily_df)),
+}}
+print(json.dumps(results))
+"""
+
+def measure(source_dir: str, scale: int, days: int) -> dict:
+    """Misst alle Operationen einer Skalierungsstufe in einem frischen Prozess; {Operation: MB}."""
+    with tempfile.TemporaryDirectory() as data_dir:
+        env = dict(os.environ, ABA_DATA_DIR=data_dir, PYTHONDONTWRITEBYTECODE="1")
+        out = subprocess.run(
+            [sys.executable, "-c", PROBE.format(scale=scale, days=days)],
+            cwd=source_dir, env=env, capture_output=True, text=True,
+        )
+    if out.returncode != 0:
+        raise RuntimeError(out.stderr.strip().splitlines()[-1])
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+def export_ref(ref: str, target: str) -> None:
+    """Exportiert einen Git-Stand (z.B. HEAD~1) in ein temporäres Verzeichnis."""
+    archive = subprocess.run(["git", "archive", ref], cwd=REPO_DIR, capture_output=True, check=True)
+    subprocess.run(["tar", "-x", "-C", target], input=archive.stdout, check=True)
+
+def report(label: str, source_dir: str, scales: list, days: int) -> dict:
+    print(f"\n== {label} ==", file=sys.stderr)
+    results = {}
+    for scale in scales:
+        print(f"Skalierung {scale}× ...", file=sys.stderr)
+        results[scale] = measure(source_dir, scale, days)
+    return results
+
+def print_report(after: dict, before: dict = None) -> None:
+    """Tabelle der Spitzenwerte in MB; mit `before` zusätzlich vorher und Veränderung in %."""
+    width = 26 if before else 12
+    header = f"{'Operation':<18}" + "".join(f"{str(scale) + '×':>{width}}" for scale in after)
+    print(header)
+    print(f"{'(Zeilen Tageswerte)':<18}" + "".join(f"{after[s]['rows_daily']:>{width}}" for s in after))
+    print("-" * len(header))
+    for op in OPERATIONS:
+        line = f"{op:<18}"
+        for scale, values in after.items():
+            cell = f"{values[op]:.2f}"
+            old = (before or {}).get(scale, {}).get(op)
+            if old:
+                cell = f"{old:.2f} → {cell} ({(values[op] - old) / old:+.0%})"
+            line += f"{cell:>{width}}"
+        print(line)
+    print("\nZusätzlicher Spitzen-Speicher in MB (tracemalloc)." + (" Vorher → nachher (Veränderung)." if before else ""))
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Spitzen-Speicherbedarf der Daten- und Analysepfade messen")
+    parser.add_argument("--scales", default=DEFAULT_SCALES, help=f"Kommagetrennte Skalierungsstufen (Standard: {DEFAULT_SCALES})")
+    parser.add_argument("--days", type=int, default=56, help="Tage pro synthetischer Person")
+    parser.add_argument("--compare", metavar="GIT_REF", help="Zusätzlich einen älteren Stand messen (vorher/nachher)")
+    args = parser.parse_args(argv)
+    scales = [int(s) for s in args.scales.split(",")]
+
+    before = None
+    if args.compare:
+        with tempfile.TemporaryDirectory() as old_dir:
+            export_ref(args.compare, old_dir)
+            before = report(f"vorher ({args.compare})", old_dir, scales, args.days)
+    after = report("aktuell", REPO_DIR, scales, args.days)
+    print_report(after, before)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,171 @@
+# benchmarks/scale.py
+# ===================================================================
+# Skalierungs-Benchmark mit synthetischen Datensätzen (Basis: Szenario-Demo).
+#   python benchmarks/scale.py                               # 1×/10×/100×/1000×
+#   python benchmarks/scale.py --scales 1,10 --repeat 5
+#   python benchmarks/scale.py --output baseline.json
+#   python benchmarks/scale.py --compare baseline.json       # Regressionen melden
+# Skalierung s = s synthetische Personen à --days Tage (Standard: 56 Tage
+# wie die Szenario-Demo). Gearbeitet wird in einem temporären Datenverzeichnis.
+# ===================================================================
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import warnings
+from datetime import datetime
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+DEFAULT_SCALES = "1,10,100,1000"
+
+def timed(func, repeat: int, setup=None) -> float:
+    """Führt func `repeat`-mal aus (optional mit setup davor) und liefert den Median in ms."""
+    timings = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        started = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+def bench_scale(scale: int, days: int, repeat: int, work_dir: str) -> dict:
+    """Misst alle Operationen für eine Skalierungsstufe; liefert {Operation: Median ms}."""
+    from config import BKP_DIR
+    from database import (load_data, save_data, load_nutrition_data, save_nutrition_data,
+                          load_sport_tests_data, save_sport_tests_data, load_blood_tests_data,
+                          save_blood_tests_data, update_data, update_nutrition_data, delete_data,
+                          compute_metrics)
+    from demo_data import build_demo_tables
+    from importer import read_csv_flexible, prepare_import_frame, merge_import
+    from analysis import phase_statistics_table
+
+    results = {}
+    started = time.perf_counter()
+    tables = build_demo_tables(days=days, athletes=scale, seed=42)
+    results["generate"] = (time.perf_counter() - started) * 1000
+    results["rows_daily"] = len(tables["daily"])
+
+    # Ernährung zuerst speichern, damit compute_metrics realistisch mit dem Tagebuch abgleicht
+    save_nutrition_data(tables["nutrition"])
+    daily_df = compute_metrics(tables["daily"])
+
+    results["save_daily"] = timed(lambda: save_data(daily_df), repeat)
+    results["save_nutrition"] = timed(lambda: save_nutrition_data(tables["nutrition"]), repeat)
+    results["save_sport_tests"] = timed(lambda: save_sport_tests_data(tables["sport"]), repeat)
+    results["save_blood_tests"] = timed(lambda: save_blood_tests_data(tables["blood"]), repeat)
+
+    results["load_daily"] = timed(load_data, repeat)
+    results["load_nutrition"] = timed(load_nutrition_data, repeat)
+    results["load_sport_tests"] = timed(load_sport_tests_data, repeat)
+    results["load_blood_tests"] = timed(load_blood_tests_data, repeat)
+
+    loaded_df = load_data()
+    results["compute_metrics"] = timed(lambda: compute_metrics(loaded_df), repeat)
+
+    # Einzelne Zeile in der Mitte des Bestands ändern bzw. löschen
+    middle = daily_df.iloc[len(daily_df) // 2]
+    results["update_daily"] = timed(lambda: update_data(middle["date"], middle["phase"], {"note": "Benchmark"}), repeat)
+    results["update_nutrition"] = timed(
+        lambda: update_nutrition_data(middle["date"], middle["phase"], {"nutrition_note": "Benchmark"}), repeat)
+    results["delete_daily"] = timed(lambda: delete_data(middle["date"], middle["phase"]), repeat,
+                                    setup=lambda: save_data(daily_df))
+    save_data(daily_df)
+
+    # CSV-Import: kompletter Export der Tageswerte mit Überschreiben
+    import_path = os.path.join(work_dir, "import.csv")
+    tables["daily"].to_csv(import_path, index=False)
+    mapping = {col: col for col in tables["daily"].columns if col not in ("weekday", "last_modified")}
+
+    def run_import():
+        import_df = read_csv_flexible(import_path)
+        df_to_import, _ = prepare_import_frame(import_df, mapping)
+        merge_import(loaded_df, df_to_import, overwrite=True)
+
+    results["csv_import"] = timed(run_import, repeat)
+
+    with warnings.catch_warnings():
+        # Shapiro-Wilk warnt ab N > 5000 vor ungenauen p-Werten; für die Zeitmessung irrelevant
+        warnings.simplefilter("ignore")
+        results["statistical_tests"] = timed(lambda: phase_statistics_table(daily_df), repeat)
+
+    # Backups der Messläufe verwerfen, damit große Stufen nicht den Datenträger füllen
+    for name in os.listdir(BKP_DIR):
+        os.remove(os.path.join(BKP_DIR, name))
+    return results
+
+def print_report(results: dict, baseline: dict = None, threshold: float = 0.2) -> int:
+    """Gibt die Ergebnisse als Tabelle aus; mit Baseline zusätzlich das Verhältnis. Liefert die Anzahl Regressionen."""
+    scales = list(results.keys())
+    operations = [op for op in next(iter(results.values())).keys() if op != "rows_daily"]
+    width = 22 if baseline else 14
+    header = f"{'Operation':<20}" + "".join(f"{scale + '×':>{width}}" for scale in scales)
+    print(header)
+    print(f"{'(Zeilen Tageswerte)':<20}" + "".join(f"{results[s]['rows_daily']:>{width}}" for s in scales))
+    print("-" * len(header))
+    regressions = 0
+    for op in operations:
+        line = f"{op:<20}"
+        for scale in scales:
+            value = results[scale][op]
+            cell = f"{value:.1f}"
+            old = (baseline or {}).get(scale, {}).get(op)
+            if old:
+                ratio = value / old
+                flag = "!" if ratio > 1 + threshold else ""
+                regressions += bool(flag)
+                cell += f" ({ratio:.2f}x{flag})"
+            line += f"{cell:>{width}}"
+        print(line)
+    print("\nAngaben in ms (Median). " + ("Verhältnis zur Baseline in Klammern, '!' = Regression." if baseline else ""))
+    return regressions
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Skalierungs-Benchmark mit synthetischen Datensätzen")
+    parser.add_argument("--scales", default=DEFAULT_SCALES, help=f"Kommagetrennte Skalierungsstufen (Standard: {DEFAULT_SCALES})")
+    parser.add_argument("--days", type=int, default=56, help="Tage pro synthetischer Person")
+    parser.add_argument("--repeat", type=int, default=3, help="Wiederholungen pro Operation (Median)")
+    parser.add_argument("--output", help="Ergebnisse als JSON speichern (z.B. als Baseline)")
+    parser.add_argument("--compare", help="Baseline-JSON zum Vergleich")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Toleranz für Regressionen (0.2 = +20 %%)")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        # Datenverzeichnis muss vor dem ersten Import von config gesetzt werden
+        os.environ["ABA_DATA_DIR"] = os.path.join(work_dir, "data")
+        import numpy as np
+        import pandas as pd
+
+        results = {}
+        for scale in [int(s) for s in args.scales.split(",")]:
+            print(f"Skalierung {scale}× ...", file=sys.stderr)
+            results[str(scale)] = bench_scale(scale, args.days, args.repeat, work_dir)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+    regressions = print_report(results, baseline, args.threshold)
+
+    if args.output:
+        meta = {
+            "created": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+            "numpy": np.__version__,
+            "days": args.days,
+            "repeat": args.repeat,
+        }
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"meta": meta, "results": results}, f, indent=2)
+        print(f"Ergebnisse gespeichert: {args.output}")
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,312 @@
+# cli.py
+# ===================================================================
+# Headless-Einstieg für Batch-Jobs (ohne Streamlit):
+#   python cli.py import [DATEIEN ...] [--mapping MAPPING.json] [--overwrite]
+#   python cli.py recompute
+#   python cli.py check
+#   python cli.py export ZIELORDNER [--stats]
+#   python cli.py demo ZIELORDNER [--days N] [--athletes M] [--seed S] [--partition-size P]
+#   python cli.py lab-import BEFUNDE ... --test-date JJJJ-MM-TT --test-type TYP
+#   python cli.py attachments [--migrate] [--gc] [--dry-run]
+#   python cli.py nutrition-pdf ZIEL.pdf [--start JJJJ-MM-TT] [--end JJJJ-MM-TT] [--workers N]
+#   python cli.py report ZIEL.pdf|ZIEL.html [--workers N]
+#   python cli.py nutrition-estimate [--overwrite] [--dry-run]
+#   python cli.py compact
+# Mit --data-dir (oder ABA_DATA_DIR) lässt sich ein anderes Datenverzeichnis nutzen,
+# mit --profile wird ein Zeit-Trace des Laufs geschrieben (siehe profiling.py).
+# ===================================================================
+import argparse
+import glob
+import json
+import os
+import sys
+
+def build_parser() -> argparse.ArgumentParser:
+    """Erstellt den Argument-Parser mit allen Unterbefehlen."""
+    parser = argparse.ArgumentParser(description="ABA Selbsttest – Batch-Werkzeuge (Import, Neuberechnung, Prüfung, Export)")
+    parser.add_argument("--data-dir", help="Datenverzeichnis (Standard: ./data bzw. ABA_DATA_DIR)")
+    parser.add_argument("--profile", action="store_true", help="Zeit-Trace des Laufs in data/profiles schreiben und zusammenfassen")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_import = sub.add_parser("import", help="Tageswerte aus CSV-Dateien importieren")
+    p_import.add_argument("files", nargs="*", help="CSV-Dateien; ohne Angabe wird der Auto-Import-Ordner aus den Einstellungen genutzt")
+    p_import.add_argument("--mapping", help="JSON-Datei mit Spaltenzuordnung {App-Spalte: CSV-Spalte}")
+    p_import.add_argument("--overwrite", action="store_true", help="Vorhandene Einträge (gleiches Datum & Phase) überschreiben")
+
+    sub.add_parser("recompute", help="Alle berechneten Metriken neu berechnen und speichern")
+    sub.add_parser("check", help="Datenbestand auf Konsistenz prüfen (Exit-Code 1 bei Problemen)")
+
+    p_export = sub.add_parser("export", help="Alle Tabellen als CSV exportieren")
+    p_export.add_argument("out_dir", help="Zielordner")
+    p_export.add_argument("--stats", action="store_true", help="Zusätzlich die Phasen-Statistik exportieren")
+
+    p_demo = sub.add_parser("demo", help="Synthetische Demodaten partitionsweise als CSV erzeugen (Lasttests)")
+    p_demo.add_argument("out_dir", help="Zielordner (je Tabelle ein Unterordner mit part-*.csv)")
+    p_demo.add_argument("--days", type=int, default=56, help="Tage pro synthetischer Person")
+    p_demo.add_argument("--athletes", type=int, default=1, help="Anzahl synthetischer Personen")
+    p_demo.add_argument("--seed", type=int, default=42, help="Seed des Zufallsgenerators")
+    p_demo.add_argument("--partition-size", type=int, default=100, help="Personen pro Partition")
+
+    p_lab = sub.add_parser("lab-import", help="Laborbefunde (PDF/Text) auslesen und in einen Bluttest übernehmen")
+    p_lab.add_argument("files", nargs="+", help="Befunddateien")
+    p_lab.add_argument("--test-date", required=True, help="Datum des Bluttests (JJJJ-MM-TT)")
+    p_lab.add_argument("--test-type", default="Baseline (Omnivor)", help="Testtyp des Bluttests")
+
+    p_att = sub.add_parser("attachments", help="Anhänge (Fotos, Labor-PDFs) auswerten, übernehmen und aufräumen")
+    p_att.add_argument("--migrate", action="store_true", help="Anhänge aus den alten Testordnern in den Ablageort übernehmen")
+    p_att.add_argument("--gc", action="store_true", help="Nicht mehr referenzierte Anhänge löschen")
+    p_att.add_argument("--dry-run", action="store_true", help="Mit --gc: nur anzeigen, was gelöscht würde")
+
+    p_pdf = sub.add_parser("nutrition-pdf", help="Ernährungstagebuch als PDF exportieren")
+    p_pdf.add_argument("out_file", help="Ziel-PDF")
+    p_pdf.add_argument("--start", help="Erster Tag (JJJJ-MM-TT)")
+    p_pdf.add_argument("--end", help="Letzter Tag (JJJJ-MM-TT)")
+    p_pdf.add_argument("--workers", type=int, help="Worker-Prozesse (Standard: verfügbare CPUs; 1 = seriell)")
+
+    p_report = sub.add_parser("report", help="Studienbericht (Diagramme, Phasen-Statistik, Tests) als PDF oder HTML")
+    p_report.add_argument("out_file", help="Zieldatei; Format aus der Endung (.pdf oder .html)")
+    p_report.add_argument("--workers", type=int, help="Worker-Prozesse für die Diagramme (Standard: verfügbare CPUs; 1 = seriell)")
+
+    p_est = sub.add_parser("nutrition-estimate", help="Makros im Ernährungstagebuch aus den Mahlzeiten schätzen und nachtragen")
+    p_est.add_argument("--overwrite", action="store_true", help="Auch vorhandene Angaben durch die Schätzung ersetzen")
+    p_est.add_argument("--dry-run", action="store_true", help="Nur anzeigen, wie viele Einträge ergänzt würden")
+
+    sub.add_parser("compact", help="Kleine Monatspartitionen abgeschlossener Jahre zu Jahrespartitionen zusammenlegen")
+    return parser
+
+def _import_files(files):
+    """Liste der zu importierenden Dateien (Argumente oder Auto-Import-Ordner)."""
+    from config import SETTINGS_FILE, DEFAULT_SETTINGS
+    from database import load_json
+
+    if files:
+        return files
+    settings = load_json(SETTINGS_FILE, DEFAULT_SETTINGS)
+    folder = settings.get("watch_folder", "")
+    if not folder:
+        return []
+    return sorted(glob.glob(os.path.join(folder, settings.get("filename_glob", "*.csv"))))
+
+def cmd_import(args) -> int:
+    from config import MAPPING_FILE, DEFAULT_MAPPING
+    from database import load_json, load_data, save_data, compute_metrics
+    from importer import read_csv_flexible, prepare_import_frame, merge_import, default_column_mapping
+
+    files = _import_files(args.files)
+    if not files:
+        print("Keine Dateien zum Importieren gefunden.", file=sys.stderr)
+        return 1
+
+    if args.mapping:
+        with open(args.mapping, "r", encoding="utf-8") as f:
+            saved_mapping = json.load(f)
+    else:
+        saved_mapping = load_json(MAPPING_FILE, DEFAULT_MAPPING)
+
+    df = load_data()
+    total_new, total_updated = 0, 0
+    for path in files:
+        import_df = read_csv_flexible(path)
+        if import_df is None:
+            print(f"{path}: Datei konnte nicht gelesen werden.", file=sys.stderr)
+            return 1
+        column_mapping = {k: v for k, v in saved_mapping.items() if v in import_df.columns} or default_column_mapping(import_df)
+        try:
+            df_to_import, warnings = prepare_import_frame(import_df, column_mapping)
+        except ValueError as e:
+            print(f"{path}: {e}", file=sys.stderr)
+            return 1
+        for warning in warnings:
+            print(f"{path}: {warning}", file=sys.stderr)
+        df, new_count, updated_count = merge_import(df, df_to_import, args.overwrite)
+        total_new += new_count
+        total_updated += updated_count
+        print(f"{path}: {new_count} neu, {updated_count} aktualisiert")
+
+    # Metriken einmal für den gesamten Bestand berechnen und einmal speichern
+    save_data(compute_metrics(df))
+    print(f"Import abgeschlossen: {total_new} neue Einträge, {total_updated} aktualisiert.")
+    return 0
+
+def cmd_recompute(args) -> int:
+    from database import load_data, save_data, compute_metrics
+
+    df = compute_metrics(load_data(), recompute=True)
+    if df.empty:
+        print("Keine Tageswerte vorhanden.")
+        return 0
+    save_data(df.sort_values("date"))
+    print(f"Metriken für {len(df)} Tage neu berechnet.")
+    return 0
+
+def cmd_check(args) -> int:
+    from database import check_integrity
+
+    problems = check_integrity()
+    for problem in problems:
+        print(problem)
+    if problems:
+        print(f"{len(problems)} Problem(e) gefunden.")
+        return 1
+    print("Keine Probleme gefunden.")
+    return 0
+
+def cmd_export(args) -> int:
+    from database import load_data, load_nutrition_data, load_sport_tests_data, load_blood_tests_data, compute_metrics
+
+    os.makedirs(args.out_dir, exist_ok=True)
+    daily_df = compute_metrics(load_data())
+    tables = {
+        "daily_log.csv": daily_df,
+        "nutrition_log.csv": load_nutrition_data(),
+        "sport_tests.csv": load_sport_tests_data(),
+        "blood_tests.csv": load_blood_tests_data(),
+    }
+    for filename, df in tables.items():
+        df.to_csv(os.path.join(args.out_dir, filename), index=False)
+        print(f"{filename}: {len(df)} Zeilen")
+
+    if args.stats:
+        from analysis import phase_statistics_table
+
+        stats_df = phase_statistics_table(daily_df) if not daily_df.empty else None
+        if stats_df is not None and not stats_df.empty:
+            stats_df.to_csv(os.path.join(args.out_dir, "phase_statistics.csv"), index=False)
+            print(f"phase_statistics.csv: {len(stats_df)} Metriken")
+        else:
+            print("Phasen-Statistik: nicht genügend Daten.")
+    return 0
+
+def cmd_demo(args) -> int:
+    from demo_data import write_demo_partitions
+
+    paths = write_demo_partitions(args.out_dir, days=args.days, athletes=args.athletes, seed=args.seed,
+                                  athletes_per_partition=args.partition_size)
+    print(f"{len(paths)} Dateien geschrieben ({args.athletes * args.days} Tageswerte) nach {args.out_dir}")
+    return 0
+
+def cmd_lab_import(args) -> int:
+    from lab_import import submit_lab_report, wait_for_jobs, collect_finished_jobs
+
+    failed = 0
+    for path in args.files:
+        if not os.path.isfile(path):
+            failed += 1
+            print(f"{path}: Datei nicht gefunden.", file=sys.stderr)
+            continue
+        submit_lab_report(path, args.test_date, args.test_type)
+    wait_for_jobs()
+    for summary in collect_finished_jobs():
+        if summary["error"]:
+            failed += 1
+            print(f"{summary['file']}: {summary['error']}", file=sys.stderr)
+            continue
+        print(f"{summary['file']}: {len(summary['applied'])} Werte übernommen, {summary['queued']} zur Prüfung vorgemerkt")
+    return 1 if failed else 0
+
+def cmd_attachments(args) -> int:
+    from attachments import attachment_stats, collect_garbage, migrate_legacy_attachments
+
+    if args.migrate:
+        print(f"{migrate_legacy_attachments()} Verweise in den Ablageort übernommen (Originale bleiben unverändert liegen).")
+    if args.gc:
+        removed = collect_garbage(dry_run=args.dry_run)
+        for path in removed:
+            print(path)
+        print(f"{len(removed)} Dateien {'würden gelöscht' if args.dry_run else 'gelöscht'}.")
+    stats = attachment_stats()
+    print(f"{stats['blobs']} Dateien ({stats['bytes'] / 1e6:.1f} MB), {stats['references']} Verweise, "
+          f"{stats['saved_bytes'] / 1e6:.1f} MB durch Deduplizierung gespart, {stats['unreferenced']} ohne Verweis, "
+          f"{stats['legacy_references']} Verweise auf alte Testordner")
+    return 0
+
+def cmd_nutrition_pdf(args) -> int:
+    import pandas as pd
+    from database import load_nutrition_data
+    from reporting import write_nutrition_pdf
+
+    df = load_nutrition_data()
+    if not df.empty:
+        dates = pd.to_datetime(df["date"])
+        if args.start:
+            df = df[dates >= pd.Timestamp(args.start)]
+        if args.end:
+            df = df[dates[df.index] <= pd.Timestamp(args.end)]
+    if df.empty:
+        print("Keine Ernährungsdaten im gewählten Zeitraum.", file=sys.stderr)
+        return 1
+    df = df.sort_values("date")
+    first, last = pd.to_datetime(df["date"]).iloc[[0, -1]].dt.strftime("%d.%m.%Y")
+    write_nutrition_pdf(df, f"Ernährungstagebuch ({first} - {last})", args.out_file, workers=args.workers)
+    print(f"{args.out_file}: {len(df)} Einträge")
+    return 0
+
+def cmd_report(args) -> int:
+    from study_report import build_study_report
+
+    try:
+        result = build_study_report(args.out_file, workers=args.workers)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 1
+    print(f"{result['path']}: {result['charts']} Diagramme, {result['tables']} Tabellen")
+    for stage, ms in result["timings"].items():
+        print(f"  {stage:<10}{ms:>10.1f} ms")
+    return 0
+
+def cmd_nutrition_estimate(args) -> int:
+    from database import load_nutrition_data, save_nutrition_data
+    from food_parser import backfill_macros
+
+    df, filled = backfill_macros(load_nutrition_data(), overwrite=args.overwrite)
+    if filled and not args.dry_run:
+        save_nutrition_data(df)
+    print(f"{filled} Einträge {'würden ergänzt' if args.dry_run else 'ergänzt'}")
+    return 0
+
+def cmd_compact(args) -> int:
+    from database import PARTITIONED_TABLES, compact_partitions, load_manifest
+
+    for table in PARTITIONED_TABLES:
+        years = compact_partitions(table)
+        partitions = load_manifest(table)["partitions"]
+        print(f"{table}: {len(partitions)} Partitionen"
+              + (f", zusammengelegt: {', '.join(years)}" if years else ", nichts zusammenzulegen"))
+    return 0
+
+COMMANDS = {
+    "import": cmd_import,
+    "recompute": cmd_recompute,
+    "check": cmd_check,
+    "export": cmd_export,
+    "demo": cmd_demo,
+    "lab-import": cmd_lab_import,
+    "attachments": cmd_attachments,
+    "nutrition-pdf": cmd_nutrition_pdf,
+    "report": cmd_report,
+    "nutrition-estimate": cmd_nutrition_estimate,
+    "compact": cmd_compact,
+}
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    # Datenverzeichnis muss vor dem ersten Import von config gesetzt werden
+    if args.data_dir:
+        os.environ["ABA_DATA_DIR"] = os.path.abspath(args.data_dir)
+    if not args.profile:
+        return COMMANDS[args.command](args)
+
+    import profiling
+
+    profiling.begin_rerun(True, label=f"cli {args.command}")
+    try:
+        return COMMANDS[args.command](args)
+    finally:
+        trace = profiling.end_rerun()
+        path = profiling.dump_trace(trace)
+        print(f"\nProfiling ({trace.total_ms:.0f} ms gesamt, Trace: {path}):", file=sys.stderr)
+        for row in profiling.summarize(trace)[:15]:
+            print(f"  {row['span']:<45}{row['calls']:>5}x {row['total_ms']:>10.1f} ms", file=sys.stderr)
+
+if __name__ == "__main__":
+    sys.exit(main())
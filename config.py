@@ -3,25 +3,59 @@ import os
 
 # --- Pfade ---
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-DATA_DIR = os.path.join(BASE_DIR, "data")
+# Datenverzeichnis über ABA_DATA_DIR überschreibbar (z.B. für Batch-Jobs über cli.py)
+DATA_DIR = os.environ.get("ABA_DATA_DIR") or os.path.join(BASE_DIR, "data")
 ASSETS_DIR = os.path.join(BASE_DIR, "assets")
 TRAINING_PHOTOS_DIR = os.path.join(BASE_DIR, "assets", "training_photos") # Wird zwar nicht mehr genutzt, aber belassen
-BKP_DIR = os.path.join(BASE_DIR, "data/backups")
-SPORT_TESTS_DIR = os.path.join(BASE_DIR, "data", "sport_tests")
-BLOOD_TESTS_DIR = os.path.join(BASE_DIR, "data", "blood_tests")
+BKP_DIR = os.path.join(DATA_DIR, "backups")
+SPORT_TESTS_DIR = os.path.join(DATA_DIR, "sport_tests")
+BLOOD_TESTS_DIR = os.path.join(DATA_DIR, "blood_tests")
+PROFILES_DIR = os.path.join(DATA_DIR, "profiles")
+# Anhänge (Fotos, Labor-PDFs) inhaltsadressiert, siehe attachments.py
+ATTACHMENTS_DIR = os.path.join(DATA_DIR, "attachments")
 
 # Dateipfade
 DATA_FILE = os.path.join(DATA_DIR, "daily_log.csv")
 NUTRITION_FILE = os.path.join(DATA_DIR, "nutrition_log.csv")
+# Tageswerte und Ernährung liegen nach Monaten partitioniert (JJJJ-MM.csv) in eigenen Verzeichnissen;
+# manifest.json beschreibt alle Partitionen und dient als Datenstand der Tabelle. Die Einzeldateien
+# oben werden beim ersten Laden einmalig übernommen.
+DATA_PARTITIONS_DIR = os.path.join(DATA_DIR, "daily_log")
+NUTRITION_PARTITIONS_DIR = os.path.join(DATA_DIR, "nutrition_log")
+DATA_MANIFEST_FILE = os.path.join(DATA_PARTITIONS_DIR, "manifest.json")
+NUTRITION_MANIFEST_FILE = os.path.join(NUTRITION_PARTITIONS_DIR, "manifest.json")
+# Schema-Version der Ernährungsdatei (wird bei jedem Speichern mitgeschrieben)
+NUTRITION_SCHEMA_FILE = os.path.join(DATA_DIR, "nutrition_log.schema.json")
+# Eigene Lebensmittel für die Nährwert-Schätzung (ergänzt die eingebaute Tabelle in food_parser.py)
+FOOD_TABLE_FILE = os.path.join(DATA_DIR, "food_table.csv")
 SETTINGS_FILE = os.path.join(DATA_DIR, "settings.json")
 MAPPING_FILE = os.path.join(DATA_DIR, "col_mapping.json")
 GOALS_FILE = os.path.join(DATA_DIR, "goals.json")
 SPORT_TESTS_FILE = os.path.join(DATA_DIR, "sport_tests.csv")
 BLOOD_TESTS_FILE = os.path.join(DATA_DIR, "blood_tests.csv")
+# Testtabellen im Langformat (die breiten Dateien oben werden nur noch einmalig migriert)
+SPORT_TESTS_LONG_FILE = os.path.join(DATA_DIR, "sport_tests_long.csv")
+BLOOD_TESTS_LONG_FILE = os.path.join(DATA_DIR, "blood_tests_long.csv")
+# Ausgelesene Laborbefunde (Cache je Datei-Hash) und Prüfliste unsicherer Werte
+LAB_IMPORT_CACHE_DIR = os.path.join(DATA_DIR, "lab_import_cache")
+LAB_REVIEW_FILE = os.path.join(DATA_DIR, "lab_review_queue.json")
+# Zwischengespeicherte Auswertungen (je Datenstand, können jederzeit gelöscht werden)
+CACHE_DIR = os.path.join(DATA_DIR, "cache")
+PHASE_STATS_CACHE_FILE = os.path.join(CACHE_DIR, "phase_statistics.json")
+# Spaltenablage geladener Tabellen (table_cache.py), von allen Prozessen per mmap geteilt
+TABLE_CACHE_DIR = os.path.join(CACHE_DIR, "tables")
 
-# Stellen sicher, dass die Verzeichnisse existieren
-for path in [DATA_DIR, ASSETS_DIR, TRAINING_PHOTOS_DIR, BKP_DIR, SPORT_TESTS_DIR, BLOOD_TESTS_DIR]:
-    os.makedirs(path, exist_ok=True)
+# Verzeichnisse werden erst beim ersten Schreibzugriff angelegt (nicht schon beim Import)
+_directories_ready = False
+
+def ensure_directories() -> None:
+    """Stellt sicher, dass die Verzeichnisse existieren (einmal pro Prozess)."""
+    global _directories_ready
+    if _directories_ready:
+        return
+    for path in [DATA_DIR, ASSETS_DIR, TRAINING_PHOTOS_DIR, BKP_DIR, SPORT_TESTS_DIR, BLOOD_TESTS_DIR]:
+        os.makedirs(path, exist_ok=True)
+    _directories_ready = True
 
 # --- Spaltendefinitionen für Tageswerte ---
 COLUMNS = [
@@ -51,6 +85,16 @@ NUTRITION_COLUMNS = [
     "intake_kcal", "carbs_g", "protein_g", "fat_g", "water_ml",
     "last_modified"
 ]
+# Zeilen je Block beim Schreiben von Tageswerten und Ernährung (Einheit des Lesens in database.query)
+QUERY_BLOCK_ROWS = 512
+# Monate eines abgeschlossenen Jahres mit zusammen höchstens so vielen Zeilen werden zu einer
+# Jahrespartition (JJJJ.csv) zusammengelegt
+PARTITION_COMPACT_ROWS = 1000
+# Schema 1: Spalten des früheren eigenen Tagebuchs (nutrition_diary.py) -> Schema 2 (NUTRITION_COLUMNS)
+NUTRITION_SCHEMA_VERSION = 2
+NUTRITION_LEGACY_COLUMNS = {
+    "fruehstueck": "breakfast", "mittag": "lunch", "abend": "dinner", "snacks": "snack_1", "notizen": "nutrition_note",
+}
 
 # --- Spaltendefinitionen für Sporttests ---
 SPORT_TESTS_COLUMNS = [
@@ -72,6 +116,19 @@ SPORT_TESTS_COLUMNS = [
     "last_modified"
 ]
 
+# Dauer-Spalten der Sporttests werden als ganze Sekunden gespeichert (Anzeige als M:SS erst in der UI)
+SPORT_DURATION_COLUMNS = ["run5k_time", "plank_time", "vo2max_duration"]
+
+# Hauptkennzahl je Testdisziplin für Verlaufsauswertungen: Disziplin -> (Spalte, Titel, höher = besser)
+SPORT_PROGRESSION_METRICS = {
+    "cooper": ("cooper_distance", "Cooper-Test (Distanz, m)", True),
+    "run5k": ("run5k_time", "5-km-Lauf (Zeit)", False),
+    "pushups": ("pushups_reps", "Liegestütze (Wdh.)", True),
+    "plank": ("plank_time", "Plank (Haltezeit)", True),
+    "burpee": ("burpee_reps", "Burpees (Wdh.)", True),
+    "vo2max": ("vo2max_value", "VO2max (ml/kg/min)", True),
+}
+
 # --- Spaltendefinitionen für Bluttests ---
 BLOOD_TESTS_COLUMNS = [
     "test_date", "test_type", "notes", "pdf_file",
@@ -87,13 +144,43 @@ BLOOD_TESTS_COLUMNS = [
     "sodium", "calcium", "potassium",
     # Schilddrüsenhormone
     "tsh_basal",
-    # Harnbefund
+    # Hämatokrit (Blutbild)
     "hk",
     "last_modified"
 ]
 
+# --- Langformat der Testtabellen: eine Zeile je (Testdatum, Testtyp, Messgröße) ---
+# Zahlen stehen in "value", Texte (Notizen, Dateipfade, ...) in "text". Neue Messgrößen
+# brauchen keine Schemaänderung; die breite Sicht entsteht per Pivot beim Laden.
+TEST_KEY_COLUMNS = ["test_date", "test_type"]
+LONG_TEST_COLUMNS = ["test_date", "test_type", "measure", "value", "text", "unit"]
+TEST_TEXT_MEASURES = [
+    "general_notes", "notes", "pdf_file", "vo2max_speed", "last_modified",
+    "cooper_photo", "run5k_photo", "pushups_photo", "plank_photo", "burpee_photo", "vo2max_photo",
+]
+
+# Einheiten je Messgröße (wie in den Formularen)
+SPORT_TEST_UNITS = {
+    "cooper_distance": "m", "cooper_pace": "min/km", "cooper_kcal": "kcal",
+    "run5k_time": "s", "run5k_pace": "min/km", "run5k_kcal": "kcal",
+    "pushups_reps": "Wdh.", "plank_time": "s", "burpee_reps": "Wdh.",
+    "vo2max_value": "ml/kg/min", "vo2max_duration": "s",
+    **{f"{test}_{zone}": "min" for test in ["cooper", "run5k"] for zone in ["warmup", "aerob", "anaerob", "intensive"]},
+    **{f"{test}_{hr}": "bpm" for test in ["cooper", "run5k", "pushups", "plank", "burpee", "vo2max"] for hr in ["avg_hr", "max_hr"]},
+}
+BLOOD_TEST_UNITS = {
+    "hemoglobin": "g/dl", "erythrocytes": "Mio/µl", "mcv": "fl", "mch": "pg", "thrombocytes": "10⁹/l",
+    "leukocytes": "10⁹/l", "segment": "%", "monocytes": "%", "lymphocytes": "%", "basophils": "%", "eosinophils": "%",
+    "alat": "U/l", "asat": "U/l", "creatinine": "mg/dl", "egfr": "ml/min", "iron": "µg/dl",
+    "transferrin_saturation": "%", "gamma_gt": "U/l", "ap": "U/l", "iron_saturation": "µg/dl", "ebk": "µg/dl",
+    "ferritin": "ng/ml", "transferrin": "mg/dl", "cholesterol": "mg/dl", "triglycerides": "mg/dl", "ldl_chol": "mg/dl",
+    "sodium": "mmol/l", "calcium": "mmol/l", "potassium": "mmol/l", "tsh_basal": "uU/ml", "hk": "l/l",
+}
+
 # --- Standardwerte ---
-DEFAULT_SETTINGS = {"auto_import_enabled": False, "watch_folder": "", "filename_glob": "*.csv", "mapping_saved": False}
+DEFAULT_SETTINGS = {"auto_import_enabled": False, "watch_folder": "", "filename_glob": "*.csv", "mapping_saved": False,
+                    "profiling_enabled": False, "profiling_dump": False,
+                    "reference_sex": "m", "reference_age": 35}
 DEFAULT_MAPPING = {}
 DEFAULT_GOALS = {
     "sleep_hours_goal": 8.0,
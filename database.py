@@ -1,11 +1,22 @@
 # database.py
 import pandas as pd
 import numpy as np
+import functools
+import hashlib
+import io
 import json
 import os
+import shutil
+import sys
 from datetime import datetime, date
 from config import *
+from profiling import profiled, span
 
+if int(pd.__version__.split(".")[0]) < 3:
+    # Flache Kopien (copy(deep=False), Snapshots) sind nur mit Copy-on-Write unabhängig; ab pandas 3 immer aktiv
+    pd.set_option("mode.copy_on_write", True)
+
+@profiled
 def load_json(path: str, default: dict) -> dict:
     """Lädt eine JSON-Datei oder erstellt sie mit Standardwerten."""
     try:
@@ -15,31 +26,55 @@ def load_json(path: str, default: dict) -> dict:
         save_json(path, default)
         return default
 
+@profiled
 def save_json(path: str, obj: dict) -> None:
     """Speichert ein Objekt in einer JSON-Datei."""
+    ensure_directories()
     with open(path, "w", encoding="utf-8") as f:
         json.dump(obj, f, indent=2, ensure_ascii=False)
 
+@profiled
+def table_version(path: str):
+    """Datenstand einer Datei als (Änderungszeit in ns, Größe); None, wenn sie nicht existiert.
+
+    Dient als Cache-Schlüssel für abgeleitete Auswertungen.
+    """
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+@profiled
 def empty_df() -> pd.DataFrame:
     """Erstellt einen leeren DataFrame mit den korrekten Spalten."""
     return pd.DataFrame(columns=COLUMNS)
 
+@profiled
 def empty_nutrition_df() -> pd.DataFrame:
     """Erstellt einen leeren DataFrame für das Ernährungstagebuch."""
     return pd.DataFrame(columns=NUTRITION_COLUMNS)
 
+@profiled
 def empty_sport_tests_df() -> pd.DataFrame:
     """Erstellt einen leeren DataFrame für die Sporttests."""
     return pd.DataFrame(columns=SPORT_TESTS_COLUMNS)
 
+@profiled
 def empty_blood_tests_df() -> pd.DataFrame:
     """Erstellt einen leeren DataFrame für die Bluttests."""
     return pd.DataFrame(columns=BLOOD_TESTS_COLUMNS)
 
+@profiled
 def load_data() -> pd.DataFrame:
-    """Lädt die Hauptdaten aus der CSV-Datei."""
-    if os.path.exists(DATA_FILE):
-        df = pd.read_csv(DATA_FILE)
+    """Lädt die Hauptdaten aus den Monatspartitionen (Zahlenspalten aus der binären Spaltenablage).
+
+    In df.attrs steht der Stand der gespeicherten Metriken (Formelversionen, Fingerabdrücke; für compute_metrics).
+    """
+    derived = load_manifest("daily").get("derived", {})
+    df = read_table("daily")
+    if df is not None:
+        _set_derived_state(df, derived)
         if not df.empty:
             df["date"] = pd.to_datetime(df["date"]).dt.date
             
@@ -51,98 +86,720 @@ def load_data() -> pd.DataFrame:
         return df
     return empty_df()
 
+def _nutrition_schema_version() -> int:
+    """Gespeicherte Schema-Version der Ernährungsdatei (1, wenn noch keine vermerkt ist)."""
+    try:
+        with open(NUTRITION_SCHEMA_FILE, "r", encoding="utf-8") as f:
+            return int(json.load(f).get("schema_version", 1))
+    except (FileNotFoundError, json.JSONDecodeError, ValueError):
+        return 1
+
+@functools.lru_cache(maxsize=1)
+def _nutrition_table_for_version(version) -> pd.DataFrame:
+    df = read_partitions("nutrition")
+    if df is None:
+        return empty_nutrition_df()
+    # Einmalige Migration älterer Dateien; danach genügt der Blick auf die Versionsdatei
+    if _nutrition_schema_version() < NUTRITION_SCHEMA_VERSION or not set(NUTRITION_LEGACY_COLUMNS).isdisjoint(df.columns):
+        df, migrated = migrate_nutrition_columns(df)
+        if migrated:
+            save_nutrition_data(df)
+        else:
+            save_json(NUTRITION_SCHEMA_FILE, {"schema_version": NUTRITION_SCHEMA_VERSION})
+    if not df.empty:
+        df["date"] = pd.to_datetime(df["date"]).dt.date
+
+    # Neue Felder mit Standardwerten initialisieren, falls nicht vorhanden
+    for col in NUTRITION_COLUMNS:
+        if col not in df.columns:
+            df[col] = None
+    return df
+
+@profiled
 def load_nutrition_data() -> pd.DataFrame:
-    """Lädt die Ernährungsdaten aus der CSV-Datei."""
-    if os.path.exists(NUTRITION_FILE):
-        df = pd.read_csv(NUTRITION_FILE)
-        if not df.empty:
-            df["date"] = pd.to_datetime(df["date"]).dt.date
-            
-            # Neue Felder mit Standardwerten initialisieren, falls nicht vorhanden
-            for col in NUTRITION_COLUMNS:
-                if col not in df.columns:
-                    df[col] = None
-                    
-        return df
-    return empty_nutrition_df()
+    """Lädt die Ernährungsdaten aus den Monatspartitionen.
+
+    Die Partitionen werden nur einmal je Datenstand (Manifest) gelesen; jeder Aufruf erhält eine eigene
+    flache Kopie (Änderungen kopieren per Copy-on-Write nur die betroffenen Spalten).
+    """
+    load_manifest("nutrition")
+    version = table_version(NUTRITION_MANIFEST_FILE)
+    if version is None:
+        return empty_nutrition_df()
+    return _nutrition_table_for_version(version).copy(deep=False)
+
+@profiled
+def migrate_nutrition_columns(df: pd.DataFrame):
+    """Überführt Spalten des alten Tagebuch-Schemas (fruehstueck, mittag, ...) in NUTRITION_COLUMNS.
+
+    Stehen beide Varianten in der Datei, bleibt ein belegter neuer Wert erhalten. "snacks" wird zu
+    snack_1. Gibt (DataFrame, True falls Spalten umgestellt wurden) zurück.
+    """
+    legacy = [col for col in NUTRITION_LEGACY_COLUMNS if col in df.columns]
+    if not legacy:
+        return df, False
+    df = df.copy(deep=False)
+    for old in legacy:
+        new = NUTRITION_LEGACY_COLUMNS[old]
+        if new in df.columns:
+            current = df[new]
+            filled = current.notna() & (current.astype("string").str.strip() != "")
+            df[new] = current.where(filled, df[old])
+        else:
+            df[new] = df[old]
+    df = df.drop(columns=legacy)
+    ordered = [col for col in NUTRITION_COLUMNS if col in df.columns]
+    return df[ordered + [col for col in df.columns if col not in ordered]], True
+
+@profiled
+def wide_to_long(df: pd.DataFrame, units: dict) -> pd.DataFrame:
+    """Wandelt eine breite Testtabelle ins Langformat um (nur belegte Zellen, Zahlen in "value", Texte in "text")."""
+    if df.empty:
+        return pd.DataFrame(columns=LONG_TEST_COLUMNS)
+    measures = [c for c in df.columns if c not in TEST_KEY_COLUMNS]
+
+    # Messgröße gilt als Zahl, wenn alle belegten Werte numerisch sind (Textspalten ausgenommen)
+    numbers = {}
+    for measure in measures:
+        if measure in TEST_TEXT_MEASURES:
+            continue
+        col = df[measure]
+        if not pd.api.types.is_numeric_dtype(col):
+            converted = pd.to_numeric(col, errors="coerce")
+            if converted.notna().sum() != col.notna().sum():
+                continue
+            col = converted
+        numbers[measure] = col.to_numpy(dtype=float)
+    number_measures = list(numbers)
+    text_measures = [m for m in measures if m not in numbers]
+
+    # Zahlen: ein Block für alle Spalten, belegte Zellen spaltenweise (Messgröße für Messgröße)
+    grid = np.column_stack([numbers[m] for m in number_measures]) if number_measures else np.empty((len(df), 0))
+    number_cols, number_rows = np.nonzero(~np.isnan(grid.T))
+
+    # Texte: belegte, nicht-leere Zellen
+    text_grid = df[text_measures].to_numpy(dtype=object)
+    text_rows, text_cols = np.nonzero(pd.notna(text_grid))
+    text_cells = np.array([str(v) for v in text_grid[text_rows, text_cols]], dtype=object)
+    non_empty = text_cells != ""
+    text_rows, text_cols, text_cells = text_rows[non_empty], text_cols[non_empty], text_cells[non_empty]
+
+    rows = np.concatenate([number_rows, text_rows])
+    measure_names = np.concatenate([np.asarray(number_measures, dtype=object)[number_cols],
+                                    np.asarray(text_measures, dtype=object)[text_cols]])
+    dates = pd.to_datetime(df["test_date"]).dt.strftime("%Y-%m-%d").to_numpy(dtype=object)
+    return pd.DataFrame({
+        "test_date": dates[rows],
+        "test_type": df["test_type"].to_numpy(dtype=object)[rows],
+        "measure": measure_names,
+        "value": np.concatenate([grid[number_rows, number_cols], np.full(len(text_rows), np.nan)]),
+        "text": np.concatenate([np.full(len(number_rows), None, dtype=object), text_cells]),
+        "unit": np.array([units.get(m) for m in measure_names], dtype=object),
+    })
+
+@profiled
+def long_to_wide(long: pd.DataFrame, columns: list) -> pd.DataFrame:
+    """Pivot-Sicht: baut aus dem Langformat wieder die breite Tabelle (Schema-Spalten zuerst, dann neue Messgrößen)."""
+    if long.empty:
+        return pd.DataFrame(columns=columns)
+    dates = long["test_date"].to_numpy(dtype=object)
+    types = long["test_type"].to_numpy(dtype=object)
+    row_codes, _ = pd.factorize(long["test_date"].astype(str) + "\x1f" + long["test_type"].astype(str))
+    measure_codes, measures = pd.factorize(long["measure"])
+    n_rows, n_measures = row_codes.max() + 1, len(measures)
+    # Erste Langzeile je Test liefert Datum und Testtyp der breiten Zeile
+    _, first = np.unique(row_codes, return_index=True)
+
+    # Mehrfach gespeicherte Zellen: die letzte gewinnt
+    cell = row_codes * n_measures + measure_codes
+    _, last_reversed = np.unique(cell[::-1], return_index=True)
+    keep = len(cell) - 1 - last_reversed
+    row_codes, measure_codes = row_codes[keep], measure_codes[keep]
+
+    # Zellen direkt in Zahlen- und Textmatrix eintragen (eine Zeile je Test, eine Spalte je Messgröße)
+    value_grid = np.full((n_rows, n_measures), np.nan)
+    value_grid[row_codes, measure_codes] = long["value"].to_numpy(dtype=float)[keep]
+    text_values = long["text"].to_numpy(dtype=object)[keep]
+    has_text = pd.notna(text_values)
+    text_grid = np.full((n_rows, n_measures), None, dtype=object)
+    text_grid[row_codes[has_text], measure_codes[has_text]] = text_values[has_text]
+    is_text = np.zeros(n_measures, dtype=bool)
+    is_text[measure_codes[has_text]] = True
+
+    # Zeilen nach Datum und Testtyp sortieren (wie die frühere breite Datei)
+    row_dates, row_types = dates[first], types[first]
+    order = np.lexsort((row_types.astype(str), row_dates.astype(str)))
+
+    data = {"test_date": row_dates[order], "test_type": row_types[order]}
+    for pos, measure in enumerate(measures):
+        if is_text[pos]:
+            data[measure] = text_grid[order, pos]
+            continue
+        numbers = value_grid[order, pos]
+        # Vollständig ganzzahlige Messgrößen wieder als int64 (wie beim Einlesen der breiten CSV)
+        complete = not np.isnan(numbers).any()
+        data[measure] = numbers.astype("int64") if complete and (numbers % 1 == 0).all() else numbers
+    extra = sorted(c for c in data if c not in columns)
+    for col in columns:
+        data.setdefault(col, None)
+    return pd.DataFrame({col: data[col] for col in columns + extra})
+
+@profiled
+def read_long_table(path: str, measures=None, chunksize: int = 100_000) -> pd.DataFrame:
+    """Liest eine Testtabelle im Langformat; mit `measures` werden nur diese Zeilen behalten (chunkweise)."""
+    dtypes = {"test_type": "str", "measure": "str", "value": "float64", "text": "str", "unit": "str"}
+    if measures is None:
+        return pd.read_csv(path, dtype=dtypes, float_precision="round_trip")
+    reader = pd.read_csv(path, dtype=dtypes, float_precision="round_trip", chunksize=chunksize)
+    chunks = [chunk[chunk["measure"].isin(measures)] for chunk in reader]
+    return pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame(columns=LONG_TEST_COLUMNS)
+
+@profiled
+def load_test_table(long_file: str, wide_file: str, columns: list, save_func):
+    """Lädt eine Testtabelle als breite Sicht; None, wenn noch nichts gespeichert wurde.
+
+    Eine vorhandene breite Datei aus älteren Versionen wird einmalig ins Langformat übernommen
+    und anschließend in den Backup-Ordner verschoben.
+    """
+    if not os.path.exists(long_file) and os.path.exists(wide_file):
+        save_func(pd.read_csv(wide_file, float_precision="round_trip"))
+        ts = datetime.now().strftime("%Y%m%d_%H%M%S")
+        name = os.path.splitext(os.path.basename(wide_file))[0]
+        os.replace(wide_file, os.path.join(BKP_DIR, f"{name}_wide_{ts}.csv"))
+    if not os.path.exists(long_file):
+        return None
+    return long_to_wide(read_long_table(long_file), columns)
+
+@profiled
+def load_test_history(kind: str, measures) -> pd.DataFrame:
+    """Verlauf einzelner Messgrößen (z.B. kind="blood", measures=["ferritin"]) direkt aus dem Langformat.
+
+    Gibt test_date, test_type, measure, value, text, unit sortiert nach Datum zurück.
+    """
+    path = {"sport": SPORT_TESTS_LONG_FILE, "blood": BLOOD_TESTS_LONG_FILE}[kind]
+    measures = [measures] if isinstance(measures, str) else list(measures)
+    if not os.path.exists(path):
+        return pd.DataFrame(columns=LONG_TEST_COLUMNS)
+    history = read_long_table(path, measures)
+    history["test_date"] = pd.to_datetime(history["test_date"]).dt.date
+    return history.sort_values(["measure", "test_date"], kind="stable").reset_index(drop=True)
+
+# Tabellen für query(): Name -> (Datei bzw. Manifest, Datumsspalte, Phasen-/Testtyp-Spalte, Langformat)
+QUERY_TABLES = {
+    "daily": (DATA_MANIFEST_FILE, "date", "phase", False),
+    "nutrition": (NUTRITION_MANIFEST_FILE, "date", "phase", False),
+    "sport": (SPORT_TESTS_LONG_FILE, "test_date", "test_type", True),
+    "blood": (BLOOD_TESTS_LONG_FILE, "test_date", "test_type", True),
+}
+
+def _as_date(value) -> date:
+    return pd.Timestamp(value).date() if value is not None else None
+
+@profiled
+def query(table: str, columns=None, date_range=None, phase: str = None) -> pd.DataFrame:
+    """Liest nur die benötigten Spalten und Zeilen einer gespeicherten Tabelle.
+
+    - table: "daily", "nutrition", "sport" oder "blood"
+    - columns: gewünschte Spalten bzw. Messgrößen (Datum und Phase/Testtyp sind immer dabei); None = alle
+    - date_range: (von, bis) inklusive, einzelne Grenzen dürfen None sein
+    - phase: Phase (Tageswerte, Ernährung) bzw. Testtyp (Sport-/Bluttests)
+
+    Tageswerte und Ernährung werden nur aus den Partitionen des Zeitraums gelesen und darin über den
+    Blockindex nur passende Byte-Bereiche (nur gewünschte Spalten); die Testtabellen über die Messgrößen
+    im Langformat. Fehlende Spalten werden leer ergänzt. Datumswerte sind datetime.date wie bei den
+    load_*-Funktionen.
+    """
+    path, date_col, key_col, is_long = QUERY_TABLES[table]
+    start, end = (_as_date(d) for d in (date_range or (None, None)))
+    wanted = None if columns is None else list(dict.fromkeys([date_col, key_col, *columns]))
+    if is_long:
+        if table_version(path) is None:
+            return pd.DataFrame(columns=wanted or [date_col, key_col])
+        long = read_long_table(path, measures=None if columns is None else list(columns))
+        df = long_to_wide(long, wanted or [date_col, key_col])
+    else:
+        df = read_partitions(table, (start, end), phase, usecols=None if wanted is None else (lambda c: c in wanted))
+        if df is None:
+            return pd.DataFrame(columns=wanted or [date_col, key_col])
+    if df.empty:
+        return pd.DataFrame(columns=wanted or df.columns)
 
+    df[date_col] = pd.to_datetime(df[date_col]).dt.date
+    mask = np.ones(len(df), dtype=bool)
+    if start is not None:
+        mask &= (df[date_col] >= start).to_numpy()
+    if end is not None:
+        mask &= (df[date_col] <= end).to_numpy()
+    if phase is not None:
+        mask &= (df[key_col] == phase).to_numpy()
+    df = df[mask].reset_index(drop=True)
+    for col in wanted or []:
+        if col not in df.columns:
+            df[col] = np.nan
+    return df[wanted] if wanted else df
+
+@profiled
 def load_sport_tests_data() -> pd.DataFrame:
-    """Lädt die Sporttest-Daten aus der CSV-Datei."""
-    if os.path.exists(SPORT_TESTS_FILE):
-        df = pd.read_csv(SPORT_TESTS_FILE)
-        if not df.empty:
-            df["test_date"] = pd.to_datetime(df["test_date"]).dt.date
-            
-            # Neue Felder mit Standardwerten initialisieren, falls nicht vorhanden
-            for col in SPORT_TESTS_COLUMNS:
-                if col not in df.columns:
-                    df[col] = None
-                    
-        return df
-    return empty_sport_tests_df()
+    """Lädt die Sporttest-Daten (Pivot-Sicht auf das Langformat)."""
+    df = load_test_table(SPORT_TESTS_LONG_FILE, SPORT_TESTS_FILE, SPORT_TESTS_COLUMNS, save_sport_tests_data)
+    if df is None:
+        return empty_sport_tests_df()
+    if not df.empty:
+        df["test_date"] = pd.to_datetime(df["test_date"]).dt.date
+
+        # Einmalige Migration: alte "M:SS"-Texte in ganze Sekunden umwandeln und zurückschreiben
+        df, migrated = migrate_sport_durations(df)
+        if migrated:
+            save_sport_tests_data(df)
+    return df
+
+@profiled
+def parse_durations(values: pd.Series) -> pd.Series:
+    """Wandelt Dauerangaben ('M:SS', 'H:MM:SS' oder Sekunden) vektorisiert in ganze Sekunden um (Int64)."""
+    if pd.api.types.is_numeric_dtype(values):
+        return values.round().astype("Int64")
+    text = values.astype("string").str.strip()
+    parts = text.str.extract(r"^(?:(\d+):)?(\d+):(\d+(?:\.\d+)?)$").apply(pd.to_numeric)
+    clock = parts[0].fillna(0) * 3600 + parts[1] * 60 + parts[2]
+    # Reine Zahlen gelten bereits als Sekunden
+    seconds = clock.fillna(pd.to_numeric(text, errors="coerce"))
+    return seconds.round().astype("Int64")
+
+@profiled
+def migrate_sport_durations(df: pd.DataFrame):
+    """Stellt die Dauer-Spalten der Sporttests auf ganze Sekunden um.
+
+    Gibt (DataFrame, True falls Textwerte umgewandelt wurden) zurück.
+    """
+    migrated = False
+    for col in SPORT_DURATION_COLUMNS:
+        if col not in df.columns:
+            continue
+        if not pd.api.types.is_numeric_dtype(df[col]) and df[col].notna().any():
+            migrated = True
+        df[col] = parse_durations(df[col])
+    return df, migrated
 
+@profiled
 def load_blood_tests_data() -> pd.DataFrame:
-    """Lädt die Bluttest-Daten aus der CSV-Datei."""
-    if os.path.exists(BLOOD_TESTS_FILE):
-        df = pd.read_csv(BLOOD_TESTS_FILE)
-        if not df.empty:
-            df["test_date"] = pd.to_datetime(df["test_date"]).dt.date
-            
-            # Neue Felder mit Standardwerten initialisieren, falls nicht vorhanden
-            for col in BLOOD_TESTS_COLUMNS:
-                if col not in df.columns:
-                    df[col] = None
-                    
-        return df
-    return empty_blood_tests_df()
+    """Lädt die Bluttest-Daten (Pivot-Sicht auf das Langformat)."""
+    df = load_test_table(BLOOD_TESTS_LONG_FILE, BLOOD_TESTS_FILE, BLOOD_TESTS_COLUMNS, save_blood_tests_data)
+    if df is None:
+        return empty_blood_tests_df()
+    if not df.empty:
+        df["test_date"] = pd.to_datetime(df["test_date"]).dt.date
+    return df
 
-def save_data(df: pd.DataFrame) -> None:
-    """Speichert den DataFrame in der CSV-Datei und erstellt ein Backup."""
-    d = df.copy()
-    if not d.empty:
-        d["date"] = pd.to_datetime(d["date"]).dt.strftime("%Y-%m-%d")
-    d.to_csv(DATA_FILE, index=False)
-    
-    # Backup erstellen
+# --- Partitionierte Tabellen (Tageswerte, Ernährung) ---
+# Name -> (Partitionsverzeichnis, Manifest, frühere Einzeldatei, Name für Backups)
+PARTITIONED_TABLES = {
+    "daily": (DATA_PARTITIONS_DIR, DATA_MANIFEST_FILE, DATA_FILE, "daily_log"),
+    "nutrition": (NUTRITION_PARTITIONS_DIR, NUTRITION_MANIFEST_FILE, NUTRITION_FILE, "nutrition_log"),
+}
+PARTITION_FORMAT = 1
+# Zeilen ohne gültiges Datum
+UNDATED_PARTITION = "ohne-datum"
+
+def partition_keys(dates: pd.Series, years=None) -> pd.Series:
+    """Partition je Datumstext (JJJJ-MM-TT): "JJJJ-MM", für zusammengelegte Jahre "JJJJ".
+
+    `years`: Jahre, die als Jahrespartition geführt werden; ohne Angabe gilt die Regel fürs
+    vollständige Speichern (abgeschlossenes Jahr mit höchstens PARTITION_COMPACT_ROWS Zeilen).
+    """
+    dates = dates.fillna("").astype(str)
+    year_of = dates.str[:4]
+    if years is None:
+        current = str(date.today().year)
+        years = {year for year, rows in year_of.value_counts().items()
+                 if year and year < current and rows <= PARTITION_COMPACT_ROWS}
+    keys = dates.str[:7].where(~year_of.isin(list(years)), year_of)
+    return keys.mask(dates.str.len() < 10, UNDATED_PARTITION)
+
+def partition_range(key: str):
+    """Erster und letzter Tag einer Partition (datetime.date); None für Zeilen ohne Datum."""
+    if key == UNDATED_PARTITION:
+        return None
+    period = pd.Period(key, freq="Y" if len(key) == 4 else "M")
+    return period.start_time.date(), period.end_time.date()
+
+def _read_manifest(table: str) -> dict:
+    manifest_file = PARTITIONED_TABLES[table][1]
+    version = table_version(manifest_file)
+    if version is None:
+        return {"format": PARTITION_FORMAT, "partitions": {}}
+    return _manifest_for_version(manifest_file, version)
+
+@functools.lru_cache(maxsize=4)
+def _manifest_for_version(path: str, version) -> dict:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def _wait_for_queued_writes(table: str) -> None:
+    """Wartet auf ausstehende Hintergrund-Schreibaufträge der Tabelle (nur wenn write_queue genutzt wird)."""
+    write_queue = sys.modules.get("write_queue")
+    if write_queue is not None:
+        write_queue.wait(table)
+
+@profiled
+def load_manifest(table: str) -> dict:
+    """Manifest einer partitionierten Tabelle: {"partitions": {Partition: Eintrag}} (nicht verändern).
+
+    Je Partition stehen Datei, Zeilenzahl, Inhalts-Hash, Dateistand und Blockindex im Manifest.
+    Liegt noch die frühere Einzeldatei vor, wird sie beim ersten Aufruf in Partitionen übernommen.
+    """
+    directory, manifest_file, legacy_file, name = PARTITIONED_TABLES[table]
+    _wait_for_queued_writes(table)
+    if not os.path.exists(manifest_file) and os.path.exists(legacy_file):
+        # Texte unverändert übernehmen (keine Typ-Erkennung), Datei danach ins Backup verschieben
+        ensure_directories()
+        write_partitions(table, pd.read_csv(legacy_file, dtype=str, keep_default_na=False))
+        ts = datetime.now().strftime("%Y%m%d_%H%M%S")
+        os.replace(legacy_file, os.path.join(BKP_DIR, f"{name}_single_{ts}.csv"))
+    return _read_manifest(table)
+
+def _partition_hash(columns, row_hashes: np.ndarray) -> str:
+    """Inhalts-Hash einer Partition aus Spaltennamen und den Zeilen-Hashes ihrer Zeilen."""
+    digest = hashlib.sha1("\x1f".join(map(str, columns)).encode("utf-8"))
+    digest.update(row_hashes.tobytes())
+    return digest.hexdigest()
+
+@profiled
+def write_csv_blocks(d: pd.DataFrame, path: str, date_col: str = "date", key_col: str = "phase") -> list:
+    """Schreibt eine nach Datum sortierte Tabelle in Blöcken zu QUERY_BLOCK_ROWS Zeilen.
+
+    Gibt je Block [Byte-Offset, Größe, erstes/letztes Datum, enthaltene Phasen] zurück, damit
+    query() nur die passenden Blöcke liest. `d` hat Datumstexte (JJJJ-MM-TT). Die Datei wird erst
+    nach vollständigem Schreiben an ihren Platz verschoben.
+    """
+    dates = d[date_col].fillna("").astype(str).to_numpy() if date_col in d.columns else None
+    keys = d[key_col].fillna("").astype(str).to_numpy() if key_col in d.columns else None
+    blocks = []
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        offset = f.write(d.iloc[:0].to_csv(index=False).encode("utf-8"))
+        for start in range(0, len(d), QUERY_BLOCK_ROWS):
+            end = min(start + QUERY_BLOCK_ROWS, len(d))
+            size = f.write(d.iloc[start:end].to_csv(index=False, header=False).encode("utf-8"))
+            if dates is not None:
+                block_keys = sorted(set(keys[start:end])) if keys is not None else []
+                blocks.append([offset, size, dates[start], dates[end - 1], block_keys])
+            offset += size
+    os.replace(tmp_path, path)
+    return blocks
+
+@profiled
+def write_partitions(table: str, d: pd.DataFrame, keys: list = None, years=None, derived: dict = None) -> list:
+    """Schreibt Zeilen einer partitionierten Tabelle; `d` hat Datumstexte (JJJJ-MM-TT).
+
+    Ohne `keys` ist `d` die ganze Tabelle, nicht mehr belegte Partitionen werden gelöscht. Mit
+    `keys` enthält `d` genau die Zeilen dieser Partitionen, alle anderen bleiben unberührt.
+    Partitionen mit unverändertem Inhalt (Hash im Manifest) werden nicht neu geschrieben.
+    `years` legt die Jahrespartitionen fest (Standard: siehe partition_keys bzw. bei `keys` die
+    bestehenden). `derived` ist der Stand der abgeleiteten Spalten in `d` (siehe _derived_stamp);
+    bei `keys` bleiben die Fingerabdrücke der übrigen Monate erhalten, sofern die Formelversionen
+    übereinstimmen. None übernimmt den bisherigen (Inhalte unverändert, z.B. beim Zusammenlegen).
+    Gibt die geschriebenen Partitionen zurück.
+    """
+    directory, manifest_file, _, _ = PARTITIONED_TABLES[table]
+    _, date_col, key_col, _ = QUERY_TABLES[table]
+    manifest = _read_manifest(table)
+    partitions = dict(manifest["partitions"])
+    previous = manifest.get("derived", {})
+    if derived is None:
+        derived = previous
+    elif derived and keys is not None and derived["versions"] == previous.get("versions"):
+        # Monate nicht geschriebener Partitionen behalten ihren Fingerabdruck
+        kept = {month: fp for month, fp in previous.get("inputs", {}).items() if month not in keys and month[:4] not in keys}
+        derived = {"versions": derived["versions"], "inputs": {**kept, **derived["inputs"]}}
+    if date_col in d.columns and not d.empty:
+        d = d.sort_values(date_col, kind="stable")
+        if years is None and keys is not None:
+            years = {key for key in partitions if len(key) == 4}
+        groups = d.groupby(partition_keys(d[date_col], years).to_numpy(), sort=True).indices
+    else:
+        groups = {UNDATED_PARTITION: np.arange(len(d))} if len(d) else {}
+
+    os.makedirs(directory, exist_ok=True)
+    # Zeilen-Hashes einmal für die ganze Tabelle statt je Partition
+    row_hashes = pd.util.hash_pandas_object(d, index=False).to_numpy()
+    written = []
+    for key, positions in groups.items():
+        part = d.iloc[positions]
+        digest = _partition_hash(d.columns, row_hashes[positions])
+        path = os.path.join(directory, f"{key}.csv")
+        entry = partitions.get(key)
+        if entry is not None and entry["hash"] == digest and entry["version"] == list(table_version(path) or []):
+            continue
+        blocks = write_csv_blocks(part, path, date_col, key_col)
+        partitions[key] = {"file": f"{key}.csv", "rows": len(part), "hash": digest,
+                           "version": list(table_version(path)), "blocks": blocks}
+        written.append(key)
+    removed = [key for key in partitions if key not in groups and (keys is None or key in keys)]
+    for key in removed:
+        del partitions[key]
+
+    if written or removed or derived != previous or not os.path.exists(manifest_file):
+        # Manifest zuletzt ersetzen: bis dahin gilt für Leser der vorherige Stand
+        tmp_path = f"{manifest_file}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(json.dumps({"format": PARTITION_FORMAT, "date_column": date_col, "key_column": key_col,
+                                "derived": derived, "partitions": dict(sorted(partitions.items()))}))
+        os.replace(tmp_path, manifest_file)
+    for key in removed:
+        path = os.path.join(directory, f"{key}.csv")
+        if os.path.exists(path):
+            os.remove(path)
+    return written
+
+@profiled
+def read_partitions(table: str, date_range=None, phase: str = None, **read_kwargs) -> pd.DataFrame:
+    """Liest die Partitionen, die Zeitraum (von, bis; Grenzen dürfen None sein) und Phase enthalten können.
+
+    Innerhalb einer Partition werden über den Blockindex nur passende Byte-Bereiche gelesen, solange
+    die Datei seit dem Schreiben unverändert ist. Die Zeilen sind noch nicht genau gefiltert und haben
+    Datumstexte. `read_kwargs` gehen an pd.read_csv (z.B. usecols). None, wenn die Tabelle noch nie
+    gespeichert wurde oder keine Partition passt.
+    """
+    directory = PARTITIONED_TABLES[table][0]
+    start, end = (_as_date(d) for d in (date_range or (None, None)))
+    first_text, last_text = (str(d) if d is not None else None for d in (start, end))
+    headers, bodies = [], []
+    for key, entry in load_manifest(table)["partitions"].items():
+        bounds = partition_range(key) if start is not None or end is not None else None
+        if bounds is not None and ((start is not None and bounds[1] < start) or (end is not None and bounds[0] > end)):
+            continue
+        path = os.path.join(directory, entry["file"])
+        unchanged = entry["version"] == list(table_version(path) or [])
+        with open(path, "rb") as f:
+            header = f.readline()
+            if unchanged:
+                parts = []
+                for offset, size, first, last, keys in entry["blocks"]:
+                    if ((first_text is None or last >= first_text) and (last_text is None or first <= last_text)
+                            and (phase is None or phase in keys)):
+                        f.seek(offset)
+                        parts.append(f.read(size))
+                body = b"".join(parts)
+            else:
+                # Datei außerhalb der App geändert: Blockindex gilt nicht mehr, ganz lesen
+                body = f.read()
+        if body and not body.endswith(b"\n"):
+            body += b"\n"
+        headers.append(header)
+        bodies.append(body)
+    if not headers:
+        return None
+    if all(header == headers[0] for header in headers):
+        return pd.read_csv(io.BytesIO(headers[0] + b"".join(bodies)), **read_kwargs)
+    # Spalten unterscheiden sich (Partitionen aus verschiedenen Schemaständen)
+    return pd.concat([pd.read_csv(io.BytesIO(header + body), **read_kwargs)
+                      for header, body in zip(headers, bodies)], ignore_index=True)
+
+# Tabellen, deren Zahlenspalten zusätzlich binär abgelegt werden (Spalte je .npy-Datei, table_cache.py)
+COLUMN_STORE_TABLES = ["daily"]
+
+def _numeric_columns(df: pd.DataFrame) -> list:
+    return [col for col in df.columns if isinstance(df[col].dtype, np.dtype) and df[col].dtype.kind in "biuf"]
+
+@profiled
+def read_numeric_columns(table: str):
+    """Zahlenspalten aller Partitionen aus der binären Spaltenablage als (DataFrame, Spaltenreihenfolge).
+
+    Die Spalten sind ohne Kopie eingeblendet (mmap, Copy-on-Write) und haben die Typen, die auch
+    read_partitions() liefern würde; Zeilen in derselben Reihenfolge. Nach Änderungen werden nur
+    die geänderten Partitionen neu eingelesen, alle übrigen aus der bisherigen Ablage übernommen.
+    Die Spaltenreihenfolge umfasst auch die Textspalten. (None, None) für eine leere Tabelle.
+    """
+    import table_cache
+
+    directory = PARTITIONED_TABLES[table][0]
+    name = f"{table}_columns"
+    files = {key: os.path.join(directory, entry["file"]) for key, entry in load_manifest(table)["partitions"].items()}
+    if not files:
+        return None, None
+    current = [[key, list(table_version(path) or [])] for key, path in files.items()]
+    # Je Partition: [Partition, Dateistand, Zeilen, Textspalten, alle Spalten]
+    stored_version, stored = table_cache.read_latest(name)
+    stored_version = stored_version or []
+    if [entry[:2] for entry in stored_version] == current:
+        version = stored_version
+    else:
+        segments, start = {}, 0
+        for entry in stored_version:
+            segments[(entry[0], tuple(entry[1]))] = (start, entry)
+            start += entry[2]
+
+        def parse(key: str, file_version: list):
+            with span("database.column_store_parse", table=table, partition=key):
+                part = pd.read_csv(files[key])
+            numeric = _numeric_columns(part)
+            return part[numeric], [key, file_version, len(part), [col for col in part.columns if col not in numeric],
+                                   list(part.columns)]
+
+        parts, version = [], []
+        for key, file_version in current:
+            segment = segments.get((key, tuple(file_version)))
+            if segment is None:
+                part, entry = parse(key, file_version)
+            else:
+                start, entry = segment
+                part = stored.iloc[start:start + entry[2]]
+            parts.append(part)
+            version.append(entry)
+        text = {col for entry in version for col in entry[3]}
+        # Spalten, die bisher wegen Texten in einer anderen Partition fehlten, nachlesen
+        for pos, (part, entry) in enumerate(zip(parts, version)):
+            if set(entry[4]) - text - set(part.columns):
+                parts[pos], version[pos] = parse(entry[0], entry[1])
+        stored = pd.concat(parts, ignore_index=True)
+        stored = stored[[col for col in stored.columns if col not in text]]
+        table_cache.write(name, version, stored)
+    # Reihenfolge wie beim Zusammenfügen der Partitionen durch pd.concat
+    order = list(dict.fromkeys(col for entry in version for col in entry[4]))
+    return stored, order
+
+@profiled
+def read_table(table: str) -> pd.DataFrame:
+    """Ganze partitionierte Tabelle wie read_partitions(table); None, wenn sie noch nie gespeichert wurde.
+
+    Für COLUMN_STORE_TABLES kommen die Zahlenspalten ohne Kopie aus der Spaltenablage, aus den
+    CSV-Dateien werden nur die Textspalten gelesen.
+    """
+    if table not in COLUMN_STORE_TABLES:
+        return read_partitions(table)
+    manifest_file = PARTITIONED_TABLES[table][1]
+    load_manifest(table)
+    version = table_version(manifest_file)
+    numeric, order = read_numeric_columns(table)
+    if numeric is None:
+        return None
+    mapped = set(numeric.columns)
+    text = read_partitions(table, usecols=lambda col: col not in mapped)
+    if text is None or len(text) != len(numeric) or table_version(manifest_file) != version:
+        # Zwischendurch gespeichert: Stände passen nicht zusammen
+        return read_partitions(table)
+    return pd.concat([text, numeric], axis=1)[order]
+
+def _partition_of(table: str, day) -> str:
+    """Partition, in die ein Datum gehört (nach dem aktuellen Manifest)."""
+    years = {key for key in load_manifest(table)["partitions"] if len(key) == 4}
+    return partition_keys(pd.Series([str(_as_date(day))]), years).iloc[0]
+
+def _load_partition(table: str, key: str) -> pd.DataFrame:
+    """Alle Zeilen einer Partition mit Datumswerten als datetime.date; None, wenn sie nicht existiert.
+
+    Der Stand der gespeicherten Metriken steht wie bei load_data in df.attrs.
+    """
+    manifest = load_manifest(table)
+    entry = manifest["partitions"].get(key)
+    if entry is None:
+        return None
+    df = pd.read_csv(os.path.join(PARTITIONED_TABLES[table][0], entry["file"]))
+    df["date"] = pd.to_datetime(df["date"]).dt.date
+    _set_derived_state(df, manifest.get("derived", {}))
+    return df
+
+def _backup_partitions(table: str, keys: list) -> None:
+    """Kopiert Partitionsdateien in den Backup-Ordner (Dateikopie statt erneuter Serialisierung)."""
+    directory, _, _, name = PARTITIONED_TABLES[table]
+    partitions = _read_manifest(table)["partitions"]
     ts = datetime.now().strftime("%Y%m%d_%H%M%S")
-    d.to_csv(os.path.join(BKP_DIR, f"daily_log_{ts}.csv"), index=False)
+    for key in keys:
+        if key in partitions:
+            shutil.copyfile(os.path.join(directory, partitions[key]["file"]),
+                            os.path.join(BKP_DIR, f"{name}_{key}_{ts}.csv"))
+
+def _save_partitioned(table: str, df: pd.DataFrame, keys: list = None) -> None:
+    # Ältere Aufträge aus der Warteschlange dürfen diesen Stand nicht mehr überschreiben
+    _wait_for_queued_writes(table)
+    ensure_directories()
+    # Nur die Datumsspalte als Text ersetzen, die übrigen Spalten werden nicht kopiert
+    d = df.assign(date=pd.to_datetime(df["date"]).dt.strftime("%Y-%m-%d")) if not df.empty else df
+    version = table_version(PARTITIONED_TABLES[table][1])
+    written = write_partitions(table, d, keys, derived=_derived_stamp(df))
+    if table_version(PARTITIONED_TABLES[table][1]) == version:
+        # Nichts geändert (Manifest unverändert): kein Backup, Suchindex ist aktuell
+        return
+    # Backup nur der geschriebenen Partitionen
+    _backup_partitions(table, written)
+    # Suchindex nur für geänderte Einträge nachführen (bei Teilschreibvorgängen nur im Zeitraum der Partitionen)
+    from search_index import update_table
+    ranges = [partition_range(key) for key in keys or []]
+    scope = None if keys is None or None in ranges else (str(min(r[0] for r in ranges)), str(max(r[1] for r in ranges)))
+    update_table(table, d, scope=scope)
+
+@profiled
+def compact_partitions(table: str) -> list:
+    """Legt die Monatspartitionen kleiner abgeschlossener Jahre zu Jahrespartitionen zusammen.
+
+    Nötig nur, wenn eine Tabelle lange nur zeilenweise geändert wurde; vollständiges Speichern
+    wendet dieselbe Regel an. Gibt die neu entstandenen Jahrespartitionen zurück.
+    """
+    partitions = load_manifest(table)["partitions"]
+    current = str(date.today().year)
+    rows_per_year, months_per_year = {}, {}
+    for key, entry in partitions.items():
+        if len(key) == 7:
+            rows_per_year[key[:4]] = rows_per_year.get(key[:4], 0) + entry["rows"]
+            months_per_year.setdefault(key[:4], []).append(key)
+    years = [year for year, rows in rows_per_year.items()
+             if year < current and rows <= PARTITION_COMPACT_ROWS and (len(months_per_year[year]) > 1 or year in partitions)]
+    for year in years:
+        keys = months_per_year[year] + ([year] if year in partitions else [])
+        with span("database.compact", table=table, year=year, partitions=len(keys)):
+            # Texte unverändert übernehmen; die Monate werden durch die Jahrespartition ersetzt
+            d = read_partitions(table, partition_range(year), dtype=str, keep_default_na=False)
+            _backup_partitions(table, keys)
+            known_years = {key for key in _read_manifest(table)["partitions"] if len(key) == 4}
+            write_partitions(table, d, keys, years=known_years | {year})
+    return years
+
+@profiled
+def save_data(df: pd.DataFrame) -> None:
+    """Speichert die Tageswerte (nur geänderte Monatspartitionen) und erstellt davon ein Backup."""
+    _save_partitioned("daily", df)
 
+@profiled
 def save_nutrition_data(df: pd.DataFrame) -> None:
-    """Speichert den Ernährungs-DataFrame in der CSV-Datei und erstellt ein Backup."""
-    d = df.copy()
-    if not d.empty:
-        d["date"] = pd.to_datetime(d["date"]).dt.strftime("%Y-%m-%d")
-    d.to_csv(NUTRITION_FILE, index=False)
-    
-    # Backup erstellen
-    ts = datetime.now().strftime("%Y%m%d_%H%M%S")
-    d.to_csv(os.path.join(BKP_DIR, f"nutrition_log_{ts}.csv"), index=False)
+    """Speichert die Ernährungsdaten (nur geänderte Monatspartitionen) und erstellt davon ein Backup."""
+    _save_partitioned("nutrition", df)
+    save_json(NUTRITION_SCHEMA_FILE, {"schema_version": NUTRITION_SCHEMA_VERSION})
 
+@profiled
 def save_sport_tests_data(df: pd.DataFrame) -> None:
-    """Speichert den Sporttests-DataFrame in der CSV-Datei und erstellt ein Backup."""
-    d = df.copy()
-    if not d.empty:
-        d["test_date"] = pd.to_datetime(d["test_date"]).dt.strftime("%Y-%m-%d")
-    d.to_csv(SPORT_TESTS_FILE, index=False)
+    """Speichert den Sporttests-DataFrame im Langformat und erstellt ein Backup."""
+    ensure_directories()
+    long = wide_to_long(df, SPORT_TEST_UNITS)
+    long.to_csv(SPORT_TESTS_LONG_FILE, index=False)
     
-    # Backup erstellen
+    # Backup erstellen (Dateikopie statt erneuter Serialisierung)
     ts = datetime.now().strftime("%Y%m%d_%H%M%S")
-    d.to_csv(os.path.join(BKP_DIR, f"sport_tests_{ts}.csv"), index=False)
+    shutil.copyfile(SPORT_TESTS_LONG_FILE, os.path.join(BKP_DIR, f"sport_tests_long_{ts}.csv"))
+    # Suchindex nur für geänderte Einträge nachführen
+    from search_index import update_table
+    update_table("sport", df)
 
+@profiled
 def save_blood_tests_data(df: pd.DataFrame) -> None:
-    """Speichert den Bluttests-DataFrame in der CSV-Datei und erstellt ein Backup."""
-    d = df.copy()
-    if not d.empty:
-        d["test_date"] = pd.to_datetime(d["test_date"]).dt.strftime("%Y-%m-%d")
-    d.to_csv(BLOOD_TESTS_FILE, index=False)
+    """Speichert den Bluttests-DataFrame im Langformat und erstellt ein Backup."""
+    ensure_directories()
+    long = wide_to_long(df, BLOOD_TEST_UNITS)
+    long.to_csv(BLOOD_TESTS_LONG_FILE, index=False)
     
-    # Backup erstellen
+    # Backup erstellen (Dateikopie statt erneuter Serialisierung)
     ts = datetime.now().strftime("%Y%m%d_%H%M%S")
-    d.to_csv(os.path.join(BKP_DIR, f"blood_tests_{ts}.csv"), index=False)
+    shutil.copyfile(BLOOD_TESTS_LONG_FILE, os.path.join(BKP_DIR, f"blood_tests_long_{ts}.csv"))
+    # Suchindex nur für geänderte Einträge nachführen
+    from search_index import update_table
+    update_table("blood", df)
 
+@profiled
 def update_data(date_val: date, phase_val: str, updated_data: dict) -> bool:
-    """Aktualisiert einen bestehenden Datensatz anhand von Datum und Phase."""
-    df = load_data()
+    """Aktualisiert einen bestehenden Datensatz anhand von Datum und Phase (liest und schreibt nur dessen Partition)."""
+    partition = _partition_of("daily", date_val)
+    df = _load_partition("daily", partition)
+    if df is None:
+        return False
     
     # Prüfen, ob der Datensatz existiert
     mask = (df["date"] == date_val) & (df["phase"] == phase_val)
@@ -150,7 +807,7 @@ def update_data(date_val: date, phase_val: str, updated_data: dict) -> bool:
         return False
     
     # Backup vor der Änderung erstellen
-    save_data(df)
+    _backup_partitions("daily", [partition])
     
     # Daten aktualisieren
     for key, value in updated_data.items():
@@ -160,21 +817,43 @@ def update_data(date_val: date, phase_val: str, updated_data: dict) -> bool:
     # Zeitstempel der letzten Änderung hinzufügen
     df.loc[mask, "last_modified"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     
-    # Metriken neu berechnen
-    df = compute_metrics(df)
+    # Metriken neu berechnen (mit dem Ernährungstagebuch desselben Zeitraums); die Eingaben haben sich geändert
+    df = compute_metrics(df, query("nutrition", date_range=partition_range(partition)), recompute=True)
     
     # Speichern
-    save_data(df)
+    _save_partitioned("daily", df, [partition])
     return True
 
+@profiled
 def update_nutrition_data(date_val: date, phase_val: str, updated_data: dict) -> bool:
     """Aktualisiert einen bestehenden Ernährungsdatensatz anhand von Datum und Phase.
 
     - Wenn kein Eintrag existiert, wird ein neuer Datensatz mit allen NUTRITION_COLUMNS angelegt.
     - last_modified wird in beiden Fällen korrekt gesetzt.
+    - Gelesen und geschrieben wird nur die Partition des Datums.
     """
-    df = load_nutrition_data()
+    if _nutrition_schema_version() < NUTRITION_SCHEMA_VERSION:
+        # Schema einmalig über das vollständige Laden umstellen
+        load_nutrition_data()
+    partition = _partition_of("nutrition", date_val)
+    df = _load_partition("nutrition", partition)
+    if df is None:
+        df = empty_nutrition_df()
+    elif ((df["date"] == date_val) & (df["phase"] == phase_val)).any():
+        # Backup vor der Änderung erstellen
+        _backup_partitions("nutrition", [partition])
 
+    df = apply_nutrition_update(df, date_val, phase_val, updated_data)
+    _save_partitioned("nutrition", df, [partition])
+    save_json(NUTRITION_SCHEMA_FILE, {"schema_version": NUTRITION_SCHEMA_VERSION})
+    return True
+
+def apply_nutrition_update(df: pd.DataFrame, date_val: date, phase_val: str, updated_data: dict) -> pd.DataFrame:
+    """Trägt Werte für (Datum, Phase) in ein geladenes Ernährungstagebuch ein, ohne zu speichern.
+
+    Fehlt der Eintrag, wird eine neue Zeile mit allen NUTRITION_COLUMNS angehängt; last_modified
+    wird in beiden Fällen gesetzt. Gibt das geänderte Tagebuch zurück.
+    """
     # Datensatz finden
     mask = (df["date"] == date_val) & (df["phase"] == phase_val)
 
@@ -185,21 +864,29 @@ def update_nutrition_data(date_val: date, phase_val: str, updated_data: dict) ->
         new_row_data.update(updated_data)
         new_row_data["last_modified"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
-        df = pd.concat([df, pd.DataFrame([new_row_data])], ignore_index=True)
-    else:
-        # Backup vor der Änderung erstellen
-        save_nutrition_data(df)
+        return pd.concat([df, pd.DataFrame([new_row_data])], ignore_index=True)
 
-        # Update bestehenden Eintrag
-        for key, value in updated_data.items():
-            if key in df.columns:
-                df.loc[mask, key] = value
+    # Update bestehenden Eintrag (flache Kopie: geändert werden nur einzelne Spalten)
+    df = df.copy(deep=False)
+    for key, value in updated_data.items():
+        if key in df.columns:
+            df.loc[mask, key] = value
 
-        df.loc[mask, "last_modified"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    df.loc[mask, "last_modified"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    return df
 
-    save_nutrition_data(df)
-    return True
+def _set_test_values(df: pd.DataFrame, mask, updated_data: dict) -> None:
+    """Setzt Werte eines Tests; unbekannte Messgrößen werden als neue Spalte angelegt.
 
+    Ganzzahlige Spalten (beim Pivot aus dem Langformat erkannt) werden bei Kommazahlen zu float.
+    """
+    for key, value in updated_data.items():
+        if (key in df.columns and pd.api.types.is_integer_dtype(df[key])
+                and isinstance(value, float) and not value.is_integer()):
+            df[key] = df[key].astype(float)
+        df.loc[mask, key] = value
+
+@profiled
 def update_sport_tests_data(test_date_val: date, test_type_val: str, updated_data: dict) -> bool:
     """Aktualisiert einen bestehenden Sporttest-Datensatz anhand von Datum und Testtyp."""
     df = load_sport_tests_data()
@@ -215,9 +902,7 @@ def update_sport_tests_data(test_date_val: date, test_type_val: str, updated_dat
         # Backup vor der Änderung erstellen
         save_sport_tests_data(df)
         # Daten aktualisieren
-        for key, value in updated_data.items():
-            if key in df.columns:
-                df.loc[mask, key] = value
+        _set_test_values(df, mask, updated_data)
 
     # Zeitstempel der letzten Änderung hinzufügen
     # (Wichtig: nach pd.concat muss der Mask-Filter neu auf dem aktuellen DataFrame berechnet werden.)
@@ -230,6 +915,7 @@ def update_sport_tests_data(test_date_val: date, test_type_val: str, updated_dat
     save_sport_tests_data(df)
     return True
 
+@profiled
 def update_blood_tests_data(test_date_val: date, test_type_val: str, updated_data: dict) -> bool:
     """Aktualisiert einen bestehenden Bluttest-Datensatz anhand von Datum und Testtyp."""
     df = load_blood_tests_data()
@@ -245,9 +931,7 @@ def update_blood_tests_data(test_date_val: date, test_type_val: str, updated_dat
         # Backup vor der Änderung erstellen
         save_blood_tests_data(df)
         # Daten aktualisieren
-        for key, value in updated_data.items():
-            if key in df.columns:
-                df.loc[mask, key] = value
+        _set_test_values(df, mask, updated_data)
 
     # Zeitstempel der letzten Änderung hinzufügen
     # (Wichtig: nach pd.concat muss der Mask-Filter neu auf dem aktuellen DataFrame berechnet werden.)
@@ -260,9 +944,13 @@ def update_blood_tests_data(test_date_val: date, test_type_val: str, updated_dat
     save_blood_tests_data(df)
     return True
 
+@profiled
 def delete_data(date_val: date, phase_val: str) -> bool:
-    """Löscht einen Datensatz anhand von Datum und Phase."""
-    df = load_data()
+    """Löscht einen Datensatz anhand von Datum und Phase (schreibt nur dessen Partition neu)."""
+    partition = _partition_of("daily", date_val)
+    df = _load_partition("daily", partition)
+    if df is None:
+        return False
     
     # Prüfen, ob der Datensatz existiert
     mask = (df["date"] == date_val) & (df["phase"] == phase_val)
@@ -270,18 +958,22 @@ def delete_data(date_val: date, phase_val: str) -> bool:
         return False
     
     # Backup vor der Löschung erstellen
-    save_data(df)
+    _backup_partitions("daily", [partition])
     
     # Datensatz löschen
-    df = df[~mask].copy()
+    df = df[~mask]
     
     # Speichern
-    save_data(df)
+    _save_partitioned("daily", df, [partition])
     return True
 
+@profiled
 def delete_nutrition_data(date_val: date, phase_val: str) -> bool:
-    """Löscht einen Ernährungsdatensatz anhand von Datum und Phase."""
-    df = load_nutrition_data()
+    """Löscht einen Ernährungsdatensatz anhand von Datum und Phase (schreibt nur dessen Partition neu)."""
+    partition = _partition_of("nutrition", date_val)
+    df = _load_partition("nutrition", partition)
+    if df is None:
+        return False
     
     # Prüfen, ob der Datensatz existiert
     mask = (df["date"] == date_val) & (df["phase"] == phase_val)
@@ -289,15 +981,16 @@ def delete_nutrition_data(date_val: date, phase_val: str) -> bool:
         return False
     
     # Backup vor der Löschung erstellen
-    save_nutrition_data(df)
+    _backup_partitions("nutrition", [partition])
     
     # Datensatz löschen
-    df = df[~mask].copy()
+    df = df[~mask]
     
     # Speichern
-    save_nutrition_data(df)
+    _save_partitioned("nutrition", df, [partition])
     return True
 
+@profiled
 def delete_sport_tests_data(test_date_val: date, test_type_val: str) -> bool:
     """Löscht einen Sporttest-Datensatz anhand von Datum und Testtyp."""
     df = load_sport_tests_data()
@@ -311,12 +1004,16 @@ def delete_sport_tests_data(test_date_val: date, test_type_val: str) -> bool:
     save_sport_tests_data(df)
     
     # Datensatz löschen
-    df = df[~mask].copy()
+    df = df[~mask]
     
     # Speichern
     save_sport_tests_data(df)
+    # Nicht mehr referenzierte Anhänge entfernen
+    from attachments import collect_garbage
+    collect_garbage()
     return True
 
+@profiled
 def delete_blood_tests_data(test_date_val: date, test_type_val: str) -> bool:
     """Löscht einen Bluttest-Datensatz anhand von Datum und Testtyp."""
     df = load_blood_tests_data()
@@ -330,17 +1027,174 @@ def delete_blood_tests_data(test_date_val: date, test_type_val: str) -> bool:
     save_blood_tests_data(df)
     
     # Datensatz löschen
-    df = df[~mask].copy()
+    df = df[~mask]
     
     # Speichern
     save_blood_tests_data(df)
+    # Nicht mehr referenzierte Anhänge entfernen
+    from attachments import collect_garbage
+    collect_garbage()
     return True
 
-def compute_metrics(df: pd.DataFrame) -> pd.DataFrame:
-    """Berechnet alle abgeleiteten Metriken."""
-    df = df.copy()
+# Unter diesem Schlüssel stehen in DataFrame.attrs (und als "derived" im Manifest der Tageswerte)
+# {"versions": Formelversionen, "inputs": {Monat: Fingerabdruck}}: für diese Monate wurden die
+# abgeleiteten Spalten mit diesen Formeln aus genau diesen Werten berechnet (derived_fingerprints)
+DERIVED_VERSIONS_ATTR = "derived_versions"
+# Nachkommastellen im Fingerabdruck (Rundungen beim Schreiben/Lesen der CSV sollen ihn nicht ändern)
+FINGERPRINT_DECIMALS = 6
+
+def _numeric(df: pd.DataFrame, col: str) -> np.ndarray:
+    series = df[col]
+    if isinstance(series.dtype, np.dtype) and series.dtype.kind in "biuf":
+        return series.to_numpy(dtype=float)
+    return pd.to_numeric(series, errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+
+def _energy_balance(df: pd.DataFrame):
+    return df["intake_kcal"] - df["total_kcal_burn"]
+
+def _protein_g_per_kg(df: pd.DataFrame) -> np.ndarray:
+    # Quotienten direkt in vorbelegte Arrays (nur gültige Stellen werden berechnet)
+    weight = _numeric(df, "body_weight")
+    result = np.full(len(df), np.nan)
+    with np.errstate(invalid="ignore"):
+        np.divide(_numeric(df, "protein_g"), weight, out=result, where=weight > 0)
+    return result
+
+def _recovery_index(df: pd.DataFrame) -> np.ndarray:
+    hrv, rhr = _numeric(df, "hrv_sleep_avg"), _numeric(df, "rhr_sleep_avg")
+    result = np.full(len(df), np.nan)
+    with np.errstate(invalid="ignore"):
+        np.divide(hrv * _numeric(df, "sleep_score"), rhr, out=result, where=(hrv > 0) & (rhr > 0))
+    return result
+
+def _load_score(df: pd.DataFrame) -> np.ndarray:
+    # Load Score wird nicht mehr berechnet, da es keine Trainingsdaten mehr gibt.
+    return np.full(len(df), np.nan)
+
+def _wellbeing_score(df: pd.DataFrame) -> np.ndarray:
+    # Mittelwert der vorhandenen Angaben je Tag (wie DataFrame.mean(axis=1), ohne Zwischentabelle)
+    total, count = np.zeros(len(df)), np.zeros(len(df))
+    for col in ["energy", "mood", "motivation"]:
+        rating = _numeric(df, col)
+        present = ~np.isnan(rating)
+        total += np.where(present, rating, 0.0)
+        count += present
+    result = np.full(len(df), np.nan)
+    np.divide(total, count, out=result, where=count > 0)
+    return result
+
+def _stress_balance(df: pd.DataFrame) -> np.ndarray:
+    return 100 - _numeric(df, "stress_avg")
+
+# Abgeleitete Metriken der Tageswerte: Spalte -> (Formelversion, Eingabespalten, Berechnung).
+# Die Berechnung erhält die Tageswerte (ggf. nur die neu zu berechnenden Zeilen) und liefert die
+# Werte in deren Reihenfolge. Ändert sich eine Formel, ihre Version erhöhen: gespeicherte Werte
+# einer anderen Version werden dann beim nächsten compute_metrics() neu berechnet.
+DERIVED_METRICS = {
+    "energy_balance": (1, ["intake_kcal", "total_kcal_burn"], _energy_balance),
+    "protein_g_per_kg": (1, ["protein_g", "body_weight"], _protein_g_per_kg),
+    "recovery_index": (1, ["hrv_sleep_avg", "sleep_score", "rhr_sleep_avg"], _recovery_index),
+    "load_score": (1, [], _load_score),
+    "wellbeing_score": (1, ["energy", "mood", "motivation"], _wellbeing_score),
+    "stress_balance": (1, ["stress_avg"], _stress_balance),
+}
+
+def derived_versions() -> dict:
+    """Aktuelle Formelversionen der abgeleiteten Metriken ({Spalte: Version}), z.B. für Cache-Schlüssel."""
+    return {col: spec[0] for col, spec in DERIVED_METRICS.items()}
+
+# Berechnete Metriken aus compute_metrics (für Konsistenzprüfungen)
+DERIVED_COLUMNS = [col for col in DERIVED_METRICS if col != "load_score"]
+
+def _days(df: pd.DataFrame) -> np.ndarray:
+    return pd.to_datetime(df["date"], errors="coerce").to_numpy(dtype="datetime64[D]")
+
+def _month_groups(days: np.ndarray):
+    """(Monate als Text JJJJ-MM bzw. UNDATED_PARTITION, Monatsnummer je Zeile) zu Tagesdaten."""
+    keys, codes = np.unique(days.astype("datetime64[M]").view("i8"), return_inverse=True)
+    months = keys.view("datetime64[M]")
+    return np.where(np.isnat(months), UNDATED_PARTITION, np.datetime_as_string(months, unit="M")), codes
+
+def derived_fingerprints(df: pd.DataFrame, days: np.ndarray = None) -> dict:
+    """Fingerabdruck {Monat: Zahl} aus Datum, Phase, Eingaben und abgeleiteten Spalten je Monat.
+
+    Unabhängig von Zeilenreihenfolge und Spaltentypen (int/float, Datum als Text oder date); leer,
+    wenn Spalten fehlen. `days` sind die bereits umgewandelten Daten (siehe _days).
+    """
+    cols = sorted({name for _, inputs, _ in DERIVED_METRICS.values() for name in inputs} | set(DERIVED_METRICS))
+    if df.empty or any(col not in df.columns for col in ["date", "phase"] + cols):
+        return {}
+    days = _days(df) if days is None else days
+    phase_codes, phases = pd.factorize(df["phase"].fillna("").astype(str))
+    phase_hashes = pd.util.hash_array(np.asarray(phases, dtype=object))
+
+    def cells():
+        yield days.view("u8")
+        yield phase_hashes[phase_codes]
+        for col in cols:
+            values = np.round(_numeric(df, col), FINGERPRINT_DECIMALS) + 0.0
+            values[np.isnan(values)] = np.nan
+            yield values.view("u8")
+
+    # Zeilen-Hash: Zellen-Hashes mit festen ungeraden Gewichten je Spalte summiert (Spalte für Spalte,
+    # ohne Zwischentabelle)
+    row_hashes = np.zeros(len(df), dtype=np.uint64)
+    for pos, column in enumerate(cells()):
+        weight = np.uint64((2 * pos + 1) * 0x9E3779B97F4A7C15 % 2**64)
+        row_hashes += pd.util.hash_array(column) * weight
+    months, codes = _month_groups(days)
+    # Summe der Zeilen-Hashes je Monat (mit Überlauf): unabhängig von der Reihenfolge
+    order = np.argsort(codes, kind="stable")
+    sums = np.add.reduceat(row_hashes[order], np.searchsorted(codes[order], np.arange(len(months))))
+    return {str(month): int(total) for month, total in zip(months, sums)}
+
+def _derived_state(df: pd.DataFrame) -> dict:
+    """Stand der abgeleiteten Spalten aus df.attrs (siehe DERIVED_VERSIONS_ATTR); {} ohne Angabe."""
+    return json.loads(df.attrs.get(DERIVED_VERSIONS_ATTR, "{}"))
+
+def _set_derived_state(df: pd.DataFrame, state: dict) -> None:
+    # Als JSON-Text: pandas kopiert attrs bei fast jeder Operation tief, ein Text kostet dabei nichts
+    df.attrs[DERIVED_VERSIONS_ATTR] = json.dumps(state)
+
+def _derived_stamp(df: pd.DataFrame) -> dict:
+    """Eintrag "derived" fürs Manifest: nur Monate, deren Werte seit der Berechnung unverändert sind."""
+    trust = _derived_state(df)
+    if not trust.get("inputs") or trust.get("versions") != derived_versions():
+        return {}
+    recorded = trust["inputs"]
+    inputs = {month: fp for month, fp in derived_fingerprints(df).items() if recorded.get(month) == fp}
+    return {"versions": trust["versions"], "inputs": inputs}
+
+def _replace_rows(column: pd.Series, rows: np.ndarray, values) -> pd.Series:
+    """`column` mit neuen Werten an den Positionen `rows` (Typ nur wenn nötig erweitert, z.B. int -> float)."""
+    values = np.asarray(values)
+    current = column.to_numpy()
+    result = current.astype(np.result_type(current.dtype, values.dtype), copy=True)
+    result[rows] = values
+    return pd.Series(result, index=column.index, name=column.name)
+
+@profiled
+def compute_metrics(df: pd.DataFrame, nutrition_df: pd.DataFrame = None, recompute: bool = False) -> pd.DataFrame:
+    """Berechnet alle abgeleiteten Metriken (DERIVED_METRICS).
+
+    `nutrition_df` ist das bereits geladene Ernährungstagebuch (sonst wird es hier geladen).
+    Gespeicherte Werte (siehe load_data) werden übernommen, wenn ihre Formelversion aktuell ist und
+    der Fingerabdruck ihres Monats noch zu dem beim Berechnen festgehaltenen passt; neu berechnet
+    werden Monate mit geänderten Werten, Zeilen ohne Wert und Zeilen mit aus dem Tagebuch ergänzten
+    Eingaben. `recompute=True` berechnet alle Zeilen neu.
+    """
+    trust = {} if recompute else _derived_state(df)
+    stored = trust.get("versions", {})
+    recorded = trust.get("inputs", {})
+    fingerprints = derived_fingerprints(df) if recorded else {}
+    valid_months = [month for month, fp in fingerprints.items() if recorded.get(month) == fp]
+    # Flache Kopie genügt: neue bzw. ersetzte Spalten wirken sich nicht auf den Aufrufer aus (Copy-on-Write)
+    df = df.copy(deep=False)
     if df.empty:
         return df
+    # Spalte -> Zeilen, deren Wert hier ergänzt wurde
+    filled = {}
+    merged = False
     
     # Wochentag robust erzeugen (ohne Locale-Abhängigkeit; Streamlit Cloud kompatibel)
     
@@ -351,17 +1205,14 @@ def compute_metrics(df: pd.DataFrame) -> pd.DataFrame:
     df["weekday"] = _weekday_idx.map(_weekday_map)
 
     # Die Nährstoffdaten sind jetzt bereits in df, da sie im Tagesformular eingegeben werden.
-    # Ein Merge ist nicht mehr nötig, aber wir behalten ihn zur Sicherheit, falls Daten nur im Ernährungstab eingegeben werden.
-    nutrition_df = load_nutrition_data()
+    # Ein Abgleich ist nicht mehr nötig, aber wir behalten ihn zur Sicherheit, falls Daten nur im Ernährungstab eingegeben werden.
+    nutrition_df = load_nutrition_data() if nutrition_df is None else nutrition_df
     if not nutrition_df.empty:
         # Ergänze fehlende Tage aus dem Ernährungstagebuch in die Hauptdaten,
         # damit Diagramme auch bei reiner Eingabe im Ernährungstab dargestellt werden können.
         required_cols = ["date", "phase", "intake_kcal", "carbs_g", "protein_g", "fat_g", "water_ml"]
-        for col in required_cols:
-            if col not in nutrition_df.columns:
-                nutrition_df[col] = None
-
-        nutrition_subset = nutrition_df[required_cols].copy()
+        value_cols = required_cols[2:]
+        nutrition_subset = nutrition_df.reindex(columns=required_cols)
 
         # Identifiziere (date, phase), die im Haupt-Log noch fehlen
         main_keys = set(zip(df["date"], df["phase"])) if ("date" in df.columns and "phase" in df.columns) else set()
@@ -372,42 +1223,222 @@ def compute_metrics(df: pd.DataFrame) -> pd.DataFrame:
         if not missing_nutrition.empty:
             # Erzeuge leere Zeilen im Schema der Hauptdaten
             new_rows = pd.DataFrame({c: [np.nan] * len(missing_nutrition) for c in df.columns})
-            new_rows["date"] = missing_nutrition["date"].values
-            new_rows["phase"] = missing_nutrition["phase"].values
-            new_rows["intake_kcal"] = missing_nutrition["intake_kcal"].values
-            new_rows["carbs_g"] = missing_nutrition["carbs_g"].values
-            new_rows["protein_g"] = missing_nutrition["protein_g"].values
-            new_rows["fat_g"] = missing_nutrition["fat_g"].values
-            new_rows["water_ml"] = missing_nutrition["water_ml"].values
+            for col in required_cols:
+                new_rows[col] = missing_nutrition[col].values
             df = pd.concat([df, new_rows], ignore_index=True).sort_values("date")
-        # Merge mit Ernährungsdaten, um fehlende Werte zu ergänzen
-        df = df.merge(nutrition_df[["date", "phase", "intake_kcal", "carbs_g", "protein_g", "fat_g", "water_ml"]], 
-                     on=["date", "phase"], how="left", suffixes=('', '_from_nutrition'))
-        
-        # Bevorzuge die Werte aus dem Haupt-Log, falls vorhanden
-        for col in ["intake_kcal", "carbs_g", "protein_g", "fat_g", "water_ml"]:
-            if f'{col}_from_nutrition' in df.columns:
+
+        keys = pd.MultiIndex.from_arrays([nutrition_subset["date"], nutrition_subset["phase"]])
+        if keys.is_unique:
+            # Fehlende Werte direkt über die Position im Tagebuch ergänzen (statt die ganze Tabelle zu mergen);
+            # Zeilennummern wie nach einem Merge
+            df = df.reset_index(drop=True)
+            positions = keys.get_indexer(pd.MultiIndex.from_arrays([df["date"], df["phase"]]))
+            for col in value_cols:
+                fill = pd.Series(nutrition_subset[col].to_numpy()).reindex(positions).set_axis(df.index)
+                filled[col] = (df[col].isna() & fill.notna()).to_numpy()
+                df[col] = df[col].fillna(fill)
+        else:
+            # Doppelte Einträge im Tagebuch: Merge (vervielfacht betroffene Tage wie bisher)
+            df = df.merge(nutrition_subset, on=["date", "phase"], how="left", suffixes=('', '_from_nutrition'))
+            merged = True
+            # Bevorzuge die Werte aus dem Haupt-Log, falls vorhanden
+            for col in value_cols:
+                filled[col] = (df[col].isna() & df[f'{col}_from_nutrition'].notna()).to_numpy()
                 df[col] = df[col].fillna(df[f'{col}_from_nutrition'])
-                df.drop(columns=[f'{col}_from_nutrition'], inplace=True)
-
-    df["total_kcal_burn"] = df["total_kcal_burn"].fillna(0)
-    df["intake_kcal"] = df["intake_kcal"].fillna(0)
-    df["energy_balance"] = df["intake_kcal"] - df["total_kcal_burn"]
-    df["protein_g_per_kg"] = np.where(df["body_weight"] > 0, df["protein_g"] / df["body_weight"], np.nan)
-    df["recovery_index"] = np.where((df["hrv_sleep_avg"] > 0) & (df["rhr_sleep_avg"] > 0),
-                                     df["hrv_sleep_avg"] * df["sleep_score"] / df["rhr_sleep_avg"], np.nan)
-    
-    # Load Score wird nicht mehr berechnet, da es keine Trainingsdaten mehr gibt.
-    df["load_score"] = np.nan
-    
-    df["wellbeing_score"] = pd.to_numeric(df[["energy", "mood", "motivation"]].mean(axis=1), errors="coerce")
-    df["stress_balance"] = np.where(df["stress_avg"].notna(), 100 - df["stress_avg"], np.nan)
+            df = df.drop(columns=[f'{col}_from_nutrition' for col in value_cols])
+
+    # Eingaben, die hier ergänzt werden: deren Zeilen müssen auch bei gültigen gespeicherten Metriken neu berechnet werden
+    for col in ["total_kcal_burn", "intake_kcal"]:
+        missing = df[col].isna().to_numpy()
+        filled[col] = filled[col] | missing if col in filled else missing
+        df[col] = df[col].fillna(0)
+
+    # Zeilen aus Monaten, deren Werte sich seit der Berechnung geändert haben
+    days = _days(df)
+    months, codes = _month_groups(days)
+    changed = ~np.isin(months, valid_months)[codes]
+    recomputed = np.zeros(len(df), dtype=bool)
+    versions = {}
+    for col, (version, inputs, func) in DERIVED_METRICS.items():
+        if col in df.columns and stored.get(col) == version:
+            # Gespeicherte Werte gelten: nur geänderte Monate, Zeilen ohne Wert oder mit ergänzten Eingaben berechnen
+            rows = changed | df[col].isna().to_numpy()
+            for name in inputs:
+                if name in filled:
+                    rows = rows | filled[name]
+            if rows.any():
+                df[col] = _replace_rows(df[col], rows, func(df[rows]))
+            recomputed |= rows
+        else:
+            df[col] = func(df)
+            recomputed[:] = True
+        versions[col] = version
+
+    # Fingerabdrücke nur für Monate mit neu berechneten Zeilen neu bilden
+    touched = np.zeros(len(months), dtype=bool)
+    touched[codes[recomputed]] = True
+    if merged:
+        touched[:] = True
+    rows = touched[codes]
+    if rows.all():
+        fingerprints = derived_fingerprints(df, days)
+    else:
+        fingerprints = {month: fingerprints[month] for month in months[~touched]}
+        if rows.any():
+            fingerprints.update(derived_fingerprints(df[rows], days[rows]))
+    _set_derived_state(df, {"versions": versions, "inputs": fingerprints})
     return df
 
+# Tabelle -> (Laden, Speichern) für UnitOfWork
+TABLE_IO = {
+    "daily": (load_data, save_data),
+    "nutrition": (load_nutrition_data, save_nutrition_data),
+    "sport": (load_sport_tests_data, save_sport_tests_data),
+    "blood": (load_blood_tests_data, save_blood_tests_data),
+}
+
+class UnitOfWork:
+    """Sammelt Änderungen an mehreren Tabellen und schreibt jede geänderte Tabelle genau einmal.
+
+        with UnitOfWork({"daily": df, "nutrition": nutrition_df}) as uow:
+            uow.update_nutrition(day, phase, {"intake_kcal": 2400})
+            uow.upsert("daily", row, keys=["date"])
+
+    Beim Verlassen ohne Fehler wird commit() ausgeführt: Metriken der Tageswerte einmal gegen das
+    vorgemerkte Ernährungstagebuch berechnen, dann je geänderter Tabelle ein Schreibvorgang über
+    `save(table, df)` (Standard: die save_*-Funktionen; z.B. write_queue.submit für Hintergrund-Speichern).
+    Bei einem Fehler im Block wird nichts geschrieben.
+    """
+
+    def __init__(self, tables: dict = None, save=None):
+        # Bereits geladene Tabellen übernehmen, alle übrigen werden bei Bedarf geladen
+        self._frames = dict(tables or {})
+        self._dirty = []
+        self._save = save or (lambda table, df: TABLE_IO[table][1](df))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.commit()
+        return False
+
+    def frame(self, table: str) -> pd.DataFrame:
+        """Vorgemerkter Stand einer Tabelle (beim ersten Zugriff geladen)."""
+        if table not in self._frames:
+            self._frames[table] = TABLE_IO[table][0]()
+        return self._frames[table]
+
+    def stage(self, table: str, df: pd.DataFrame) -> None:
+        """Merkt einen neuen vollständigen Stand der Tabelle vor."""
+        self._frames[table] = df
+        if table not in self._dirty:
+            self._dirty.append(table)
+
+    def upsert(self, table: str, row: dict, keys=None) -> None:
+        """Ersetzt alle Zeilen mit denselben Schlüsselwerten (Standard: Datum & Phase/Testtyp) durch `row`."""
+        df = self.frame(table)
+        keys = list(keys or QUERY_TABLES[table][1:3])
+        mask = np.ones(len(df), dtype=bool)
+        for key in keys:
+            mask &= (df[key] == row[key]).to_numpy()
+        staged = pd.concat([df[~mask], pd.DataFrame([row])], ignore_index=True)
+        if DERIVED_VERSIONS_ATTR in df.attrs:
+            # Übrige Monate bleiben gültig; den geänderten erkennt compute_metrics am Fingerabdruck
+            staged.attrs[DERIVED_VERSIONS_ATTR] = df.attrs[DERIVED_VERSIONS_ATTR]
+        self.stage(table, staged)
+
+    def update_nutrition(self, date_val: date, phase_val: str, updated_data: dict) -> None:
+        """Wie update_nutrition_data, aber nur vorgemerkt (siehe apply_nutrition_update)."""
+        self.stage("nutrition", apply_nutrition_update(self.frame("nutrition"), date_val, phase_val, updated_data))
+
+    @profiled
+    def commit(self) -> list:
+        """Schreibt alle geänderten Tabellen (je eine Schreiboperation); gibt deren Namen zurück."""
+        if "daily" in self._dirty:
+            nutrition_df = self._frames.get("nutrition")
+            self._frames["daily"] = compute_metrics(self._frames["daily"], nutrition_df)
+        # Ernährung vor den Tageswerten schreiben (deren Metriken beruhen darauf)
+        dirty = sorted(self._dirty, key=lambda table: list(TABLE_IO).index(table) if table != "nutrition" else -1)
+        for table in dirty:
+            self._save(table, self._frames[table])
+        self._dirty = []
+        return dirty
+
+@profiled
 def load_goals() -> dict:
     """Lädt die Ziele aus der JSON-Datei."""
     return load_json(GOALS_FILE, DEFAULT_GOALS)
 
+@profiled
 def save_goals(goals: dict) -> None:
     """Speichert die Ziele in der JSON-Datei."""
     save_json(GOALS_FILE, goals)
+
+@profiled
+def check_integrity() -> list:
+    """Prüft alle Tabellen auf Konsistenz und gibt eine Liste gefundener Probleme zurück."""
+    problems = []
+    tables = [
+        ("Tageswerte", load_data, ["date", "phase"], COLUMNS),
+        ("Ernährung", load_nutrition_data, ["date", "phase"], NUTRITION_COLUMNS),
+        # Testtabellen: neue Messgrößen sind im Langformat erlaubt, daher keine Spaltenprüfung
+        ("Sporttests", load_sport_tests_data, ["test_date", "test_type"], None),
+        ("Bluttests", load_blood_tests_data, ["test_date", "test_type"], None),
+    ]
+    loaded = {}
+    for name, loader, keys, columns in tables:
+        try:
+            df = loader()
+        except Exception as e:
+            problems.append(f"{name}: Datei nicht lesbar ({e})")
+            continue
+        loaded[name] = df
+        if df.empty:
+            continue
+
+        unknown = [c for c in df.columns if c not in columns] if columns is not None else []
+        if unknown:
+            problems.append(f"{name}: unbekannte Spalten {unknown}")
+
+        duplicated = df.duplicated(subset=keys, keep=False)
+        if duplicated.any():
+            problems.append(f"{name}: {int(duplicated.sum())} Zeilen mit doppeltem Schlüssel {keys}")
+
+        if "phase" in keys:
+            invalid_phase = ~df["phase"].isin(["Omnivor", "Vegan"])
+            if invalid_phase.any():
+                problems.append(f"{name}: {int(invalid_phase.sum())} Zeilen mit ungültiger Phase")
+
+        # Verweise auf Anhänge (Fotos / Labor-PDFs) prüfen
+        for col in [c for c in df.columns if c.endswith("_photo") or c == "pdf_file"]:
+            paths = df[col].dropna().astype(str)
+            paths = paths[paths != ""]
+            missing_files = [p for p in paths if not os.path.exists(p)]
+            if missing_files:
+                problems.append(f"{name}: {len(missing_files)} fehlende Anhänge in '{col}'")
+
+    # Mehrfach gespeicherte Zellen im Langformat (beim Laden gewinnt die letzte)
+    for name, path in [("Sporttests", SPORT_TESTS_LONG_FILE), ("Bluttests", BLOOD_TESTS_LONG_FILE)]:
+        if name in loaded and os.path.exists(path):
+            duplicated = read_long_table(path).duplicated(subset=TEST_KEY_COLUMNS + ["measure"], keep=False)
+            if duplicated.any():
+                problems.append(f"{name}: {int(duplicated.sum())} mehrfach gespeicherte Messwerte im Langformat")
+
+    # Gespeicherte Metriken mit einer Neuberechnung vergleichen
+    daily_df = loaded.get("Tageswerte")
+    if daily_df is not None and not daily_df.empty:
+        recomputed = compute_metrics(daily_df, recompute=True)
+        if len(recomputed) > len(daily_df):
+            problems.append(f"Tageswerte: {len(recomputed) - len(daily_df)} Tage nur im Ernährungstagebuch erfasst")
+        stored = daily_df.drop_duplicates(subset=["date", "phase"]).set_index(["date", "phase"])
+        fresh = recomputed.drop_duplicates(subset=["date", "phase"]).set_index(["date", "phase"]).reindex(stored.index)
+        for col in DERIVED_COLUMNS:
+            stored_values = pd.to_numeric(stored[col], errors="coerce").to_numpy(dtype=float)
+            fresh_values = pd.to_numeric(fresh[col], errors="coerce").to_numpy(dtype=float)
+            stale = ~np.isclose(stored_values, fresh_values, equal_nan=True)
+            if stale.any():
+                problems.append(f"Tageswerte: {int(stale.sum())} veraltete Werte in '{col}' (Neuberechnung nötig)")
+
+    return problems
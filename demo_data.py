@@ -0,0 +1,373 @@
+# demo_data.py
+# Synthetische Demodaten ohne Streamlit-Abhängigkeit (Szenario-Demo & Benchmarks)
+# Alle Werte werden spaltenweise als Arrays gezogen (N Tage × M Personen in einem Schritt).
+import os
+import numpy as np
+import pandas as pd
+from datetime import date, timedelta, datetime
+from database import compute_metrics, save_data, save_nutrition_data, save_sport_tests_data, save_blood_tests_data
+
+DEMO_NOTE = "DEMO (synthetisch) – Szenario nach Literatur, kein Messwert"
+
+# Reihenfolge der Zufallszahlen pro Tag (entspricht der früheren Schleife, damit ein Seed
+# weiterhin dieselben Werte liefert)
+DAILY_NOISE = [
+    "body_weight", "bp_sys", "bp_dia",
+    "sleep_hours", "sleep_score", "total_steps", "total_kcal_burn",
+    "intake_kcal", "carbs_g", "protein_g", "fat_g", "water_ml",
+    "hrv_sleep_avg", "rhr_sleep_avg", "rhr_sleep_min", "spo2_sleep_avg", "spo2_sleep_min",
+    "deep_sleep_hours", "deep_sleep_percent", "awakenings",
+    "morning_pulse", "hrv_day_avg", "spo2_day_avg", "stress_avg", "stress_peak",
+    "energy", "mood", "motivation", "concentration",
+]
+
+# Bluttests: Marker -> (Mittel Baseline, Mittel Post-Vegan, Standardabweichung)
+BLOOD_MODEL = {
+    # Rotes & weißes Blutbild (kaum Veränderung)
+    "hemoglobin": (14.5, 14.3, 0.3),
+    "erythrocytes": (4.8, 4.7, 0.2),
+    "mcv": (90, 90, 3),
+    "mch": (30, 30, 1),
+    "thrombocytes": (250, 245, 20),
+    "leukocytes": (6.5, 6.3, 0.5),
+    "segment": (55, 54, 3),
+    "monocytes": (6, 6, 1),
+    "lymphocytes": (30, 31, 2),
+    "basophils": (1, 1, 0.2),
+    "eosinophils": (3, 3, 0.5),
+    # Blutchemie
+    "alat": (25, 23, 3),
+    "asat": (22, 20, 3),
+    "creatinine": (0.9, 0.9, 0.1),
+    "egfr": (95, 96, 5),
+    "iron": (90, 85, 10),
+    "transferrin_saturation": (30, 28, 3),
+    "gamma_gt": (20, 18, 3),
+    "ap": (65, 62, 5),
+    "iron_saturation": (250, 240, 20),
+    "ebk": (4.2, 4.1, 0.2),
+    "ferritin": (80, 75, 10),
+    "transferrin": (280, 290, 20),
+    # Blutfette (moderate Veränderung)
+    "cholesterol": (210, 190, 10),
+    "triglycerides": (120, 110, 15),
+    "ldl_chol": (130, 115, 10),
+    # Elektrolyte
+    "sodium": (140, 139, 2),
+    "calcium": (2.4, 2.4, 0.1),
+    "potassium": (4.2, 4.1, 0.1),
+    # Schilddrüsenhormone
+    "tsh_basal": (1.8, 1.9, 0.2),
+    # Hämatokrit (Blutbild)
+    "hk": (0.1, 0.1, 0.02),
+}
+BLOOD_TESTS = ["Baseline (Omnivor)", "Vegan-Test"]
+
+# Sporttests: Baseline-Werte (Spalte -> (Mittel, Standardabweichung) bzw. fester Wert; Dauern in Sekunden)
+SPORT_BASELINE = {
+    # Cooper-Test
+    "cooper_distance": (2400, 50), "cooper_avg_hr": (165, 5), "cooper_max_hr": (180, 5),
+    "cooper_pace": (5.0, 0.2), "cooper_kcal": (650, 20), "cooper_warmup": (5, 1),
+    "cooper_aerob": (6, 1), "cooper_anaerob": (1, 0.5), "cooper_intensive": 0, "cooper_photo": "",
+    # 5km-Lauf
+    "run5k_time": 1530, "run5k_avg_hr": (170, 5), "run5k_max_hr": (185, 5),
+    "run5k_pace": (5.1, 0.2), "run5k_kcal": (350, 20), "run5k_warmup": (5, 1),
+    "run5k_aerob": (20, 2), "run5k_anaerob": (5, 1), "run5k_intensive": 0, "run5k_photo": "",
+    # Liegestütze
+    "pushups_reps": (35, 3), "pushups_avg_hr": (120, 5), "pushups_max_hr": (140, 5), "pushups_photo": "",
+    # Plank
+    "plank_time": 150, "plank_avg_hr": (110, 5), "plank_max_hr": (125, 5), "plank_photo": "",
+    # Burpee-Test
+    "burpee_reps": (45, 3), "burpee_avg_hr": (150, 5), "burpee_max_hr": (170, 5), "burpee_photo": "",
+    # VO2max-Test
+    "vo2max_value": (45, 2), "vo2max_avg_hr": (175, 5), "vo2max_max_hr": (190, 5),
+    "vo2max_duration": 720, "vo2max_speed": "12.0 km/h", "vo2max_photo": "",
+}
+# Folgetests übernehmen die Baseline und überschreiben einzelne Werte
+# (Testtyp, Tag-Offset als Funktion der Dauer, Werte)
+SPORT_FOLLOWUPS = [
+    ("Mid-Omnivor (2W)", lambda days: days // 4 - 1, {
+        "cooper_distance": (2450, 50), "run5k_time": 1515, "pushups_reps": (36, 3),
+        "plank_time": 155, "burpee_reps": (46, 3), "vo2max_value": (45.5, 2)}),
+    ("Early-Vegan (2W)", lambda days: days * 3 // 4 - 1, {
+        "cooper_distance": (2420, 50), "run5k_time": 1540, "pushups_reps": (34, 3),
+        "plank_time": 145, "burpee_reps": (44, 3), "vo2max_value": (44.5, 2)}),
+    ("Post-Vegan (4W)", lambda days: days - 1, {
+        "cooper_distance": (2380, 50), "run5k_time": 1560, "pushups_reps": (33, 3),
+        "plank_time": 140, "burpee_reps": (43, 3), "vo2max_value": (44, 2)}),
+]
+
+# Mahlzeitentexte je Phase (Rotation über den Tag im Zeitraum)
+OMNIVOR_MEALS = {
+    "breakfast": ["Haferflocken mit Milch und Beeren", "Rührei mit Speck und Toast",
+                  "Joghurt mit Müsli und Honig", "Vollkornbrot mit Butter und Käse"],
+    "snack_1": ["Apfel und Nüsse", "Joghurt", "Banane", "Müsliriegel"],
+    "lunch": ["Hühnerschnitzel mit Kartoffelsalat", "Spaghetti Bolognese mit Parmesan",
+              "Schnitzel mit Pommes und Salat", "Linsensuppe mit Wurst und Brot"],
+    "snack_2": ["Vollkornbrot mit Käse", "Nüsse", "Topfen mit Beeren", "Butterbrot"],
+    "dinner": ["Gebratenes Lachsfilet mit Reis und Gemüse", "Schweinebraten mit Knödeln und Sauerkraut",
+               "Hähnchen-Curry mit Basmatireis", "Rindersteak mit Kartoffeln und Kräuterbutter"],
+}
+VEGAN_MEALS = {
+    "breakfast": ["Haferflocken mit Sojamilch und Beeren", "Tofu-Rührei mit Vollkorntoast",
+                  "Sojajoghurt mit Müsli und Ahornsirup", "Vollkornbrot mit Avocado und Tomaten"],
+    "lunch": ["Linsen-Bolognese mit Vollkornnudeln", "Kichererbsen-Curry mit Basmatireis",
+              "Gemüse-Eintopf mit Vollkornbrot", "Burger mit Sojafrikadelle und Salat"],
+    "dinner": ["Gebratenes Tofu mit Reis und Gemüse", "Veganes Chili mit Mais und Brot",
+               "Gemüse-Quinoa-Pfanne mit Avocado", "Vegane Lasagne mit Tomatensauce"],
+}
+# Vegane Snacks wechseln im Zwei-Tage-Rhythmus ab Beginn der veganen Phase
+VEGAN_SNACKS = {
+    "snack_1": ["Banane und Nüsse", "Smoothie aus Banane, Haferdrink und Samen"],
+    "snack_2": ["Vollkornbrot mit Hummus", "Sojajoghurt mit Nüssen"],
+}
+OMNIVOR_SUPPLEMENTS = "Multivitamin, Magnesium"
+VEGAN_SUPPLEMENTS = "Vitamin B12, DHA (Algenöl), Vitamin D3"
+
+SPORT_NOISE = [col for col, spec in SPORT_BASELINE.items() if isinstance(spec, tuple)] + [
+    col for _, _, values in SPORT_FOLLOWUPS for col, spec in values.items() if isinstance(spec, tuple)]
+
+def _timestamp() -> str:
+    return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+def _draw_noise(athletes: int, days: int) -> dict:
+    """Zieht alle Standardnormal-Zufallszahlen für `athletes` Personen in einem Schritt.
+
+    Pro Person in der Reihenfolge Tageswerte, Bluttests, Sporttests – wie die frühere
+    zeilenweise Erzeugung, sodass derselbe Seed dieselben Werte ergibt.
+    """
+    n_daily = days * len(DAILY_NOISE)
+    n_blood = len(BLOOD_TESTS) * len(BLOOD_MODEL)
+    noise = np.random.standard_normal((athletes, n_daily + n_blood + len(SPORT_NOISE)))
+    return {
+        "daily": noise[:, :n_daily].reshape(athletes * days, len(DAILY_NOISE)),
+        "blood": noise[:, n_daily:n_daily + n_blood].reshape(athletes, len(BLOOD_TESTS), len(BLOOD_MODEL)),
+        "sport": noise[:, n_daily + n_blood:],
+    }
+
+def _block_dates(start_date: date, athletes: int, days: int, offsets) -> np.ndarray:
+    """Datum je Person (Block) und Tag-Offset als Array von date-Objekten, Person für Person."""
+    block_starts = np.datetime64(start_date, "D") + np.arange(athletes) * days
+    dates = block_starts[:, None] + np.asarray(offsets)[None, :]
+    return dates.ravel().astype(object)
+
+def build_daily_demo(noise: np.ndarray, start_date: date, days: int = 56, athletes: int = 1) -> pd.DataFrame:
+    """Erzeugt synthetische Tageswerte; die zweite Hälfte jedes Blocks ist die vegane Phase."""
+    z = dict(zip(DAILY_NOISE, noise.T))
+    day = np.tile(np.arange(1, days + 1), athletes)
+    is_vegan = day > days // 2
+
+    def trend(omnivor, vegan):
+        return np.where(is_vegan, vegan, omnivor)
+
+    # Basis je Phase (vegan: -1 kg, -5/-3 mmHg)
+    body_weight = trend(75.0, 75.0 - 1.0) + 0.2 * z["body_weight"]
+    bp_sys = trend(125, 125 - 5) + 2 * z["bp_sys"]
+    bp_dia = trend(80, 80 - 3) + 2 * z["bp_dia"]
+
+    # Alltags-/Subjektivwerte
+    sleep_hours = np.clip(7.2 + 0.6 * z["sleep_hours"], 4.5, 9.5)
+    sleep_score = np.clip(78 + 8 * z["sleep_score"], 40, 100)
+    total_steps = np.clip(8500 + 1800 * z["total_steps"], 1000, 25000)
+    total_kcal_burn = np.clip(2400 + 250 * z["total_kcal_burn"], 1200, 5000)
+
+    intake_kcal = np.clip(trend(2400, 2400 + 50) + 150 * z["intake_kcal"], 1200, 5000)
+    carbs_g = np.clip(trend(250, 250 + 20) + 25 * z["carbs_g"], 0, 800)
+    protein_g = np.clip(trend(120, 120 - 10) + 15 * z["protein_g"], 0, 400)
+    fat_g = np.clip(trend(80, 80 - 5) + 10 * z["fat_g"], 0, 300)
+    water_ml = np.clip(2500 + 300 * z["water_ml"], 0, 10000)
+
+    hrv_sleep_avg = np.clip(45 + 8 * z["hrv_sleep_avg"], 15, 120)
+    rhr_sleep_avg = np.clip(55 + 6 * z["rhr_sleep_avg"], 35, 95)
+    rhr_sleep_min = np.clip(rhr_sleep_avg - np.abs(4 + 2 * z["rhr_sleep_min"]), 30, 90)
+    spo2_sleep_avg = np.clip(96 + 1.0 * z["spo2_sleep_avg"], 85, 100)
+    spo2_sleep_min = np.clip(spo2_sleep_avg - np.abs(1.5 + 0.8 * z["spo2_sleep_min"]), 80, 100)
+    deep_sleep_hours = np.clip(1.6 + 0.3 * z["deep_sleep_hours"], 0.2, 3.5)
+    deep_sleep_percent = np.clip(20 + 4 * z["deep_sleep_percent"], 5, 45)
+    awakenings = np.clip(2 + np.abs(z["awakenings"]), 0, 12)
+
+    morning_pulse = np.clip(58 + 6 * z["morning_pulse"], 35, 110)
+    hrv_day_avg = np.clip(hrv_sleep_avg + 4 * z["hrv_day_avg"], 10, 140)
+    spo2_day_avg = np.clip(96 + 1.0 * z["spo2_day_avg"], 85, 100)
+    stress_avg = np.clip(35 + 10 * z["stress_avg"], 0, 100)
+    stress_peak = np.clip(stress_avg + np.abs(15 + 10 * z["stress_peak"]), 0, 100)
+
+    energy = np.clip(trend(7.0, 7.0 + 0.2) + 0.7 * z["energy"], 1, 10)
+    mood = np.clip(7.0 + 0.7 * z["mood"], 1, 10)
+    motivation = np.clip(7.0 + 0.8 * z["motivation"], 1, 10)
+    concentration = np.clip(7.0 + 0.7 * z["concentration"], 1, 10)
+
+    as_int = lambda values: values.astype(np.int64)  # Abschneiden wie int()
+    return pd.DataFrame({
+        "date": _block_dates(start_date, athletes, days, np.arange(days)),
+        "weekday": "",  # wird in compute_metrics gesetzt
+        "phase": np.where(is_vegan, "Vegan", "Omnivor"),
+        "sleep_hours": np.round(sleep_hours, 1),
+        "sleep_score": as_int(sleep_score),
+        "hrv_sleep_avg": np.round(hrv_sleep_avg, 1),
+        "rhr_sleep_avg": np.round(rhr_sleep_avg, 1),
+        "rhr_sleep_min": np.round(rhr_sleep_min, 1),
+        "spo2_sleep_avg": np.round(spo2_sleep_avg, 1),
+        "spo2_sleep_min": np.round(spo2_sleep_min, 1),
+        "deep_sleep_hours": np.round(deep_sleep_hours, 2),
+        "deep_sleep_percent": np.round(deep_sleep_percent, 1),
+        "awakenings": as_int(awakenings),
+        "total_steps": as_int(total_steps),
+        "total_kcal_burn": as_int(total_kcal_burn),
+        "intake_kcal": as_int(intake_kcal),
+        "carbs_g": as_int(carbs_g),
+        "protein_g": as_int(protein_g),
+        "fat_g": as_int(fat_g),
+        "water_ml": as_int(water_ml),
+        "morning_pulse": np.round(morning_pulse, 1),
+        "hrv_day_avg": np.round(hrv_day_avg, 1),
+        "spo2_day_avg": np.round(spo2_day_avg, 1),
+        "bp_sys": as_int(np.round(bp_sys)),
+        "bp_dia": as_int(np.round(bp_dia)),
+        "body_weight": np.round(body_weight, 1),
+        "stress_avg": np.round(stress_avg, 1),
+        "stress_peak": np.round(stress_peak, 1),
+        "energy": np.round(energy, 1),
+        "mood": np.round(mood, 1),
+        "motivation": np.round(motivation, 1),
+        "concentration": np.round(concentration, 1),
+        "note": DEMO_NOTE,
+        "last_modified": _timestamp(),
+    })
+
+def build_nutrition_demo(daily_df: pd.DataFrame, days: int = 56) -> pd.DataFrame:
+    """Erzeugt das Ernährungstagebuch passend zu den Tageswerten (Nährstoffe werden übernommen)."""
+    idx = np.tile(np.arange(days), len(daily_df) // days)
+    is_vegan = idx >= days // 2
+    vegan_idx = (idx - days // 2) % 2
+
+    def meals(slot):
+        omnivor = np.asarray(OMNIVOR_MEALS[slot], dtype=object)[idx % len(OMNIVOR_MEALS[slot])]
+        if slot in VEGAN_SNACKS:
+            vegan = np.asarray(VEGAN_SNACKS[slot], dtype=object)[vegan_idx]
+        else:
+            vegan = np.asarray(VEGAN_MEALS[slot], dtype=object)[idx % len(VEGAN_MEALS[slot])]
+        return np.where(is_vegan, vegan, omnivor)
+
+    return pd.DataFrame({
+        "date": daily_df["date"].to_numpy(),
+        "phase": daily_df["phase"].to_numpy(),
+        "breakfast": meals("breakfast"),
+        "snack_1": meals("snack_1"),
+        "lunch": meals("lunch"),
+        "snack_2": meals("snack_2"),
+        "dinner": meals("dinner"),
+        "supplements": np.where(is_vegan, VEGAN_SUPPLEMENTS, OMNIVOR_SUPPLEMENTS),
+        "nutrition_note": DEMO_NOTE,
+        # Nährstoffwerte (aus den Tageswerten übernehmen)
+        "intake_kcal": daily_df["intake_kcal"].to_numpy(),
+        "carbs_g": daily_df["carbs_g"].to_numpy(),
+        "protein_g": daily_df["protein_g"].to_numpy(),
+        "fat_g": daily_df["fat_g"].to_numpy(),
+        "water_ml": daily_df["water_ml"].to_numpy(),
+        "last_modified": _timestamp(),
+    })
+
+def build_blood_demo(noise: np.ndarray, start_date: date, days: int = 56, athletes: int = 1) -> pd.DataFrame:
+    """Erzeugt je Person zwei Bluttests (Baseline am ersten, Post-Vegan am letzten Tag)."""
+    means = np.array([[spec[0] for spec in BLOOD_MODEL.values()], [spec[1] for spec in BLOOD_MODEL.values()]])
+    sds = np.array([spec[2] for spec in BLOOD_MODEL.values()])
+    values = (means[None, :, :] + sds * noise).reshape(athletes * len(BLOOD_TESTS), len(BLOOD_MODEL))
+
+    data = {
+        "test_date": _block_dates(start_date, athletes, days, [0, days - 1]),
+        "test_type": np.tile(BLOOD_TESTS, athletes),
+        "notes": DEMO_NOTE,
+        "pdf_file": "",
+    }
+    data.update(zip(BLOOD_MODEL, values.T))
+    data["last_modified"] = _timestamp()
+    return pd.DataFrame(data)
+
+def build_sport_demo(noise: np.ndarray, start_date: date, days: int = 56, athletes: int = 1) -> pd.DataFrame:
+    """Erzeugt je Person vier Sporttests (Baseline, Mid-Omnivor, Early-Vegan, Post-Vegan)."""
+    z = iter(noise.T)
+    tests = len(SPORT_FOLLOWUPS) + 1
+
+    def value(spec):
+        return spec[0] + spec[1] * next(z) if isinstance(spec, tuple) else spec
+
+    def grid(spec):
+        # Ein Wert je Person, für alle Tests der Person übernommen
+        if isinstance(spec, tuple):
+            values = np.empty((athletes, tests))
+            values[:] = value(spec)[:, None]
+            return values
+        return np.full((athletes, tests), spec, dtype=object if isinstance(spec, str) else None)
+
+    columns = {col: grid(spec) for col, spec in SPORT_BASELINE.items()}
+    for position, (_, _, overrides) in enumerate(SPORT_FOLLOWUPS, start=1):
+        for col, spec in overrides.items():
+            columns[col][:, position] = value(spec)
+
+    data = {
+        "test_date": _block_dates(start_date, athletes, days, [0] + [offset(days) for _, offset, _ in SPORT_FOLLOWUPS]),
+        "test_type": np.tile(["Baseline (Omnivor)"] + [name for name, _, _ in SPORT_FOLLOWUPS], athletes),
+        "general_notes": "DEMO (synthetisch) – keine Aussage zur Leistungsfähigkeit",
+    }
+    data.update((col, values.ravel()) for col, values in columns.items())
+    data["last_modified"] = _timestamp()
+    return pd.DataFrame(data)
+
+def _build_block(athletes: int, days: int, start_date: date) -> dict:
+    """Erzeugt die vier Tabellen für einen Block direkt aufeinanderfolgender Personen."""
+    noise = _draw_noise(athletes, days)
+    daily_df = build_daily_demo(noise["daily"], start_date, days, athletes)
+    return {
+        "daily": daily_df,
+        "nutrition": build_nutrition_demo(daily_df, days),
+        "blood": build_blood_demo(noise["blood"], start_date, days, athletes),
+        "sport": build_sport_demo(noise["sport"], start_date, days, athletes),
+    }
+
+def build_demo_tables(days: int = 56, athletes: int = 1, seed: int = 42, start_date: date = None) -> dict:
+    """Erzeugt alle vier Tabellen für `athletes` Personen mit je `days` Tagen.
+
+    Die App kennt keine Personen-Spalte; jede synthetische Person belegt daher einen
+    eigenen, direkt anschließenden Datumsblock, damit (Datum, Phase) eindeutig bleibt.
+    Die Tageswerte enthalten noch keine berechneten Metriken.
+    """
+    np.random.seed(seed)
+    start_date = start_date or date.today() - timedelta(days=days * athletes)
+    return _build_block(athletes, days, start_date)
+
+def write_demo_partitions(out_dir: str, days: int = 56, athletes: int = 1, seed: int = 42,
+                          start_date: date = None, athletes_per_partition: int = 100) -> list:
+    """Erzeugt die Demodaten partitionsweise und schreibt sie direkt als CSV auf die Platte.
+
+    Pro Partition (`athletes_per_partition` Personen) entsteht je Tabelle eine Datei
+    `<tabelle>/part-00000.csv`; im Speicher liegt immer nur eine Partition. Bei gleichem
+    Seed sind die Werte unabhängig von der Partitionsgröße identisch mit build_demo_tables.
+    Gibt die geschriebenen Pfade zurück.
+    """
+    np.random.seed(seed)
+    start_date = start_date or date.today() - timedelta(days=days * athletes)
+    table_names = {"daily": "daily_log", "nutrition": "nutrition_log", "blood": "blood_tests", "sport": "sport_tests"}
+    for name in table_names.values():
+        os.makedirs(os.path.join(out_dir, name), exist_ok=True)
+
+    paths = []
+    for part, first in enumerate(range(0, athletes, athletes_per_partition)):
+        block_size = min(athletes_per_partition, athletes - first)
+        tables = _build_block(block_size, days, start_date + timedelta(days=first * days))
+        for key, df in tables.items():
+            path = os.path.join(out_dir, table_names[key], f"part-{part:05d}.csv")
+            df.to_csv(path, index=False)
+            paths.append(path)
+    return paths
+
+def generate_demo_data():
+    """Erzeugt synthetische Demodaten für alle Bereiche der App (4W Omnivor → 4W Vegan) und speichert sie."""
+    tables = build_demo_tables(days=56, athletes=1, seed=42)
+
+    # Tageswerte speichern (inkl. berechneter Metriken)
+    save_data(compute_metrics(tables["daily"]))
+    save_nutrition_data(tables["nutrition"])
+    save_blood_tests_data(tables["blood"])
+    save_sport_tests_data(tables["sport"])
+    return True
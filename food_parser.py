@@ -0,0 +1,343 @@
+# food_parser.py
+# Offline-Schätzung der Nährwerte aus den Mahlzeiten-Texten des Ernährungstagebuchs.
+# Lebensmittel-Tabelle (eingebaut + optional data/food_table.csv) als Hash-Index über
+# normalisierte Namen, Zerlegung der Texte in Posten mit Menge/Einheit, LRU-Cache der
+# zerlegten Mahlzeiten und Nachtragen der Makros für ältere Einträge.
+# Richtwerte je 100 g (Flüssigkeiten je 100 ml) nach gängigen Nährwerttabellen – Schätzung, keine Messung.
+import functools
+import os
+import re
+import unicodedata
+from typing import NamedTuple
+import numpy as np
+import pandas as pd
+from config import FOOD_TABLE_FILE
+from database import table_version
+from profiling import profiled
+
+MEAL_FIELDS = ["breakfast", "snack_1", "lunch", "snack_2", "dinner"]
+# Reihenfolge entspricht den Nährwert-Spalten der Tabelle
+MACRO_COLUMNS = ["intake_kcal", "protein_g", "carbs_g", "fat_g"]
+
+# Registry: (Name, Synonyme, kcal, Eiweiß g, Kohlenhydrate g, Fett g je 100 g, übliche Portion in g)
+FOOD_TABLE = [
+    # Getreide & Beilagen
+    ("Haferflocken", ["hafer", "porridge", "haferbrei"], 370, 13.5, 59, 7.0, 50),
+    ("Müsli", ["muesli", "granola"], 380, 10, 62, 9.0, 60),
+    ("Brot", ["vollkornbrot", "schwarzbrot", "roggenbrot"], 220, 7.5, 41, 1.5, 50),
+    ("Brötchen", ["semmel", "weckerl", "schrippe"], 270, 9, 52, 1.5, 60),
+    ("Toast", ["toastbrot"], 265, 8, 48, 4.0, 25),
+    ("Knäckebrot", [], 350, 10, 65, 2.0, 10),
+    ("Reis", ["basmati", "basmatireis", "vollkornreis"], 130, 2.7, 28, 0.3, 180),
+    ("Nudeln", ["pasta", "spaghetti", "penne", "vollkornnudeln"], 150, 5.5, 30, 0.9, 200),
+    ("Kartoffeln", ["kartoffel", "salzkartoffeln", "pellkartoffeln"], 75, 2, 16, 0.1, 200),
+    ("Kartoffelsalat", [], 140, 2, 14, 8.5, 200),
+    ("Knödel", ["klöße", "kloß", "semmelknödel"], 150, 4, 30, 1.5, 150),
+    ("Pommes", ["pommes frites"], 290, 3.4, 36, 15, 150),
+    ("Quinoa", [], 120, 4.4, 21, 1.9, 180),
+    ("Couscous", [], 112, 3.8, 23, 0.2, 180),
+    ("Tortilla", ["wrap"], 300, 8, 50, 7.5, 60),
+    ("Pizza", [], 250, 11, 30, 9.5, 350),
+    ("Lasagne", [], 150, 8, 13, 7, 350),
+    ("Mais", [], 90, 3.3, 16, 1.2, 100),
+    # Hülsenfrüchte & Sojaprodukte
+    ("Linsen", ["rote linsen", "linsensuppe", "dal"], 115, 9, 20, 0.4, 200),
+    ("Kichererbsen", ["hummus"], 165, 8.5, 23, 4.5, 150),
+    ("Bohnen", ["kidneybohnen", "schwarze bohnen", "weiße bohnen"], 110, 7.5, 17, 0.5, 150),
+    ("Erbsen", [], 80, 5.4, 14, 0.4, 150),
+    ("Tofu", ["räuchertofu"], 145, 15, 2, 8.5, 150),
+    ("Tempeh", [], 195, 19, 9, 11, 100),
+    ("Seitan", [], 140, 25, 6, 2, 100),
+    ("Sojagranulat", ["soja schnetzel", "sojaschnetzel"], 340, 50, 30, 1.5, 50),
+    ("Edamame", [], 120, 11, 9, 5, 100),
+    # Fleisch, Fisch, Ei
+    ("Hähnchen", ["hähnchenbrust", "hühnchen", "huhn", "chicken", "pute", "putenbrust"], 110, 23, 0, 1.5, 150),
+    ("Rindfleisch", ["rind", "steak", "hackfleisch", "hack", "rinderhack"], 200, 26, 0, 10, 150),
+    ("Schweinefleisch", ["schwein", "schnitzel", "kotelett", "braten"], 170, 22, 0, 8.5, 150),
+    ("Wurst", ["salami", "würstchen", "bratwurst", "wiener"], 300, 14, 1, 27, 50),
+    ("Speck", ["bacon"], 400, 15, 0, 38, 30),
+    ("Frikadelle", ["bulette", "sojafrikadelle", "bratling"], 230, 15, 9, 15, 100),
+    ("Schinken", ["kochschinken"], 120, 20, 1, 4, 30),
+    ("Lachs", ["lachsfilet"], 200, 20, 0, 13, 125),
+    ("Thunfisch", [], 115, 26, 0, 1, 100),
+    ("Fisch", ["seelachs", "kabeljau", "forelle"], 90, 19, 0, 1, 150),
+    ("Ei", ["eier", "rührei", "spiegelei", "omelett"], 155, 13, 1.1, 11, 60),
+    # Milchprodukte & Alternativen
+    ("Milch", ["kuhmilch", "vollmilch"], 64, 3.4, 4.8, 3.5, 200),
+    ("Hafermilch", ["haferdrink"], 45, 0.8, 6.5, 1.5, 200),
+    ("Sojamilch", ["sojadrink"], 40, 3.3, 1.5, 2, 200),
+    ("Joghurt", ["naturjoghurt", "jogurt"], 65, 4, 4.5, 3.5, 150),
+    ("Sojajoghurt", ["veganer joghurt"], 50, 4, 2.5, 2.3, 150),
+    ("Skyr", [], 63, 11, 4, 0.2, 150),
+    ("Quark", ["magerquark", "topfen"], 67, 12, 4, 0.3, 125),
+    ("Käse", ["gouda", "emmentaler", "cheddar", "mozzarella", "feta", "parmesan"], 350, 25, 0.5, 27, 30),
+    ("Frischkäse", [], 250, 6, 3.5, 24, 30),
+    ("Butter", [], 740, 0.7, 0.6, 82, 10),
+    ("Margarine", [], 710, 0.2, 0.5, 80, 10),
+    # Obst
+    ("Apfel", ["äpfel"], 52, 0.3, 12, 0.2, 150),
+    ("Banane", [], 90, 1.1, 20, 0.3, 120),
+    ("Beeren", ["heidelbeeren", "himbeeren", "erdbeeren", "blaubeeren"], 40, 0.8, 7, 0.4, 125),
+    ("Orange", ["apfelsine", "mandarine", "clementine"], 47, 0.9, 9, 0.1, 150),
+    ("Birne", [], 55, 0.4, 12, 0.3, 150),
+    ("Trauben", ["weintrauben"], 70, 0.7, 16, 0.2, 125),
+    ("Avocado", [], 160, 2, 2, 15, 140),
+    ("Datteln", ["dattel"], 280, 2.5, 65, 0.4, 30),
+    ("Rosinen", [], 300, 3, 68, 0.5, 30),
+    # Gemüse
+    ("Gemüse", ["gemüsepfanne", "ofengemüse"], 35, 2, 5, 0.3, 200),
+    ("Salat", ["blattsalat", "gurke", "gurken"], 15, 1, 2, 0.2, 100),
+    ("Sauerkraut", ["kraut", "rotkohl"], 20, 1.5, 2, 0.3, 150),
+    ("Tomate", ["tomaten", "tomatensoße", "tomatensauce"], 20, 1, 3, 0.2, 120),
+    ("Brokkoli", ["broccoli"], 35, 3, 4, 0.4, 150),
+    ("Spinat", [], 23, 2.9, 1.4, 0.4, 150),
+    ("Paprika", [], 30, 1, 6, 0.3, 120),
+    ("Karotte", ["karotten", "möhre", "möhren"], 40, 0.9, 8, 0.2, 100),
+    ("Zucchini", [], 20, 1.5, 2.5, 0.3, 150),
+    ("Pilze", ["champignons"], 22, 3, 0.5, 0.3, 100),
+    ("Süßkartoffel", ["süßkartoffeln"], 86, 1.6, 20, 0.1, 200),
+    # Nüsse, Samen, Fette
+    ("Nüsse", ["walnüsse", "haselnüsse", "cashews", "nussmix"], 640, 16, 10, 58, 30),
+    ("Mandeln", [], 600, 21, 9, 52, 30),
+    ("Erdnüsse", [], 590, 26, 13, 48, 30),
+    ("Erdnussbutter", ["erdnussmus", "nussmus", "mandelmus"], 600, 25, 15, 50, 20),
+    ("Leinsamen", ["chiasamen", "chia", "samen", "kerne", "kürbiskerne", "sonnenblumenkerne"], 500, 20, 8, 35, 15),
+    ("Olivenöl", ["öl", "rapsöl", "leinöl"], 880, 0, 0, 100, 10),
+    # Süßes, Aufstriche, Snacks
+    ("Marmelade", ["konfitüre"], 250, 0.4, 60, 0.1, 20),
+    ("Honig", ["agavendicksaft", "ahornsirup"], 310, 0.3, 80, 0, 20),
+    ("Schokolade", ["zartbitterschokolade"], 540, 7, 50, 33, 20),
+    ("Kuchen", ["torte"], 350, 5, 45, 16, 100),
+    ("Kekse", ["keks", "cookies"], 480, 6, 65, 21, 30),
+    ("Chips", [], 530, 6, 52, 33, 50),
+    ("Proteinriegel", ["eiweißriegel"], 360, 30, 35, 11, 50),
+    ("Müsliriegel", [], 420, 6, 65, 15, 25),
+    # Getränke & Supplements
+    ("Proteinshake", ["proteinpulver", "whey", "eiweißshake", "veganes protein"], 380, 75, 8, 5, 30),
+    ("Saft", ["orangensaft", "apfelsaft", "smoothie"], 45, 0.5, 10, 0.1, 250),
+    ("Kaffee", ["espresso", "tee"], 2, 0.1, 0.3, 0, 200),
+    ("Cappuccino", ["latte", "milchkaffee"], 45, 2.5, 4, 2, 250),
+    ("Bier", [], 43, 0.5, 3.6, 0, 500),
+    ("Wein", ["rotwein", "weißwein"], 80, 0.1, 2.6, 0, 200),
+    # Gerichte
+    ("Suppe", ["eintopf"], 60, 3, 8, 2, 350),
+    ("Curry", ["gemüsecurry"], 120, 4, 10, 7, 350),
+    ("Chili", ["chili con carne", "chili sin carne"], 110, 7, 11, 4, 350),
+    ("Burger", ["veggie burger"], 250, 13, 25, 11, 220),
+    ("Bowl", ["buddha bowl"], 140, 6, 18, 5, 400),
+]
+
+# Mengeneinheiten -> Gramm; None = Anzahl übliche Portionen des Lebensmittels
+UNIT_GRAMS = {
+    "g": 1, "gr": 1, "gramm": 1, "kg": 1000, "ml": 1, "l": 1000, "liter": 1000,
+    "el": 15, "essloffel": 15, "tl": 5, "teeloffel": 5, "prise": 0.5,
+    "tasse": 240, "tassen": 240, "glas": 200, "glaser": 200, "becher": 150,
+    "handvoll": 30, "schussel": 300, "schale": 250, "dose": 240,
+    "stuck": None, "stk": None, "scheibe": None, "scheiben": None, "portion": None, "portionen": None,
+}
+NUMBER_WORDS = {"ein": 1, "eine": 1, "einen": 1, "einem": 1, "zwei": 2, "drei": 3, "vier": 4, "funf": 5,
+                "halb": 0.5, "halbe": 0.5, "halber": 0.5, "halbes": 0.5, "viertel": 0.25}
+_FRACTIONS = {"½": "0.5", "¼": "0.25", "¾": "0.75", "⅓": "0.333", "⅔": "0.667"}
+# Trennstellen zwischen den Posten einer Mahlzeit
+_ITEM_SPLIT = re.compile(r"[,;\n+&]|\b(?:und|mit|dazu|auf)\b")
+_NUMBER = r"\d+(?:\.\d+)?(?:/\d+)?"
+_QUANTITY = re.compile(rf"(?<![\w.])({_NUMBER})\s*({'|'.join(sorted(UNIT_GRAMS, key=len, reverse=True))})?\b")
+_TOKEN = re.compile(r"[a-z]+")
+# Kürzester Wortteil, der bei zusammengesetzten Wörtern als Lebensmittel gilt
+MIN_COMPOUND_PART = 4
+
+class MealItem(NamedTuple):
+    """Ein erkannter (oder unbekannter, food=None) Posten einer Mahlzeit."""
+    text: str
+    food: str
+    grams: float
+    kcal: float
+    protein_g: float
+    carbs_g: float
+    fat_g: float
+
+def normalize(text: str) -> str:
+    """Kleinschreibung, Umlaute/Akzente ohne Zeichen, ß -> ss, Brüche und Dezimalkomma vereinheitlicht."""
+    text = str(text).lower().replace("ß", "ss")
+    for symbol, value in _FRACTIONS.items():
+        text = text.replace(symbol, f" {value} ")
+    text = re.sub(r"(\d),(\d)", r"\1.\2", text)
+    text = unicodedata.normalize("NFKD", text)
+    return "".join(ch for ch in text if not unicodedata.combining(ch))
+
+def _stems(token: str):
+    """Der Token selbst und einfache Plural-/Flexionsformen (Eier -> Ei, Bananen -> Banane)."""
+    yield token
+    for suffix in ("en", "n", "e", "s", "er"):
+        if token.endswith(suffix) and len(token) - len(suffix) >= 2:
+            yield token[:-len(suffix)]
+
+class FoodIndex(NamedTuple):
+    names: list
+    nutrients: np.ndarray  # (Lebensmittel, 4): kcal, Eiweiß, Kohlenhydrate, Fett je g
+    portion_g: np.ndarray
+    phrases: dict  # normalisierte Wortfolge -> Zeile
+    max_words: int
+
+def _read_user_foods() -> list:
+    """Eigene Lebensmittel aus FOOD_TABLE_FILE (Spalten wie FOOD_TABLE, Synonyme durch | getrennt)."""
+    if not os.path.exists(FOOD_TABLE_FILE):
+        return []
+    df = pd.read_csv(FOOD_TABLE_FILE)
+    aliases = df["aliases"].fillna("").astype(str) if "aliases" in df.columns else pd.Series("", index=df.index)
+    portion = df["portion_g"].fillna(100) if "portion_g" in df.columns else pd.Series(100, index=df.index)
+    return list(zip(df["name"].astype(str), aliases.str.split("|"), df["kcal"], df["protein_g"], df["carbs_g"], df["fat_g"], portion))
+
+@functools.lru_cache(maxsize=1)
+def _food_index_for_version(version) -> FoodIndex:
+    # Eigene Einträge werden zuletzt eingetragen und überschreiben gleichnamige eingebaute
+    rows = FOOD_TABLE + _read_user_foods()
+    nutrients = np.array([row[2:6] for row in rows], dtype=float) / 100.0
+    portion_g = np.array([row[6] for row in rows], dtype=float)
+    phrases = {}
+    for i, (name, aliases, *_) in enumerate(rows):
+        for phrase in [name, *aliases]:
+            words = tuple(_TOKEN.findall(normalize(phrase)))
+            if words:
+                phrases[" ".join(words)] = i
+    max_words = max(len(p.split()) for p in phrases)
+    return FoodIndex([row[0] for row in rows], nutrients, portion_g, phrases, max_words)
+
+def food_index() -> FoodIndex:
+    """Index der Lebensmittel-Tabelle; neu aufgebaut, wenn sich FOOD_TABLE_FILE ändert."""
+    return _food_index_for_version(table_version(FOOD_TABLE_FILE))
+
+def _match_compound(word: str, index: FoodIndex):
+    """Zusammengesetzte Wörter: zuerst das längste bekannte Grundwort am Ende (Hühnerschnitzel ->
+    Schnitzel), sonst das längste bekannte Bestimmungswort am Anfang (Lachsfilet -> Lachs)."""
+    for start in range(1, len(word) - MIN_COMPOUND_PART + 1):
+        for stem in _stems(word[start:]):
+            if len(stem) >= MIN_COMPOUND_PART and stem in index.phrases:
+                return index.phrases[stem]
+    for end in range(len(word) - 1, MIN_COMPOUND_PART - 1, -1):
+        if word[:end] in index.phrases:
+            return index.phrases[word[:end]]
+    return None
+
+def _match_food(words: list, index: FoodIndex):
+    """Längste bekannte Wortfolge (auch in Grundform) im Posten; liefert die Zeile oder None."""
+    for length in range(min(index.max_words, len(words)), 0, -1):
+        for start in range(len(words) - length + 1):
+            window = words[start:start + length]
+            row = index.phrases.get(" ".join(window))
+            if row is None and length == 1:
+                row = next((index.phrases[s] for s in _stems(window[0]) if s in index.phrases), None)
+            if row is not None:
+                return row
+    # Erst wenn kein Wort direkt bekannt ist, Wortteile prüfen (vom letzten Wort an)
+    for word in reversed(words):
+        row = _match_compound(word, index)
+        if row is not None:
+            return row
+    return None
+
+def _quantity(item: str):
+    """(Menge, Einheit) des Postens; ohne Angabe (1, None) = eine übliche Portion."""
+    match = _QUANTITY.search(item)
+    if match:
+        number, unit = match.groups()
+        if "/" in number:
+            num, den = number.split("/")
+            value = float(num) / float(den) if float(den) else 1.0
+        else:
+            value = float(number)
+        return value, unit, item[:match.start()] + " " + item[match.end():]
+    words = item.split()
+    if words and words[0] in NUMBER_WORDS:
+        return NUMBER_WORDS[words[0]], None, " ".join(words[1:])
+    return 1.0, None, item
+
+def _parse_item(raw: str, index: FoodIndex) -> MealItem:
+    amount, unit, rest = _quantity(raw)
+    words = _TOKEN.findall(rest)
+    # Einheit als Wort (z.B. "2 Scheiben Brot") ohne vorangestellte Zahl
+    if unit is None and words and words[0] in UNIT_GRAMS:
+        unit, words = words[0], words[1:]
+    row = _match_food(words, index)
+    if row is None:
+        return MealItem(raw.strip(), None, 0.0, 0.0, 0.0, 0.0, 0.0)
+    per_unit = UNIT_GRAMS.get(unit) if unit else None
+    grams = amount * (per_unit if per_unit is not None else index.portion_g[row])
+    kcal, protein, carbs, fat = (index.nutrients[row] * grams).tolist()
+    return MealItem(raw.strip(), index.names[row], grams, kcal, protein, carbs, fat)
+
+@functools.lru_cache(maxsize=4096)
+def _parse_meal_cached(text: str, version) -> tuple:
+    index = _food_index_for_version(version)
+    items = (part for part in _ITEM_SPLIT.split(normalize(text)) if part and part.strip())
+    return tuple(_parse_item(item, index) for item in items)
+
+def parse_meal(text) -> tuple:
+    """Zerlegt einen Mahlzeiten-Text in Posten (MealItem); Ergebnisse werden je Text zwischengespeichert."""
+    if text is None or (isinstance(text, float) and np.isnan(text)) or not str(text).strip():
+        return ()
+    return _parse_meal_cached(str(text).strip(), table_version(FOOD_TABLE_FILE))
+
+def meal_totals(text) -> np.ndarray:
+    """Summe kcal, Eiweiß, Kohlenhydrate, Fett (g) eines Mahlzeiten-Texts."""
+    items = parse_meal(text)
+    if not items:
+        return np.zeros(4)
+    return np.array([[i.kcal, i.protein_g, i.carbs_g, i.fat_g] for i in items]).sum(axis=0)
+
+@profiled
+def estimate_meals(meals: dict) -> dict:
+    """Schätzt die Makros eines Tages aus {Mahlzeit-Spalte: Text}.
+
+    Liefert die Werte unter den Spaltennamen von MACRO_COLUMNS sowie "recognized" (erkannte Posten)
+    und "unknown" (Texte der nicht erkannten Posten).
+    """
+    items = [item for field in MEAL_FIELDS for item in parse_meal(meals.get(field))]
+    totals = np.array([[i.kcal, i.protein_g, i.carbs_g, i.fat_g] for i in items if i.food]).sum(axis=0) \
+        if any(i.food for i in items) else np.zeros(4)
+    result = _rounded(dict(zip(MACRO_COLUMNS, totals.tolist())))
+    result["recognized"] = sum(1 for i in items if i.food)
+    result["unknown"] = [i.text for i in items if not i.food]
+    return result
+
+def _rounded(values: dict) -> dict:
+    return {col: (round(v) if col == "intake_kcal" else round(v, 1)) for col, v in values.items()}
+
+@profiled
+def estimate_nutrients(df: pd.DataFrame) -> pd.DataFrame:
+    """Geschätzte Makros je Tagebuchzeile (Spalten MACRO_COLUMNS, gleicher Index wie df).
+
+    Jeder unterschiedliche Text wird nur einmal zerlegt; die Summen werden spaltenweise zugeordnet.
+    """
+    totals = np.zeros((len(df), len(MACRO_COLUMNS)))
+    for field in [f for f in MEAL_FIELDS if f in df.columns]:
+        texts = df[field].astype("string").fillna("").str.strip()
+        codes, uniques = pd.factorize(texts)
+        per_text = np.array([meal_totals(t) for t in uniques]) if len(uniques) else np.zeros((0, 4))
+        totals += per_text[codes]
+    return pd.DataFrame(totals, index=df.index, columns=MACRO_COLUMNS)
+
+@profiled
+def backfill_macros(df: pd.DataFrame, overwrite: bool = False):
+    """Trägt geschätzte Makros in Tagebuchzeilen ohne eigene Angaben nach.
+
+    Ohne `overwrite` werden nur Zeilen ergänzt, in denen alle Makros fehlen oder 0 sind; Zeilen ohne
+    erkanntes Lebensmittel bleiben unverändert. Gibt (DataFrame, Anzahl ergänzter Zeilen) zurück.
+    """
+    if df.empty:
+        return df, 0
+    df = df.copy()
+    for col in MACRO_COLUMNS:
+        if col not in df.columns:
+            df[col] = np.nan
+    estimates = estimate_nutrients(df)
+    current = df[MACRO_COLUMNS].apply(pd.to_numeric, errors="coerce").astype(float)
+    target = estimates["intake_kcal"] > 0
+    if not overwrite:
+        target &= (current.fillna(0) == 0).all(axis=1)
+    if target.any():
+        estimates = estimates[target]
+        df[MACRO_COLUMNS] = current
+        df.loc[target, "intake_kcal"] = estimates["intake_kcal"].round()
+        df.loc[target, MACRO_COLUMNS[1:]] = estimates[MACRO_COLUMNS[1:]].round(1)
+    return df, int(target.sum())
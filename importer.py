@@ -0,0 +1,137 @@
+# importer.py
+# CSV-Import von Tageswerten ohne Streamlit-Abhängigkeit (UI-Import & cli.py)
+import pandas as pd
+from datetime import datetime
+from config import COLUMNS
+
+PHASES = ["Omnivor", "Vegan"]
+DATE_FORMATS = ["%Y-%m-%d", "%d.%m.%Y", "%m/%d/%Y"]
+NON_NUMERIC_COLUMNS = ['date', 'phase', 'weekday', 'note', 'last_modified']
+
+def _rewind(source) -> None:
+    """Setzt Upload-Objekte vor einem erneuten Leseversuch auf den Anfang zurück."""
+    if hasattr(source, "seek"):
+        source.seek(0)
+
+def _has_decimal_commas(df: pd.DataFrame) -> bool:
+    """Prüft, ob Textspalten Zahlen mit Komma als Dezimaltrennzeichen enthalten."""
+    for col in df.select_dtypes(exclude="number").columns:
+        if df[col].astype(str).str.fullmatch(r"-?\d+,\d+").any():
+            return True
+    return False
+
+def _read_with_delimiters(source, encoding: str):
+    """Versucht die CSV mit Komma bzw. Semikolon als Trennzeichen zu lesen."""
+    for delimiter in [',', ';']:
+        try:
+            _rewind(source)
+            import_df = pd.read_csv(source, delimiter=delimiter, encoding=encoding)
+        except Exception:
+            continue
+        # Nur eine Spalte erkannt -> vermutlich falsches Trennzeichen
+        if len(import_df.columns) == 1 and delimiter == ',':
+            continue
+        # Textspalten mit Werten wie "5,5" -> erneut mit Komma als Dezimaltrennzeichen lesen
+        if delimiter != ',' and _has_decimal_commas(import_df):
+            try:
+                _rewind(source)
+                import_df = pd.read_csv(source, delimiter=delimiter, decimal=',', encoding=encoding)
+            except Exception:
+                pass
+        return import_df
+    return None
+
+def read_csv_flexible(source):
+    """Liest eine CSV-Datei (Pfad oder Upload-Objekt) mit unbekanntem Trennzeichen und Kodierung.
+
+    Gibt None zurück, wenn keine Kombination aus Kodierung und Trennzeichen funktioniert.
+    """
+    for encoding in ['utf-8', 'latin1', 'iso-8859-1']:
+        import_df = _read_with_delimiters(source, encoding)
+        if import_df is not None:
+            return import_df
+    return None
+
+def default_column_mapping(import_df: pd.DataFrame) -> dict:
+    """Ordnet CSV-Spalten, die exakt wie App-Spalten heißen, automatisch zu."""
+    return {col: col for col in COLUMNS if col in import_df.columns}
+
+def prepare_import_frame(import_df: pd.DataFrame, column_mapping: dict):
+    """Benennt die CSV-Spalten laut Zuordnung um und bereinigt Datum, Phase und Zahlenwerte.
+
+    Gibt (DataFrame, Warnungen) zurück; bei fehlender Datum/Phase-Zuordnung wird ein ValueError ausgelöst.
+    """
+    if not column_mapping.get("date") or not column_mapping.get("phase"):
+        raise ValueError("Die Zuordnung für 'Datum' und 'Phase' ist zwingend erforderlich!")
+
+    warnings = []
+
+    # DataFrame für den Import vorbereiten
+    df_to_import = import_df[list(column_mapping.values())].copy()
+    df_to_import.columns = list(column_mapping.keys())
+
+    # Versuche verschiedene Datumsformate, sonst ohne Format
+    raw_dates = df_to_import['date']
+    for date_format in DATE_FORMATS:
+        try:
+            parsed = pd.to_datetime(raw_dates, format=date_format)
+            break
+        except (ValueError, TypeError):
+            continue
+    else:
+        parsed = pd.to_datetime(raw_dates, errors='coerce')
+    df_to_import['date'] = parsed.dt.date
+
+    # Prüfe auf ungültige Daten
+    if df_to_import['date'].isnull().any():
+        warnings.append("Einige Daten konnten nicht konvertiert werden und werden ignoriert.")
+        df_to_import = df_to_import.dropna(subset=['date'])
+
+    # Phase validieren
+    df_to_import['phase'] = df_to_import['phase'].astype(str).str.title()
+    valid_phase = df_to_import['phase'].isin(PHASES)
+    if not valid_phase.all():
+        warnings.append("Die Spalte 'Phase' enthält Werte, die nicht 'Omnivor' oder 'Vegan' sind. Diese werden ignoriert.")
+        df_to_import = df_to_import[valid_phase]
+
+    # Numerische Spalten konvertieren
+    numeric_cols = [col for col in COLUMNS if col not in NON_NUMERIC_COLUMNS]
+    for col in numeric_cols:
+        if col in df_to_import.columns:
+            df_to_import[col] = pd.to_numeric(df_to_import[col], errors='coerce')
+
+    return df_to_import, warnings
+
+def merge_import(existing_df: pd.DataFrame, df_to_import: pd.DataFrame, overwrite: bool = False):
+    """Führt importierte Zeilen mit den bestehenden Tageswerten zusammen (Schlüssel: Datum & Phase).
+
+    Gibt (DataFrame, Anzahl neuer Einträge, Anzahl aktualisierter Einträge) zurück.
+    """
+    key_cols = ["date", "phase"]
+    df_to_import = df_to_import.assign(last_modified=datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+    # Bei Duplikaten in der Datei gewinnt beim Überschreiben die letzte, sonst die erste Zeile
+    df_to_import = df_to_import.drop_duplicates(subset=key_cols, keep="last" if overwrite else "first")
+
+    if existing_df.empty:
+        return df_to_import.reset_index(drop=True), len(df_to_import), 0
+
+    existing_keys = pd.MultiIndex.from_frame(existing_df[key_cols])
+    import_keys = pd.MultiIndex.from_frame(df_to_import[key_cols])
+    is_existing = import_keys.isin(existing_keys)
+
+    updated_count = 0
+    if overwrite and is_existing.any():
+        updates = df_to_import[is_existing].set_index(key_cols)
+        result = existing_df.set_index(key_cols)
+        hit = result.index.isin(updates.index)
+        aligned = updates.reindex(result.index)
+        for col in updates.columns:
+            if col in result.columns:
+                result[col] = result[col].mask(hit, aligned[col].to_numpy())
+        existing_df = result.reset_index()[list(existing_df.columns)]
+        updated_count = int(is_existing.sum())
+
+    new_rows = df_to_import[~is_existing]
+    if not new_rows.empty:
+        existing_df = pd.concat([existing_df, new_rows], ignore_index=True)
+    return existing_df, len(new_rows), updated_count
@@ -0,0 +1,344 @@
+# lab_import.py
+# Auslesen von Laborbefunden (PDF/Text) in die Bluttest-Felder ohne Streamlit-Abhängigkeit.
+# Die Textextraktion läuft in einem Prozess-Pool (die App wartet nicht darauf), Ergebnisse
+# werden per SHA-256 der Datei zwischengespeichert und unsichere Werte landen in einer
+# Prüfliste, statt ungeprüft in die Bluttest-Tabelle geschrieben zu werden.
+import hashlib
+import json
+import multiprocessing
+import os
+import re
+import shutil
+import subprocess
+import uuid
+from concurrent.futures import Future, ProcessPoolExecutor, wait
+from datetime import datetime
+from config import BLOOD_TEST_UNITS, LAB_IMPORT_CACHE_DIR, LAB_REVIEW_FILE, ensure_directories
+from profiling import profiled
+
+# Erhöhen, sobald sich Erkennung oder Bewertung ändern (macht den Cache ungültig)
+PARSER_VERSION = 1
+# Werte unterhalb dieser Sicherheit werden nicht automatisch übernommen
+REVIEW_THRESHOLD = 0.8
+MAX_WORKERS = 2
+TEXT_SUFFIXES = (".txt",)
+IMAGE_SUFFIXES = (".jpg", ".jpeg", ".png")
+
+# Bezeichnungen je Messgröße, wie sie auf deutschsprachigen Laborbefunden vorkommen
+LAB_MARKER_ALIASES = {
+    "hemoglobin": ["Hämoglobin", "Haemoglobin", "Hb"],
+    "erythrocytes": ["Erythrozyten", "Erys"],
+    "mcv": ["MCV"],
+    "mch": ["MCH"],
+    "thrombocytes": ["Thrombozyten", "Thrombos"],
+    "leukocytes": ["Leukozyten", "Leukos", "Leuko"],
+    "segment": ["Segmentkernige", "Segmentkernige Granulozyten", "Neutrophile"],
+    "monocytes": ["Monozyten"],
+    "lymphocytes": ["Lymphozyten"],
+    "basophils": ["Basophile", "Basophile Granulozyten"],
+    "eosinophils": ["Eosinophile", "Eosinophile Granulozyten"],
+    "alat": ["ALAT", "GPT", "ALT", "ALAT (GPT)"],
+    "asat": ["ASAT", "GOT", "AST", "ASAT (GOT)"],
+    "creatinine": ["Kreatinin", "Creatinin"],
+    "egfr": ["eGFR", "GFR"],
+    "iron": ["Eisen"],
+    "transferrin_saturation": ["Transferrinsättigung", "Transferrin-Sättigung"],
+    "gamma_gt": ["Gamma-GT", "GGT", "γ-GT"],
+    "ap": ["Alkalische Phosphatase", "AP"],
+    "iron_saturation": ["Eisensättigung"],
+    "ebk": ["Eisenbindungskapazität", "EBK"],
+    "ferritin": ["Ferritin"],
+    "transferrin": ["Transferrin"],
+    "cholesterol": ["Cholesterin", "Gesamtcholesterin", "Cholesterin gesamt"],
+    "triglycerides": ["Triglyceride", "Triglyzeride"],
+    "ldl_chol": ["LDL-Cholesterin", "LDL-Chol.", "LDL"],
+    "sodium": ["Natrium"],
+    "calcium": ["Calcium", "Kalzium"],
+    "potassium": ["Kalium"],
+    "tsh_basal": ["TSH basal", "TSH"],
+    "hk": ["Hämatokrit", "HK", "Hkt"],
+}
+# Kurze Kürzel, die auch in anderem Zusammenhang auftauchen können
+AMBIGUOUS_ALIASES = {"hb", "ap", "hk", "ebk", "alt", "ldl", "gfr"}
+
+_NUMBER = r"([<>]?)[ \t]*(\d+(?:[.,]\d+)?)"
+_DATE_PATTERN = re.compile(
+    r"(?:Abnahme|Entnahme|Probenahme|Eingang|Befunddatum|Datum)\D{0,30}?(\d{1,2})\.(\d{1,2})\.(\d{2,4})", re.IGNORECASE)
+
+def _label_pattern() -> re.Pattern:
+    """Ein Muster für alle Bezeichnungen; längere zuerst, damit 'LDL-Cholesterin' vor 'Cholesterin' greift."""
+    aliases = sorted({a for names in LAB_MARKER_ALIASES.values() for a in names}, key=len, reverse=True)
+    labels = "|".join(re.escape(a) for a in aliases)
+    return re.compile(rf"^[ \t*]*({labels})(?![\w-])[ \t:.]*{_NUMBER}[ \t]*([^\s\d][^\s]*)?", re.IGNORECASE | re.MULTILINE)
+
+_LABEL_PATTERN = _label_pattern()
+_ALIAS_TO_MEASURE = {a.casefold(): measure for measure, names in LAB_MARKER_ALIASES.items() for a in names}
+
+def file_sha256(path: str, chunk_size: int = 1 << 20) -> str:
+    """SHA-256 des Dateiinhalts (blockweise gelesen)."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(chunk_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def extract_text(path: str) -> str:
+    """Text eines Befunds: Textdateien direkt, PDFs über pypdf bzw. pdftotext (falls installiert).
+
+    Bilder und gescannte PDFs ohne Textebene lösen einen ValueError aus (keine Texterkennung).
+    """
+    suffix = os.path.splitext(path)[1].lower()
+    if suffix in TEXT_SUFFIXES:
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            return f.read()
+    if suffix in IMAGE_SUFFIXES:
+        raise ValueError("Bilder werden nicht ausgelesen (keine Texterkennung) – Werte bitte manuell eintragen.")
+    try:
+        # pypdf ist optional und wird erst im Worker geladen
+        from pypdf import PdfReader
+        text = "\n".join(page.extract_text() or "" for page in PdfReader(path).pages)
+    except ImportError:
+        if shutil.which("pdftotext") is None:
+            raise ValueError("Keine PDF-Textextraktion verfügbar (pypdf oder pdftotext installieren).")
+        out = subprocess.run(["pdftotext", "-layout", path, "-"], capture_output=True, text=True, check=True)
+        text = out.stdout
+    if not text.strip():
+        raise ValueError("Kein Text im PDF gefunden (gescannter Befund?) – Werte bitte manuell eintragen.")
+    return text
+
+def _known_units() -> dict:
+    """Bekannte Einheiten in Kleinschreibung -> gespeicherte Schreibweise."""
+    from reference_ranges import UNIT_FACTORS, MARKER_UNIT_FACTORS
+
+    units = set(BLOOD_TEST_UNITS.values())
+    units.update(u for pair in UNIT_FACTORS for u in pair)
+    units.update(u for _, *pair in MARKER_UNIT_FACTORS for u in pair)
+    return {u.casefold(): u for u in units}
+
+def _plausible_bounds() -> dict:
+    """Grobe Plausibilitätsgrenzen je Messgröße: ein Fünftel der unteren bis das Fünffache der oberen Referenzgrenze."""
+    from reference_ranges import REFERENCE_RANGES
+
+    lows, highs = {}, {}
+    for measure, _, _, _, low, high, _ in REFERENCE_RANGES:
+        lows.setdefault(measure, []).append(low or 0)
+        highs.setdefault(measure, []).append(high)
+    return {measure: (min(lows[measure]) / 5, None if None in highs[measure] else max(highs[measure]) * 5) for measure in lows}
+
+def parse_lab_text(text: str) -> dict:
+    """Erkennt Messwerte und Abnahmedatum in einem Befundtext.
+
+    Jeder Wert erhält eine Sicherheit zwischen 0 und 1 sowie die Gründe für Abzüge; Werte in
+    abweichender, aber bekannter Einheit werden in die gespeicherte Einheit umgerechnet.
+    """
+    from reference_ranges import unit_factor
+
+    known_units = _known_units()
+    bounds = _plausible_bounds()
+    found = {}
+    for match in _LABEL_PATTERN.finditer(text):
+        alias, comparator, number, unit = match.groups()
+        measure = _ALIAS_TO_MEASURE[alias.casefold()]
+        value = float(number.replace(",", "."))
+        target_unit = BLOOD_TEST_UNITS.get(measure)
+        confidence, reasons = 1.0, []
+
+        if alias.casefold() in AMBIGUOUS_ALIASES:
+            confidence -= 0.15
+            reasons.append("mehrdeutiges Kürzel")
+        if comparator:
+            confidence -= 0.3
+            reasons.append(f"Grenzwertangabe '{comparator}'")
+        unit = known_units.get((unit or "").replace("μ", "µ").casefold())
+        if unit is None:
+            confidence -= 0.25
+            reasons.append("Einheit nicht erkannt")
+        elif target_unit and unit != target_unit:
+            factor = unit_factor(measure, unit, target_unit)
+            if factor != factor:  # NaN: keine Umrechnung bekannt
+                confidence -= 0.5
+                reasons.append(f"Einheit {unit} nicht umrechenbar")
+            else:
+                value = round(value * factor, 4)
+                confidence -= 0.1
+                reasons.append(f"umgerechnet aus {unit}")
+                unit = target_unit
+        low, high = bounds.get(measure, (None, None))
+        if (low is not None and value < low) or (high is not None and value > high):
+            confidence -= 0.4
+            reasons.append("Wert unplausibel")
+
+        field = {"measure": measure, "value": value, "unit": unit or target_unit, "raw": match.group(0).strip(),
+                 "confidence": round(max(confidence, 0.0), 2), "reasons": reasons}
+        previous = found.get(measure)
+        if previous is None:
+            found[measure] = field
+        elif previous["value"] != value:
+            # Mehrfach mit verschiedenen Werten gefunden -> ersten Treffer behalten, aber prüfen lassen
+            previous["confidence"] = round(max(previous["confidence"] - 0.4, 0.0), 2)
+            previous["reasons"].append(f"weiterer Wert {value:g} gefunden")
+
+    test_date = None
+    date_match = _DATE_PATTERN.search(text)
+    if date_match:
+        day, month, year = (int(g) for g in date_match.groups())
+        year += 2000 if year < 100 else 0
+        try:
+            test_date = datetime(year, month, day).strftime("%Y-%m-%d")
+        except ValueError:
+            pass
+    return {"test_date": test_date, "fields": list(found.values())}
+
+def _cache_path(sha256: str) -> str:
+    return os.path.join(LAB_IMPORT_CACHE_DIR, f"{sha256}.json")
+
+def load_cached_result(sha256: str):
+    """Zwischengespeichertes Ergebnis für einen Dateihash (None, wenn keins zur aktuellen Parser-Version existiert)."""
+    try:
+        with open(_cache_path(sha256), "r", encoding="utf-8") as f:
+            cached = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+    return cached if cached.get("parser_version") == PARSER_VERSION else None
+
+def parse_lab_report(path: str, sha256: str = None) -> dict:
+    """Liest einen Befund aus (mit Cache). Läuft im Worker-Prozess; Fehler stehen in "error"."""
+    sha256 = sha256 or file_sha256(path)
+    cached = load_cached_result(sha256)
+    if cached is not None:
+        return cached
+    result = {"sha256": sha256, "file": path, "parser_version": PARSER_VERSION, "test_date": None, "fields": [], "error": None}
+    try:
+        result.update(parse_lab_text(extract_text(path)))
+    except (ValueError, OSError, subprocess.CalledProcessError) as e:
+        # Fehler nicht cachen: sie hängen oft von der Umgebung ab (z.B. fehlendes pypdf)
+        result["error"] = str(e)
+        return result
+    except Exception as e:
+        result["error"] = f"Befund konnte nicht gelesen werden: {e}"
+        return result
+    ensure_directories()
+    os.makedirs(LAB_IMPORT_CACHE_DIR, exist_ok=True)
+    tmp_path = f"{_cache_path(sha256)}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, _cache_path(sha256))
+    return result
+
+# --- Hintergrundverarbeitung ---
+# Ein Pool pro Prozess; Aufträge leben über Streamlit-Reruns hinweg auf Modulebene
+_pool = None
+_jobs = {}
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        # "spawn": Der Streamlit-Server läuft mit mehreren Threads, fork wäre dort unsicher
+        _pool = ProcessPoolExecutor(max_workers=min(MAX_WORKERS, os.cpu_count() or 1),
+                                    mp_context=multiprocessing.get_context("spawn"))
+    return _pool
+
+@profiled
+def submit_lab_report(path: str, test_date, test_type: str) -> str:
+    """Stellt einen Befund zur Auswertung ein und kehrt sofort zurück; bereits bekannte Dateien sind sofort fertig."""
+    sha256 = file_sha256(path)
+    cached = load_cached_result(sha256)
+    if cached is not None:
+        future = Future()
+        future.set_result(dict(cached, file=path))
+    else:
+        future = _get_pool().submit(parse_lab_report, path, sha256)
+    _jobs[sha256] = {"future": future, "file": path, "test_date": str(test_date), "test_type": test_type}
+    return sha256
+
+def pending_jobs() -> list:
+    """Dateien, deren Auswertung noch läuft."""
+    return [job["file"] for job in _jobs.values() if not job["future"].done()]
+
+def wait_for_jobs(timeout: float = None) -> None:
+    """Wartet auf alle laufenden Auswertungen (für Batch-Läufe ohne Oberfläche)."""
+    wait([job["future"] for job in _jobs.values()], timeout=timeout)
+
+@profiled
+def collect_finished_jobs() -> list:
+    """Übernimmt alle fertigen Auswertungen (siehe apply_lab_result) und liefert deren Zusammenfassungen."""
+    summaries = []
+    for sha256, job in list(_jobs.items()):
+        if not job["future"].done():
+            continue
+        del _jobs[sha256]
+        try:
+            result = job["future"].result()
+        except Exception as e:  # z.B. abgebrochener Worker-Prozess
+            result = {"sha256": sha256, "file": job["file"], "fields": [], "test_date": None, "error": str(e)}
+        summaries.append(apply_lab_result(result, job["test_date"], job["test_type"]))
+    return summaries
+
+def _is_empty(value) -> bool:
+    """Formularfelder ohne Eingabe werden als 0 gespeichert."""
+    return value is None or value != value or value == 0
+
+@profiled
+def apply_lab_result(result: dict, test_date, test_type: str) -> dict:
+    """Schreibt sichere Werte in leere Felder des Bluttests; unsichere oder abweichende Werte kommen in die Prüfliste."""
+    from database import load_blood_tests_data, update_blood_tests_data
+
+    summary = {"file": result["file"], "error": result.get("error"), "applied": {}, "queued": 0, "test_date_found": result.get("test_date")}
+    if summary["error"] or not result["fields"]:
+        return summary
+
+    test_date = datetime.strptime(str(test_date), "%Y-%m-%d").date()
+    df = load_blood_tests_data()
+    row = df[(df["test_date"] == test_date) & (df["test_type"] == test_type)]
+    existing = row.iloc[-1].to_dict() if not row.empty else {}
+
+    review = []
+    for field in result["fields"]:
+        current = existing.get(field["measure"])
+        if field["confidence"] >= REVIEW_THRESHOLD and _is_empty(current):
+            summary["applied"][field["measure"]] = field["value"]
+            continue
+        if not _is_empty(current) and float(current) == field["value"]:
+            continue
+        reasons = list(field["reasons"])
+        if not _is_empty(current):
+            reasons.append(f"weicht vom gespeicherten Wert {float(current):g} ab")
+        review.append({**field, "reasons": reasons, "id": uuid.uuid4().hex, "sha256": result["sha256"],
+                       "file": result["file"], "test_date": str(test_date), "test_type": test_type})
+
+    if summary["applied"]:
+        update_blood_tests_data(test_date, test_type, summary["applied"])
+    if review:
+        queue = load_review_queue()
+        # Erneutes Einlesen derselben Datei ersetzt deren offene Einträge
+        queue = [item for item in queue if (item["sha256"], item["test_date"], item["test_type"]) != (result["sha256"], str(test_date), test_type)]
+        save_review_queue(queue + review)
+    summary["queued"] = len(review)
+    return summary
+
+# --- Prüfliste für unsichere Werte ---
+def load_review_queue() -> list:
+    """Offene Prüfeinträge (je Eintrag: Messgröße, Wert, Einheit, Fundstelle, Sicherheit, Gründe, Test)."""
+    from database import load_json
+
+    return load_json(LAB_REVIEW_FILE, {"items": []}).get("items", [])
+
+def save_review_queue(items: list) -> None:
+    from database import save_json
+
+    save_json(LAB_REVIEW_FILE, {"items": items})
+
+@profiled
+def resolve_review_item(item_id: str, accept: bool, value: float = None) -> bool:
+    """Übernimmt (optional korrigierten) Wert eines Prüfeintrags oder verwirft ihn; False, wenn der Eintrag fehlt."""
+    from database import update_blood_tests_data
+
+    queue = load_review_queue()
+    item = next((entry for entry in queue if entry["id"] == item_id), None)
+    if item is None:
+        return False
+    if accept:
+        test_date = datetime.strptime(item["test_date"], "%Y-%m-%d").date()
+        update_blood_tests_data(test_date, item["test_type"], {item["measure"]: item["value"] if value is None else value})
+    save_review_queue([entry for entry in queue if entry["id"] != item_id])
+    return True
@@ -2,39 +2,11 @@
 import streamlit as st
 import pandas as pd
 from datetime import datetime, date, timedelta
-import os
-from config import NUTRITION_FILE, ASSETS_DIR
-from database import load_json, save_json, empty_df
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, PageBreak
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.pagesizes import A4
-from reportlab.lib.units import cm
-from reportlab.lib import colors
-from reportlab.lib.enums import TA_CENTER, TA_LEFT
+from config import ASSETS_DIR
+from database import load_nutrition_data, update_nutrition_data
+from reporting import write_nutrition_pdf
 import io
 
-def load_nutrition_data() -> pd.DataFrame:
-    """Lädt die Ernährungsdaten aus der CSV-Datei."""
-    if os.path.exists(NUTRITION_FILE):
-        df = pd.read_csv(NUTRITION_FILE)
-        if not df.empty:
-            # --- KORREKTUR HIER ---
-            # Die .dt.date Konvertierung wurde entfernt, um das Datum im Pandas-Format zu belassen.
-            df["date"] = pd.to_datetime(df["date"])
-        return df
-    return empty_df_nutrition()
-
-def empty_df_nutrition() -> pd.DataFrame:
-    """Erstellt einen leeren DataFrame für Ernährungsdaten."""
-    return pd.DataFrame(columns=["date", "phase", "fruehstueck", "mittag", "abend", "snacks", "supplements", "notizen"])
-
-def save_nutrition_data(df: pd.DataFrame) -> None:
-    """Speichert den DataFrame in der CSV-Datei."""
-    d = df.copy()
-    if not d.empty:
-        d["date"] = pd.to_datetime(d["date"]).dt.strftime("%Y-%m-%d")
-    d.to_csv(NUTRITION_FILE, index=False)
-
 def render_nutrition_form():
     """Rendert das Ernährungstagebuch-Formular."""
     with st.form(key="nutrition_form_key"):
@@ -46,45 +18,24 @@ def render_nutrition_form():
         
         st.subheader("Mahlzeiten")
         
-        fruehstueck = st.text_area("Frühstück", key="fruehstueck_input", height=100)
-        mittag = st.text_area("Mittag", key="mittag_input", height=100)
-        abend = st.text_area("Abend", key="abend_input", height=100)
+        breakfast = st.text_area("Frühstück", key="fruehstueck_input", height=100)
+        lunch = st.text_area("Mittag", key="mittag_input", height=100)
+        dinner = st.text_area("Abend", key="abend_input", height=100)
         snacks = st.text_area("Snacks", key="snacks_input", height=100)
         supplements = st.text_area("Supplements", key="supplements_input", height=100)
-        notizen = st.text_area("Notizen / Bemerkungen", key="notizen_input", height=100)
+        note = st.text_area("Notizen / Bemerkungen", key="notizen_input", height=100)
         
         submitted = st.form_submit_button("Eintrag speichern")
         
         if submitted:
-            # Daten laden
-            df = load_nutrition_data()
-            
-            # Prüfen, ob für dieses Datum bereits ein Eintrag existiert
-            existing_entry = df[df["date"] == pd.to_datetime(date_val)]
-            
-            if not existing_entry.empty:
-                # Bestehenden Eintrag aktualisieren
-                df.loc[df["date"] == pd.to_datetime(date_val), ["phase", "fruehstueck", "mittag", "abend", "snacks", "supplements", "notizen"]] = [
-                    phase, fruehstueck, mittag, abend, snacks, supplements, notizen
-                ]
-                st.success("Eintrag wurde aktualisiert!")
-            else:
-                # Neuen Eintrag hinzufügen
-                new_row = pd.DataFrame([{
-                    "date": pd.to_datetime(date_val),
-                    "phase": phase,
-                    "fruehstueck": fruehstueck,
-                    "mittag": mittag,
-                    "abend": abend,
-                    "snacks": snacks,
-                    "supplements": supplements,
-                    "notizen": notizen
-                }])
-                df = pd.concat([df, new_row], ignore_index=True)
-                st.success("Eintrag wurde gespeichert!")
-            
-            # Daten speichern
-            save_nutrition_data(df)
+            # Gemeinsamer Speicherpfad mit dem Ernährungstab (legt den Eintrag an oder aktualisiert ihn)
+            existing = load_nutrition_data()
+            exists = ((existing["date"] == date_val) & (existing["phase"] == phase)).any()
+            update_nutrition_data(date_val, phase, {
+                "breakfast": breakfast, "lunch": lunch, "dinner": dinner, "snack_1": snacks,
+                "supplements": supplements, "nutrition_note": note,
+            })
+            st.success("Eintrag wurde aktualisiert!" if exists else "Eintrag wurde gespeichert!")
             st.rerun()
 
 def render_nutrition_analysis_section(df: pd.DataFrame):
@@ -98,8 +49,8 @@ def render_nutrition_analysis_section(df: pd.DataFrame):
     # Zeitraum-Auswahl mit Quick-Filters
     c1, c2, c3, c4, c5 = st.columns(5)
     default_start = (date.today() - timedelta(days=30))
-    start_date = c1.date_input("Von", value=df["date"].min().date() if not df.empty else default_start, key="nutrition_start_date_input")
-    end_date = c2.date_input("Bis", value=df["date"].max().date() if not df.empty else date.today(), key="nutrition_end_date_input")
+    start_date = c1.date_input("Von", value=df["date"].min() if not df.empty else default_start, key="nutrition_start_date_input")
+    end_date = c2.date_input("Bis", value=df["date"].max() if not df.empty else date.today(), key="nutrition_end_date_input")
     
     if c3.button("7T", key="nutrition_filter_7_days"): 
         start_date = date.today() - timedelta(days=7)
@@ -122,7 +73,7 @@ def render_nutrition_analysis_section(df: pd.DataFrame):
         st.rerun()
     
     # Daten filtern
-    sel_df = df[(df["date"] >= pd.to_datetime(start_date)) & (df["date"] <= pd.to_datetime(end_date))].copy()
+    sel_df = df[(df["date"] >= start_date) & (df["date"] <= end_date)].copy()
 
     # Phasenvergleich-Modus
     if phase_comparison:
@@ -151,12 +102,12 @@ def render_nutrition_analysis_section(df: pd.DataFrame):
         
         # Daten für die Anzeige formatieren
         display_df = sel_df.copy()
-        display_df["Datum"] = display_df["date"].dt.strftime("%d.%m.%Y")
+        display_df["Datum"] = pd.to_datetime(display_df["date"]).dt.strftime("%d.%m.%Y")
         display_df["Phase"] = display_df["phase"]
         
         # Tabelle mit ausgewählten Spalten anzeigen
         st.dataframe(
-            display_df[["Datum", "Phase", "fruehstueck", "mittag", "abend", "snacks", "supplements", "notizen"]],
+            display_df[["Datum", "Phase", "breakfast", "snack_1", "lunch", "snack_2", "dinner", "supplements", "nutrition_note"]],
             use_container_width=True,
             hide_index=True
         )
@@ -176,62 +127,18 @@ def render_nutrition_analysis_section(df: pd.DataFrame):
     st.session_state['nutrition_pdf_suffix'] = pdf_suffix
 
 
-def create_nutrition_pdf(df_to_export: pd.DataFrame, title: str):
-    """Erstellt ein PDF mit den übergebenen Ernährungsdaten."""
+def create_nutrition_pdf(df_to_export: pd.DataFrame, title: str, target=None):
+    """Erstellt ein PDF mit den übergebenen Ernährungsdaten.
+
+    Ohne `target` wird ein BytesIO zurückgegeben (z.B. für st.download_button); mit einem
+    Dateipfad wird direkt in die Datei geschrieben.
+    """
     if df_to_export.empty:
         st.error("Keine Daten zum Exportieren vorhanden.")
         return None
-    
-    # PDF erstellen
-    buffer = io.BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=A4, rightMargin=2*cm, leftMargin=2*cm, topMargin=2*cm, bottomMargin=2*cm)
-    
-    # Styles
-    styles = getSampleStyleSheet()
-    title_style = ParagraphStyle(name='CustomTitle', parent=styles['Heading1'], fontSize=24, spaceAfter=30, alignment=TA_CENTER, textColor=colors.HexColor("#003366"), fontName='Helvetica-Bold')
-    heading_style = ParagraphStyle(name='CustomHeading', parent=styles['Heading2'], fontSize=18, spaceAfter=12, textColor=colors.HexColor("#003366"), fontName='Helvetica-Bold')
-    normal_style = ParagraphStyle(name='CustomNormal', parent=styles['Normal'], fontSize=12, spaceAfter=6, leading=14)
-    
-    story = []
-    
-    # Titel
-    story.append(Paragraph(title, title_style))
-    story.append(Spacer(1, 0.5*cm))
-    story.append(Paragraph(f"Erstellt am: {datetime.now().strftime('%d.%m.%Y')}", normal_style))
-    story.append(PageBreak())
-    
-    # Einträge
-    for index, row in df_to_export.iterrows():
-        # Datum und Phase
-        story.append(Paragraph(f"<b>Datum:</b> {row['date'].strftime('%d.%m.%Y')} | <b>Phase:</b> {row['phase']}", heading_style))
-        story.append(Spacer(1, 0.3*cm))
-        
-        # Tabelle mit Mahlzeiten
-        data = [
-            ["Mahlzeit", "Eintrag"],
-            ["Frühstück", row['fruehstueck']],
-            ["Mittag", row['mittag']],
-            ["Abend", row['abend']],
-            ["Snacks", row['snacks']],
-            ["Supplements", row['supplements']],
-            ["Notizen", row['notizen']]
-        ]
-        
-        table = Table(data, colWidths=[4*cm, 12*cm])
-        table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor("#003366")),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, -1), 10),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.HexColor("#f2f2f2")),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black)
-        ]))
-        
-        story.append(table)
-        story.append(Spacer(1, 1*cm))
-    
-    doc.build(story)
-    buffer.seek(0)
-    return buffer
\ No newline at end of file
+
+    buffer = target if target is not None else io.BytesIO()
+    write_nutrition_pdf(df_to_export, title, buffer)
+    if target is None:
+        buffer.seek(0)
+    return buffer
@@ -0,0 +1,132 @@
+# profiling.py
+# Zeitmessung pro Rerun: Spans um Datenbankzugriffe, Metriken, Diagramme und Statistik.
+# Ohne aktiven Trace (Profiling aus) kosten die Spans nur eine Attributabfrage.
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from config import PROFILES_DIR
+
+# Streamlit führt jede Session in einem eigenen Thread aus -> Trace pro Thread
+_local = threading.local()
+
+def now() -> float:
+    """Monotone Zeit in Sekunden (für Messungen vor begin_rerun)."""
+    return time.perf_counter()
+
+class Trace:
+    """Sammelt die Spans eines Reruns (bzw. eines CLI-Laufs)."""
+
+    def __init__(self, label: str, started: float = None):
+        self.label = label
+        self.started = started if started is not None else now()
+        self.started_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        self.finished = None
+        self.spans = []
+        self._stack = []
+
+    def record(self, name: str, start: float, duration: float, **attrs) -> None:
+        """Fügt einen bereits gemessenen Span hinzu."""
+        self.spans.append({
+            "name": name,
+            "start_ms": round((start - self.started) * 1000, 3),
+            "duration_ms": round(duration * 1000, 3),
+            "depth": len(self._stack),
+            "parent": self._stack[-1] if self._stack else None,
+            **attrs,
+        })
+
+    @property
+    def total_ms(self) -> float:
+        end = self.finished if self.finished is not None else now()
+        return (end - self.started) * 1000
+
+    def to_dict(self) -> dict:
+        return {"label": self.label, "started_at": self.started_at, "total_ms": round(self.total_ms, 3), "spans": self.spans}
+
+def begin_rerun(enabled: bool, label: str = "rerun", started: float = None):
+    """Startet einen neuen Trace für den aktuellen Thread (oder deaktiviert das Profiling)."""
+    _local.trace = Trace(label, started) if enabled else None
+    return _local.trace
+
+def current_trace():
+    """Aktueller Trace des Threads oder None, wenn Profiling aus ist."""
+    return getattr(_local, "trace", None)
+
+def end_rerun(dump: bool = False):
+    """Schließt den aktuellen Trace ab und schreibt ihn optional in die Trace-Datei."""
+    trace = current_trace()
+    if trace is None:
+        return None
+    trace.finished = now()
+    if dump:
+        dump_trace(trace)
+    return trace
+
+def record(name: str, duration: float, start: float = None, **attrs) -> None:
+    """Trägt eine extern gemessene Dauer ein (z.B. Importzeit vor begin_rerun)."""
+    trace = current_trace()
+    if trace is not None:
+        trace.record(name, start if start is not None else now() - duration, duration, **attrs)
+
+@contextmanager
+def span(name: str, **attrs):
+    """Misst die Dauer des umschlossenen Blocks als Span im aktuellen Trace."""
+    trace = current_trace()
+    if trace is None:
+        yield
+        return
+    start = now()
+    trace._stack.append(name)
+    try:
+        yield
+    finally:
+        trace._stack.pop()
+        trace.record(name, start, now() - start, **attrs)
+
+def profiled(func=None, *, name: str = None):
+    """Dekorator: misst jeden Aufruf der Funktion als Span (Name: modul.funktion)."""
+    def decorate(f):
+        span_name = name or f"{f.__module__}.{f.__name__}"
+
+        @functools.wraps(f)
+        def wrapper(*args, **kwargs):
+            if current_trace() is None:
+                return f(*args, **kwargs)
+            with span(span_name):
+                return f(*args, **kwargs)
+        return wrapper
+
+    return decorate(func) if func is not None else decorate
+
+def summarize(trace) -> list:
+    """Fasst die Spans nach Name zusammen (Aufrufe, Summe, Mittel, Maximum, Anteil am Rerun)."""
+    grouped = {}
+    for s in trace.spans:
+        entry = grouped.setdefault(s["name"], {"span": s["name"], "calls": 0, "total_ms": 0.0, "max_ms": 0.0})
+        entry["calls"] += 1
+        entry["total_ms"] += s["duration_ms"]
+        entry["max_ms"] = max(entry["max_ms"], s["duration_ms"])
+    total = trace.total_ms or 1.0
+    rows = []
+    for entry in grouped.values():
+        entry["mean_ms"] = entry["total_ms"] / entry["calls"]
+        entry["share_pct"] = 100.0 * entry["total_ms"] / total
+        rows.append(entry)
+    return sorted(rows, key=lambda r: r["total_ms"], reverse=True)
+
+def trace_file(day: str = None) -> str:
+    """Pfad der Trace-Datei (eine JSON-Zeile pro Rerun, eine Datei pro Tag)."""
+    day = day or datetime.now().strftime("%Y%m%d")
+    return os.path.join(PROFILES_DIR, f"trace_{day}.jsonl")
+
+def dump_trace(trace, path: str = None) -> str:
+    """Hängt den Trace als JSON-Zeile an die Trace-Datei an und gibt den Pfad zurück."""
+    path = path or trace_file()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(trace.to_dict(), ensure_ascii=False) + "\n")
+    return path
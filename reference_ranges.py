@@ -0,0 +1,185 @@
+# reference_ranges.py
+# Referenzbereiche für Blutwerte (geschlechts-/altersabhängig, einheitenbewusst) und
+# vektorisierte Bewertung aller gespeicherten Bluttests als niedrig / normal / hoch.
+# Richtwerte für Erwachsene nach gängigen Laborangaben – ersetzen nicht den Befund des Labors.
+import functools
+import numpy as np
+import pandas as pd
+from config import BLOOD_TEST_UNITS
+from database import wide_to_long
+from profiling import profiled
+from snapshot import current_snapshot
+
+FLAG_LOW, FLAG_NORMAL, FLAG_HIGH = "low", "normal", "high"
+FLAG_LABELS = {FLAG_LOW: "🔻 niedrig", FLAG_NORMAL: "✅ normal", FLAG_HIGH: "🔺 hoch"}
+
+# Registry: (Marker, Geschlecht "m"/"f"/None = beide, Alter von, Alter bis (exklusiv), untere, obere Grenze, Einheit)
+# Offene Grenzen als None. Geschlechts- bzw. altersspezifische Einträge haben Vorrang.
+REFERENCE_RANGES = [
+    # Rotes & weißes Blutbild
+    ("hemoglobin", "m", 18, 200, 13.5, 17.5, "g/dl"),
+    ("hemoglobin", "f", 18, 200, 12.0, 16.0, "g/dl"),
+    ("erythrocytes", "m", 18, 200, 4.3, 5.9, "Mio/µl"),
+    ("erythrocytes", "f", 18, 200, 3.9, 5.2, "Mio/µl"),
+    ("mcv", None, 18, 200, 80, 96, "fl"),
+    ("mch", None, 18, 200, 27, 33, "pg"),
+    ("thrombocytes", None, 18, 200, 150, 400, "10⁹/l"),
+    ("leukocytes", None, 18, 200, 4.0, 10.0, "10⁹/l"),
+    ("segment", None, 18, 200, 40, 75, "%"),
+    ("monocytes", None, 18, 200, 2, 10, "%"),
+    ("lymphocytes", None, 18, 200, 20, 45, "%"),
+    ("basophils", None, 18, 200, 0, 2, "%"),
+    ("eosinophils", None, 18, 200, 0, 5, "%"),
+    # Blutchemie
+    ("alat", "m", 18, 200, None, 50, "U/l"),
+    ("alat", "f", 18, 200, None, 35, "U/l"),
+    ("asat", "m", 18, 200, None, 50, "U/l"),
+    ("asat", "f", 18, 200, None, 35, "U/l"),
+    ("creatinine", "m", 18, 200, 0.7, 1.2, "mg/dl"),
+    ("creatinine", "f", 18, 200, 0.5, 0.9, "mg/dl"),
+    ("egfr", None, 18, 60, 90, None, "ml/min"),
+    ("egfr", None, 60, 200, 60, None, "ml/min"),
+    ("iron", "m", 18, 200, 65, 175, "µg/dl"),
+    ("iron", "f", 18, 200, 50, 170, "µg/dl"),
+    ("transferrin_saturation", None, 18, 200, 16, 45, "%"),
+    ("gamma_gt", "m", 18, 200, None, 60, "U/l"),
+    ("gamma_gt", "f", 18, 200, None, 40, "U/l"),
+    ("ap", "m", 18, 200, 40, 130, "U/l"),
+    ("ap", "f", 18, 200, 35, 105, "U/l"),
+    ("ferritin", "m", 18, 200, 30, 400, "ng/ml"),
+    ("ferritin", "f", 18, 50, 15, 150, "ng/ml"),
+    ("ferritin", "f", 50, 200, 15, 300, "ng/ml"),
+    ("transferrin", None, 18, 200, 200, 360, "mg/dl"),
+    # Blutfette
+    ("cholesterol", None, 18, 200, None, 200, "mg/dl"),
+    ("triglycerides", None, 18, 200, None, 150, "mg/dl"),
+    ("ldl_chol", None, 18, 200, None, 115, "mg/dl"),
+    # Elektrolyte
+    ("sodium", None, 18, 200, 135, 145, "mmol/l"),
+    ("calcium", None, 18, 200, 2.15, 2.55, "mmol/l"),
+    ("potassium", None, 18, 200, 3.5, 5.1, "mmol/l"),
+    # Schilddrüsenhormone
+    ("tsh_basal", None, 18, 200, 0.27, 4.2, "uU/ml"),
+]
+
+# Umrechnung Einheit A -> Einheit B (Wert_B = Wert_A * Faktor); Kehrwert wird automatisch ergänzt
+UNIT_FACTORS = {
+    ("g/dl", "g/l"): 10.0,
+    ("mg/dl", "g/l"): 0.01,
+    ("ng/ml", "µg/l"): 1.0,
+    ("uU/ml", "mU/l"): 1.0,
+    ("10⁹/l", "/nl"): 1.0,
+    ("10⁹/l", "10³/µl"): 1.0,
+    ("l/l", "%"): 100.0,
+}
+# Stoffabhängige Umrechnungen (molare Masse)
+MARKER_UNIT_FACTORS = {
+    ("cholesterol", "mg/dl", "mmol/l"): 0.02586,
+    ("ldl_chol", "mg/dl", "mmol/l"): 0.02586,
+    ("triglycerides", "mg/dl", "mmol/l"): 0.01129,
+    ("creatinine", "mg/dl", "µmol/l"): 88.42,
+    ("iron", "µg/dl", "µmol/l"): 0.1791,
+    ("calcium", "mmol/l", "mg/dl"): 4.008,
+}
+
+def unit_factor(marker: str, from_unit: str, to_unit: str) -> float:
+    """Faktor zur Umrechnung von `from_unit` nach `to_unit` (NaN, wenn unbekannt)."""
+    if from_unit == to_unit or pd.isna(from_unit) or pd.isna(to_unit):
+        return 1.0
+    for table, key, reverse in [
+        (MARKER_UNIT_FACTORS, (marker, from_unit, to_unit), (marker, to_unit, from_unit)),
+        (UNIT_FACTORS, (from_unit, to_unit), (to_unit, from_unit)),
+    ]:
+        if key in table:
+            return table[key]
+        if reverse in table:
+            return 1.0 / table[reverse]
+    return np.nan
+
+@functools.lru_cache(maxsize=16)
+def ranges_for(sex: str, age: int) -> pd.DataFrame:
+    """Gültiger Referenzbereich je Marker für Geschlecht und Alter (ein Eintrag pro Marker)."""
+    registry = pd.DataFrame(REFERENCE_RANGES, columns=["measure", "sex", "age_min", "age_max", "low", "high", "range_unit"])
+    matches = registry[(registry["sex"].isna() | (registry["sex"] == sex))
+                       & (registry["age_min"] <= age) & (registry["age_max"] > age)]
+    # Geschlechtsspezifische Einträge vor allgemeinen
+    matches = matches.assign(specific=matches["sex"].notna()).sort_values("specific", ascending=False, kind="stable")
+    return matches.drop_duplicates("measure").drop(columns=["sex", "age_min", "age_max", "specific"]).reset_index(drop=True)
+
+@profiled
+def evaluate_ranges(long_df: pd.DataFrame, sex: str = "m", age: int = 35) -> pd.DataFrame:
+    """Bewertet alle Messwerte einer Bluttest-Tabelle im Langformat in einem Durchgang.
+
+    Die Grenzen werden in die gespeicherte Einheit des jeweiligen Werts umgerechnet. Ergebnis:
+    test_date, test_type, measure, value, unit, low, high, flag (low/normal/high) – nur Marker
+    mit Referenzbereich und bekannter Umrechnung.
+    """
+    columns = ["test_date", "test_type", "measure", "value", "unit", "low", "high", "flag"]
+    values = long_df[long_df["value"].notna()]
+    merged = values[["test_date", "test_type", "measure", "value", "unit"]].merge(ranges_for(sex, int(age)), on="measure", how="inner")
+    if merged.empty:
+        return pd.DataFrame(columns=columns)
+
+    # Umrechnungsfaktoren nur für die wenigen unterschiedlichen Kombinationen bestimmen
+    combos = merged[["measure", "range_unit", "unit"]].drop_duplicates()
+    combos["factor"] = [unit_factor(m, ru, u) for m, ru, u in combos.itertuples(index=False)]
+    merged = merged.merge(combos, on=["measure", "range_unit", "unit"], how="left")
+    merged = merged[merged["factor"].notna()]
+
+    low = merged["low"].to_numpy(dtype=float) * merged["factor"].to_numpy()
+    high = merged["high"].to_numpy(dtype=float) * merged["factor"].to_numpy()
+    value = merged["value"].to_numpy(dtype=float)
+    merged["low"], merged["high"] = low, high
+    # Offene Grenzen (NaN) lösen keine Markierung aus
+    merged["flag"] = np.select([value < low, value > high], [FLAG_LOW, FLAG_HIGH], default=FLAG_NORMAL)
+    return merged[columns].sort_values(["measure", "test_date"], kind="stable").reset_index(drop=True)
+
+def _blood_flags(snapshot, sex: str, age: int) -> pd.DataFrame:
+    # Langformat wie beim Speichern (save_blood_tests_data), hier aus der Tabelle des Snapshots
+    long_df = wide_to_long(snapshot.table("blood"), BLOOD_TEST_UNITS)
+    long_df["test_date"] = pd.to_datetime(long_df["test_date"]).dt.date
+    return evaluate_ranges(long_df, sex, age)
+
+@profiled
+def flag_blood_tests(sex: str = "m", age: int = 35, snapshot=None) -> pd.DataFrame:
+    """Bewertete Bluttests für den Stand von `snapshot` (Standard: gespeicherter Bestand).
+
+    Einmal je Snapshot, Geschlecht und Alter berechnet (siehe Snapshot.derive).
+    """
+    snapshot = snapshot or current_snapshot()
+    age = int(age)
+    return snapshot.derive(("blood_flags", sex, age), lambda s: _blood_flags(s, sex, age))
+
+@profiled
+def flag_matrix(flags: pd.DataFrame) -> pd.DataFrame:
+    """Trend-Ansicht: Marker × Testdatum mit der jeweiligen Markierung (fehlende Tests leer)."""
+    if flags.empty:
+        return pd.DataFrame()
+    matrix = flags.drop_duplicates(["measure", "test_date"], keep="last").pivot(index="measure", columns="test_date", values="flag")
+    matrix.columns.name = None
+    return matrix.sort_index(axis=1)
+
+@profiled
+def flag_transitions(flags: pd.DataFrame) -> pd.DataFrame:
+    """Verlauf der Markierung je Marker: erster/letzter Befund, Anzahl auffälliger Werte und Entwicklung."""
+    columns = ["measure", "first_date", "first_flag", "last_date", "last_flag", "out_of_range", "tests", "status"]
+    if flags.empty:
+        return pd.DataFrame(columns=columns)
+    ordered = flags.sort_values(["measure", "test_date"], kind="stable")
+    grouped = ordered.groupby("measure", sort=True)
+    result = pd.DataFrame({
+        "first_date": grouped["test_date"].first(),
+        "first_flag": grouped["flag"].first(),
+        "last_date": grouped["test_date"].last(),
+        "last_flag": grouped["flag"].last(),
+        "out_of_range": (ordered["flag"] != FLAG_NORMAL).groupby(ordered["measure"]).sum(),
+        "tests": grouped.size(),
+    }).reset_index()
+    first_ok = result["first_flag"] == FLAG_NORMAL
+    last_ok = result["last_flag"] == FLAG_NORMAL
+    result["status"] = np.select(
+        [first_ok & last_ok & (result["out_of_range"] == 0), first_ok & last_ok, ~first_ok & last_ok, first_ok & ~last_ok],
+        ["unauffällig", "zwischenzeitlich auffällig", "normalisiert", "neu auffällig"],
+        default="dauerhaft auffällig",
+    )
+    return result[columns]
@@ -0,0 +1,168 @@
+# reporting.py
+# PDF-Berichte ohne Streamlit-Abhängigkeit (App, cli.py). Styles und Tabellenvorlagen werden
+# einmal pro Prozess erzeugt, Zeilen spaltenweise statt per iterrows gelesen und das Dokument
+# direkt in die Zieldatei geschrieben. Große Berichte lassen sich abschnittsweise in mehreren
+# Prozessen rendern und am Ende zusammenführen (dafür wird pypdf benötigt).
+import functools
+import multiprocessing
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from xml.sax.saxutils import escape
+import pandas as pd
+from profiling import profiled, span
+
+# Mahlzeiten im Bericht (Beschriftung, Spalte des Ernährungstagebuchs)
+NUTRITION_PDF_FIELDS = [
+    ("Frühstück", "breakfast"), ("Snack 1", "snack_1"), ("Mittag", "lunch"), ("Snack 2", "snack_2"),
+    ("Abend", "dinner"), ("Supplements", "supplements"), ("Notizen", "nutrition_note"),
+]
+# Ab dieser Anzahl Einträge lohnt sich paralleles Rendern (Start der Worker kostet ~1 s)
+PARALLEL_MIN_ENTRIES = 300
+CHUNK_ENTRIES = 150
+MAX_WORKERS = 4
+
+def default_workers() -> int:
+    """Anzahl Worker-Prozesse für paralleles Rendern (verfügbare CPUs, höchstens MAX_WORKERS)."""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:  # nicht unter Linux
+        cpus = os.cpu_count() or 1
+    return min(cpus, MAX_WORKERS)
+
+@functools.lru_cache(maxsize=1)
+def report_styles() -> dict:
+    """Absatz- und Tabellenstile aller Berichte (einmal pro Prozess erzeugt)."""
+    # reportlab erst beim ersten Export laden (spart Importzeit beim Kaltstart)
+    from reportlab.platypus import TableStyle
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    from reportlab.lib import colors
+    from reportlab.lib.enums import TA_CENTER
+
+    base = getSampleStyleSheet()
+    primary = colors.HexColor("#003366")
+    return {
+        "title": ParagraphStyle(name="CustomTitle", parent=base["Heading1"], fontSize=24, spaceAfter=30, alignment=TA_CENTER, textColor=primary, fontName="Helvetica-Bold"),
+        "heading": ParagraphStyle(name="CustomHeading", parent=base["Heading2"], fontSize=18, spaceAfter=12, textColor=primary, fontName="Helvetica-Bold"),
+        "normal": ParagraphStyle(name="CustomNormal", parent=base["Normal"], fontSize=12, spaceAfter=6, leading=14),
+        "entry_table": TableStyle([
+            ("BACKGROUND", (0, 0), (-1, 0), primary),
+            ("TEXTCOLOR", (0, 0), (-1, 0), colors.whitesmoke),
+            ("ALIGN", (0, 0), (-1, -1), "LEFT"),
+            ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
+            ("FONTSIZE", (0, 0), (-1, -1), 10),
+            ("BOTTOMPADDING", (0, 0), (-1, 0), 12),
+            ("BACKGROUND", (0, 1), (-1, -1), colors.HexColor("#f2f2f2")),
+            ("GRID", (0, 0), (-1, -1), 1, colors.black),
+        ]),
+        # Kompakte Datentabellen (Studienbericht)
+        "data_table": TableStyle([
+            ("BACKGROUND", (0, 0), (-1, 0), primary),
+            ("TEXTCOLOR", (0, 0), (-1, 0), colors.whitesmoke),
+            ("VALIGN", (0, 0), (-1, -1), "TOP"),
+            ("ROWBACKGROUNDS", (0, 1), (-1, -1), [colors.white, colors.HexColor("#f2f2f2")]),
+            ("GRID", (0, 0), (-1, -1), 0.5, colors.grey),
+            ("TOPPADDING", (0, 0), (-1, -1), 2),
+            ("BOTTOMPADDING", (0, 0), (-1, -1), 2),
+        ]),
+    }
+
+def document(target, **kwargs):
+    """A4-Dokumentvorlage mit 2 cm Rand; `target` ist ein Dateipfad oder ein binäres Dateiobjekt."""
+    from reportlab.platypus import SimpleDocTemplate
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.units import cm
+
+    return SimpleDocTemplate(target, pagesize=A4, rightMargin=2*cm, leftMargin=2*cm, topMargin=2*cm, bottomMargin=2*cm, **kwargs)
+
+def _text(value) -> str:
+    """Zelleninhalt als Text (fehlende Werte leer statt 'nan')."""
+    return "" if value is None or (isinstance(value, float) and value != value) else str(value)
+
+def title_flowables(title: str) -> list:
+    """Titelseite: Titel und Erstellungsdatum, danach Seitenumbruch."""
+    from reportlab.platypus import Paragraph, Spacer, PageBreak
+    from reportlab.lib.units import cm
+
+    styles = report_styles()
+    return [
+        Paragraph(escape(title), styles["title"]),
+        Spacer(1, 0.5*cm),
+        Paragraph(f"Erstellt am: {datetime.now().strftime('%d.%m.%Y')}", styles["normal"]),
+        PageBreak(),
+    ]
+
+@profiled
+def nutrition_entry_flowables(df: pd.DataFrame, fields=NUTRITION_PDF_FIELDS) -> list:
+    """Je Tagebucheintrag Überschrift (Datum, Phase) und Tabelle der Mahlzeiten."""
+    from reportlab.platypus import Paragraph, Spacer, Table
+    from reportlab.lib.units import cm
+
+    styles = report_styles()
+    heading_style, table_style = styles["heading"], styles["entry_table"]
+    # Spalten einmal als Arrays holen statt jede Zeile als Series zu bauen
+    days = pd.to_datetime(df["date"]).dt.strftime("%d.%m.%Y").to_numpy()
+    phases = df["phase"].to_numpy()
+    labels = [label for label, _ in fields]
+    columns = [df[col].to_numpy() if col in df.columns else [None] * len(df) for _, col in fields]
+    header = ["Mahlzeit", "Eintrag"]
+    col_widths = [4*cm, 12*cm]
+
+    story = []
+    for i, (day, phase) in enumerate(zip(days, phases)):
+        table = Table([header] + [[label, _text(col[i])] for label, col in zip(labels, columns)], colWidths=col_widths)
+        table.setStyle(table_style)
+        story += [
+            Paragraph(f"<b>Datum:</b> {day} | <b>Phase:</b> {escape(_text(phase))}", heading_style),
+            Spacer(1, 0.3*cm),
+            table,
+            Spacer(1, 1*cm),
+        ]
+    return story
+
+def _render_nutrition_chunk(df: pd.DataFrame, fields, path: str, title: str = None) -> str:
+    """Rendert einen Abschnitt des Tagebuchs in eine eigene PDF-Datei (läuft im Worker-Prozess)."""
+    story = (title_flowables(title) if title else []) + nutrition_entry_flowables(df, fields)
+    document(path).build(story)
+    return path
+
+def _merge_pdfs(parts: list, target) -> None:
+    from pypdf import PdfWriter
+
+    writer = PdfWriter()
+    for part in parts:
+        writer.append(part)
+    writer.write(target)
+
+def _can_merge() -> bool:
+    try:
+        import pypdf  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+@profiled
+def write_nutrition_pdf(df: pd.DataFrame, title: str, target, fields=NUTRITION_PDF_FIELDS, workers: int = None):
+    """Schreibt das Ernährungstagebuch als PDF nach `target` (Pfad oder binäres Dateiobjekt).
+
+    Mit workers > 1 (Standard: verfügbare CPUs) wird ein großer Bericht in Abschnitten zu je
+    CHUNK_ENTRIES Einträgen parallel gerendert; jeder Abschnitt beginnt dann auf einer neuen Seite.
+    Ohne pypdf wird seriell gerendert.
+    """
+    workers = workers if workers is not None else default_workers()
+    if workers <= 1 or len(df) < PARALLEL_MIN_ENTRIES or not _can_merge():
+        with span("reporting.build_pdf", entries=len(df)):
+            document(target).build(title_flowables(title) + nutrition_entry_flowables(df, fields))
+        return target
+
+    chunks = [df.iloc[start:start + CHUNK_ENTRIES] for start in range(0, len(df), CHUNK_ENTRIES)]
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        paths = [os.path.join(tmp_dir, f"part-{i:05d}.pdf") for i in range(len(chunks))]
+        titles = [title] + [None] * (len(chunks) - 1)
+        with span("reporting.render_chunks", chunks=len(chunks)):
+            with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+                parts = list(pool.map(_render_nutrition_chunk, chunks, [fields] * len(chunks), paths, titles))
+        with span("reporting.merge_pdf"):
+            _merge_pdfs(parts, target)
+    return target
@@ -0,0 +1,220 @@
+# search_index.py
+# Volltextsuche über alle Freitextfelder (Notizen, Mahlzeiten, Supplements) der vier Tabellen.
+# Invertierter Index je Tabelle (Wort -> Einträge), auf der Platte unter data/cache abgelegt und
+# beim Speichern einer Tabelle inkrementell nachgeführt: nur geänderte Einträge werden neu zerlegt.
+# Suchbegriffe gelten als Wortanfänge ("lachs" findet auch "Lachsfilet"), mehrere Begriffe müssen
+# alle vorkommen.
+import bisect
+import json
+import os
+import re
+import pandas as pd
+from config import (CACHE_DIR, DATA_MANIFEST_FILE, NUTRITION_MANIFEST_FILE, SPORT_TESTS_LONG_FILE,
+                    BLOOD_TESTS_LONG_FILE, ensure_directories)
+from database import table_version
+from food_parser import normalize
+from profiling import profiled, span
+
+# Registry: Tabelle -> (Datei bzw. Manifest, Schlüsselspalten (Datum, Phase/Testtyp), Freitextfelder, Bezeichnung)
+SEARCH_TABLES = {
+    "daily": (DATA_MANIFEST_FILE, ["date", "phase"], ["note"], "Tageswerte"),
+    "nutrition": (NUTRITION_MANIFEST_FILE, ["date", "phase"],
+                  ["breakfast", "snack_1", "lunch", "snack_2", "dinner", "supplements", "nutrition_note"], "Ernährung"),
+    "sport": (SPORT_TESTS_LONG_FILE, ["test_date", "test_type"], ["general_notes"], "Sporttest"),
+    "blood": (BLOOD_TESTS_LONG_FILE, ["test_date", "test_type"], ["notes"], "Bluttest"),
+}
+FIELD_LABELS = {
+    "note": "Notiz", "breakfast": "Frühstück", "snack_1": "Snack 1", "lunch": "Mittag", "snack_2": "Snack 2",
+    "dinner": "Abend", "supplements": "Supplements", "nutrition_note": "Notiz", "general_notes": "Notizen",
+    "notes": "Notizen",
+}
+INDEX_FORMAT = 1
+_TOKEN = re.compile(r"[a-z0-9]{2,}")
+# Geladene Indizes je Tabelle (einmal pro Prozess von der Platte gelesen)
+_indexes = {}
+
+def tokenize(text) -> set:
+    """Normalisierte Wörter eines Texts (Kleinschreibung, ohne Umlaute/Akzente, mind. 2 Zeichen)."""
+    return set(_TOKEN.findall(normalize(text))) if text else set()
+
+class TableIndex:
+    """Invertierter Index einer Tabelle: Einträge (Datum, Schlüssel, Felder) und Wort -> Eintrags-IDs."""
+
+    def __init__(self, version=None, docs=None, postings=None, checksum=None):
+        self.version = version
+        # Kennung des gespeicherten Index; die Versionsdatei verweist darauf
+        self.checksum = checksum
+        self.docs = docs or {}
+        self.postings = {token: set(ids) for token, ids in (postings or {}).items()}
+        self._vocabulary = None
+
+    def vocabulary(self) -> list:
+        """Sortierte Wortliste für die Präfixsuche (nach Änderungen neu aufgebaut)."""
+        if self._vocabulary is None:
+            self._vocabulary = sorted(self.postings)
+        return self._vocabulary
+
+    def _add(self, doc_id: str, fields: dict) -> None:
+        for token in set().union(*(tokenize(text) for text in fields.values())):
+            self.postings.setdefault(token, set()).add(doc_id)
+
+    def _remove(self, doc_id: str, fields: dict) -> None:
+        for token in set().union(*(tokenize(text) for text in fields.values())):
+            ids = self.postings.get(token)
+            if ids is not None:
+                ids.discard(doc_id)
+                if not ids:
+                    del self.postings[token]
+
+    def update(self, docs: dict, version, scope=None) -> int:
+        """Gleicht den Index mit dem aktuellen Stand ab; gibt die Anzahl neu zerlegter Einträge zurück.
+
+        Mit `scope` (erstes, letztes Datum als Text) deckt `docs` nur diesen Zeitraum ab; Einträge
+        außerhalb bleiben erhalten.
+        """
+        changed = 0
+        removed = self.docs.keys() - docs.keys()
+        if scope is not None:
+            removed = [doc_id for doc_id in removed if scope[0] <= self.docs[doc_id][0] <= scope[1]]
+        for doc_id in removed:
+            self._remove(doc_id, self.docs.pop(doc_id)[2])
+            changed += 1
+        for doc_id, doc in docs.items():
+            old = self.docs.get(doc_id)
+            if old == doc:
+                continue
+            if old is not None:
+                self._remove(doc_id, old[2])
+            self._add(doc_id, doc[2])
+            self.docs[doc_id] = doc
+            changed += 1
+        self.version = version
+        if changed:
+            self._vocabulary = None
+        return changed
+
+    def matches(self, prefix: str) -> set:
+        """Eintrags-IDs aller Wörter, die mit `prefix` beginnen."""
+        vocabulary = self.vocabulary()
+        start = bisect.bisect_left(vocabulary, prefix)
+        end = bisect.bisect_left(vocabulary, prefix + "￿", lo=start)
+        return set().union(*(self.postings[token] for token in vocabulary[start:end]))
+
+def _index_path(table: str, suffix: str = "") -> str:
+    return os.path.join(CACHE_DIR, f"search_{table}{suffix}.json")
+
+def _read_json(path: str):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+def _write_json(path: str, obj) -> None:
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        # json.dumps nutzt den schnellen C-Encoder, json.dump in eine Datei nicht
+        f.write(json.dumps(obj, ensure_ascii=False))
+    os.replace(tmp_path, path)
+
+def _load_index(table: str) -> TableIndex:
+    if table not in _indexes:
+        stored = _read_json(_index_path(table)) or {}
+        # Der Datenstand liegt in einer eigenen kleinen Datei, damit Speichern ohne Textänderung
+        # nicht den ganzen Index neu schreibt
+        version = (_read_json(_index_path(table, ".version")) or {}).get("version")
+        if version and stored.get("format") == INDEX_FORMAT and stored.get("checksum") == version[-1]:
+            _indexes[table] = TableIndex(version[:-1], stored["docs"], stored["postings"], stored["checksum"])
+        else:
+            _indexes[table] = TableIndex()
+    return _indexes[table]
+
+def _save_index(table: str, index: TableIndex, docs_changed: bool) -> None:
+    ensure_directories()
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    if docs_changed or not os.path.exists(_index_path(table)):
+        index.checksum = os.urandom(8).hex()
+        _write_json(_index_path(table), {"format": INDEX_FORMAT, "checksum": index.checksum, "docs": index.docs,
+                                         "postings": {token: sorted(ids) for token, ids in index.postings.items()}})
+    _write_json(_index_path(table, ".version"), {"version": list(index.version) + [index.checksum]})
+
+def documents(table: str, df: pd.DataFrame) -> dict:
+    """Einträge einer Tabelle mit Freitext: {"Datum|Schlüssel": [Datum, Schlüssel, {Feld: Text}]}."""
+    _, (date_col, key_col), fields, _ = SEARCH_TABLES[table]
+    fields = [f for f in fields if f in df.columns]
+    if df.empty or not fields:
+        return {}
+    dates = pd.to_datetime(df[date_col], errors="coerce").dt.strftime("%Y-%m-%d").fillna("").to_numpy()
+    keys = df[key_col].astype("string").fillna("").to_numpy()
+    texts = {f: df[f].astype("string").fillna("").str.strip().to_numpy() for f in fields}
+    docs = {}
+    for i, (day, key) in enumerate(zip(dates, keys)):
+        values = {f: str(texts[f][i]) for f in fields if texts[f][i]}
+        if values:
+            docs[f"{day}|{key}"] = [day, key, values]
+    return docs
+
+@profiled
+def update_table(table: str, df: pd.DataFrame, version=None, scope=None) -> int:
+    """Führt den Index einer Tabelle nach dem Speichern nach (df = gespeicherter Stand).
+
+    `scope` (erstes, letztes Datum als Text): df enthält nur die Einträge dieses Zeitraums.
+    Gibt die Anzahl neu zerlegter Einträge zurück; der Index wird nur bei Änderungen geschrieben.
+    """
+    path = SEARCH_TABLES[table][0]
+    version = list(version or table_version(path) or [])
+    index = _load_index(table)
+    stored_version = index.version
+    changed = index.update(documents(table, df), version, scope)
+    if changed or stored_version != version:
+        _save_index(table, index, docs_changed=bool(changed))
+    return changed
+
+def _load_texts(table: str) -> pd.DataFrame:
+    """Nur Schlüssel- und Freitextspalten einer Tabelle (ohne Zahlen zu lesen)."""
+    from database import query
+
+    return query(table, columns=SEARCH_TABLES[table][2])
+
+def refresh(tables=None) -> None:
+    """Gleicht Indizes ab, deren Tabelle außerhalb der Speicherfunktionen geändert wurde (z.B. Import)."""
+    for table in tables or SEARCH_TABLES:
+        path = SEARCH_TABLES[table][0]
+        index = _load_index(table)
+        if index.version != list(table_version(path) or []):
+            with span("search_index.rebuild", table=table):
+                update_table(table, _load_texts(table))
+
+@profiled
+def search(query: str, tables=None, limit: int = 100) -> pd.DataFrame:
+    """Sucht alle Begriffe (als Wortanfang) in den Freitextfeldern; neueste Treffer zuerst.
+
+    Spalten: table, label, date, key, field, text – eine Zeile je Eintrag und passendem Feld.
+    """
+    columns = ["table", "label", "date", "key", "field", "text"]
+    terms = sorted(tokenize(query))
+    if not terms:
+        return pd.DataFrame(columns=columns)
+    tables = tables or list(SEARCH_TABLES)
+    refresh(tables)
+    hits = []
+    for table in tables:
+        index = _load_index(table)
+        ids = None
+        for term in terms:
+            ids = index.matches(term) if ids is None else ids & index.matches(term)
+            if not ids:
+                break
+        hits += [(index.docs[doc_id][0], table, doc_id) for doc_id in ids or ()]
+    # Nur die neuesten Treffer aufbereiten
+    hits.sort(key=lambda hit: (hit[0], hit[1]), reverse=True)
+    rows = []
+    for day, table, doc_id in hits:
+        _, key, fields = _indexes[table].docs[doc_id]
+        for field, text in fields.items():
+            words = tokenize(text)
+            if any(word.startswith(term) for term in terms for word in words):
+                rows.append((table, SEARCH_TABLES[table][3], day, key, FIELD_LABELS.get(field, field), text))
+        if len(rows) >= limit:
+            break
+    return pd.DataFrame(rows[:limit], columns=columns)
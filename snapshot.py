@@ -0,0 +1,131 @@
+# snapshot.py
+# Einheitlicher Lesestand aller vier Tabellen (Tageswerte, Ernährung, Sport- und Bluttests).
+# current_snapshot() lädt jede Tabelle einmal und prüft über die Datenstände (table_version),
+# dass sich keine Datei während des Ladens geändert hat – sonst wird neu geladen. Solange sich
+# nichts ändert, teilen sich alle Sitzungen des Prozesses denselben Snapshot samt abgeleiteter
+# Auswertungen (derive). table() gibt flache Kopien aus: pandas arbeitet mit Copy-on-Write,
+# Änderungen einer Sitzung kopieren erst dann die betroffenen Spalten. Geladene Tabellen und die
+# Tageswerte mit Metriken werden zusätzlich in table_cache.py abgelegt, sodass weitere Prozesse
+# (und Neustarts) sie per mmap einblenden statt die CSV-Dateien erneut zu lesen.
+import threading
+import pandas as pd
+from database import QUERY_TABLES, PARTITIONED_TABLES, TABLE_IO, compute_metrics, derived_versions, load_manifest, table_version
+from profiling import profiled, span
+import table_cache
+
+SNAPSHOT_TABLES = ["daily", "nutrition", "sport", "blood"]
+# Wie oft geladen wird, wenn parallel geschrieben wird; danach gilt der Stand als nicht teilbar
+MAX_LOAD_ATTEMPTS = 3
+# Datenstand einer Tabelle, die nicht dem gespeicherten Stand entspricht
+UNSAVED = "ungespeichert"
+
+class Snapshot:
+    """Unveränderlicher Stand aller Tabellen; `version` (Datenstand je Tabelle) identifiziert ihn.
+
+    Tabellen mit noch nicht gespeicherten Änderungen (siehe write_queue.snapshot) haben den
+    Datenstand UNSAVED.
+    """
+
+    def __init__(self, versions: dict, tables: dict):
+        self.versions = dict(versions)
+        self.version = tuple(self.versions[name] for name in SNAPSHOT_TABLES)
+        self._tables = tables
+        self._derived = {}
+        # Reentrant: abgeleitete Auswertungen dürfen selbst derive() aufrufen
+        self._lock = threading.RLock()
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, Snapshot) and self.version == other.version
+
+    def __hash__(self) -> int:
+        return hash(self.version)
+
+    def __repr__(self) -> str:
+        return f"Snapshot({', '.join(f'{name}={len(df)}' for name, df in self._tables.items())})"
+
+    @property
+    def saved(self) -> bool:
+        """True, wenn alle Tabellen dem gespeicherten Stand entsprechen."""
+        return UNSAVED not in self.version
+
+    def table(self, name: str) -> pd.DataFrame:
+        """Tabelle als flache Kopie (Änderungen wirken sich nicht auf den Snapshot aus)."""
+        return self._tables[name].copy(deep=False)
+
+    def derive(self, key, func):
+        """Ergebnis von func(snapshot), einmal je Snapshot und `key` berechnet.
+
+        DataFrames werden als flache Kopie ausgegeben; andere Ergebnisse nicht verändern.
+        """
+        with self._lock:
+            if key not in self._derived:
+                with span("snapshot.derive", key=str(key)):
+                    self._derived[key] = func(self)
+            value = self._derived[key]
+        return value.copy(deep=False) if isinstance(value, pd.DataFrame) else value
+
+    def daily_metrics(self) -> pd.DataFrame:
+        """Tageswerte mit abgeleiteten Metriken (aus der Ernährung dieses Snapshots), nach Datum sortiert."""
+        return self.derive("daily_metrics", _daily_metrics)
+
+def _daily_metrics(snapshot: Snapshot) -> pd.DataFrame:
+    version = (snapshot.versions["daily"], snapshot.versions["nutrition"])
+    shared = UNSAVED not in version
+    # Ablage gilt nur für die aktuellen Formeln
+    version += (sorted(derived_versions().items()),)
+    df = table_cache.read("daily_metrics", version) if shared else None
+    if df is None:
+        df = compute_metrics(snapshot.table("daily"), snapshot.table("nutrition")).sort_values("date")
+        if shared:
+            table_cache.write("daily_metrics", version, df)
+    return df
+
+# Zuletzt geladener, vollständig gespeicherter Snapshot (gilt für alle Sitzungen des Prozesses)
+_current = None
+_load_lock = threading.Lock()
+
+def _version(name: str):
+    if name in PARTITIONED_TABLES:
+        # Migriert ggf. die alte Einzeldatei und wartet auf ausstehende Schreibaufträge der Tabelle
+        load_manifest(name)
+    return table_version(QUERY_TABLES[name][0])
+
+@profiled
+def current_snapshot(overlay: dict = None) -> Snapshot:
+    """Aktueller Stand aller Tabellen; unverändert bleibende Tabellen werden nicht neu gelesen.
+
+    `overlay` ({Tabelle: DataFrame}) ersetzt einzelne Tabellen durch noch nicht gespeicherte
+    Stände; diese werden dann weder gelesen noch abgewartet.
+    """
+    global _current
+    overlay = overlay or {}
+    names = [name for name in SNAPSHOT_TABLES if name not in overlay]
+    with _load_lock:
+        base = _current
+        for attempt in range(MAX_LOAD_ATTEMPTS):
+            before = {name: _version(name) for name in names}
+            if not overlay and base is not None and base.versions == before:
+                return base
+            tables, parsed = {}, []
+            with span("snapshot.load", attempt=attempt):
+                for name in names:
+                    if base is not None and base.versions[name] == before[name]:
+                        tables[name] = base._tables[name]
+                        continue
+                    tables[name] = table_cache.read(name, before[name])
+                    if tables[name] is None:
+                        tables[name] = TABLE_IO[name][0]()
+                        parsed.append(name)
+            after = {name: table_version(QUERY_TABLES[name][0]) for name in names}
+            if after == before:
+                # Nur konsistent geladene Stände für andere Prozesse ablegen
+                for name in parsed:
+                    table_cache.write(name, before[name], tables[name])
+                break
+        else:
+            # Dauernd geändert: diesen Stand nur einmal verwenden, nicht als Cache-Schlüssel teilen
+            before = {name: UNSAVED for name in names}
+        snapshot = Snapshot({**before, **{name: UNSAVED for name in overlay}}, {**tables, **overlay})
+        if not overlay and snapshot.saved:
+            _current = snapshot
+    return snapshot
@@ -0,0 +1,289 @@
+# study_report.py
+# Gesamtbericht der Studie ohne Streamlit (cli.py report): Tagesverläufe wie im Analyse-Tab,
+# Phasen-Statistik, Verlauf der Sporttests und Blutwerte gegen die Referenzbereiche.
+# Stufen: Daten laden -> Auswertungen (zwischengespeichert) -> Diagramme als PNG (matplotlib,
+# parallel in einem Prozess-Pool) -> Zusammenbau als PDF (reportlab) oder HTML.
+# Die Dauer jeder Stufe wird gemessen und mit dem Ergebnis zurückgegeben.
+import base64
+import html
+import multiprocessing
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from config import DEFAULT_GOALS, DEFAULT_SETTINGS, GOALS_FILE, SETTINGS_FILE
+from profiling import profiled, span
+
+# Diagramme wie im Analyse-Tab: (Abschnitt, Name, Titel, Einheit, [(Spalte, Beschriftung, Farbe)], Zielwert-Schlüssel)
+REPORT_CHARTS = [
+    ("Schlaf & Regeneration", "sleep_hours", "Schlafdauer", "h", [("sleep_hours", "Schlafdauer", "mediumpurple")], "sleep_hours_goal"),
+    ("Schlaf & Regeneration", "sleep_score", "Schlafqualität", "Score", [("sleep_score", "Schlafqualität", "dodgerblue")], None),
+    ("Schlaf & Regeneration", "hrv_sleep_avg", "HRV im Schlaf", "ms", [("hrv_sleep_avg", "HRV", "lightblue")], None),
+    ("Schlaf & Regeneration", "rhr_sleep_avg", "Ruhepuls im Schlaf", "bpm", [("rhr_sleep_avg", "Ruhepuls", "red")], None),
+    ("Aktivität", "total_steps", "Gesamtschritte", "Anz.", [("total_steps", "Schritte", "blue")], "total_steps_goal"),
+    ("Aktivität", "energy", "Energiebilanz", "kcal", [("intake_kcal", "Kalorienaufnahme", "red"), ("total_kcal_burn", "Kalorienverbrauch", "blue")], None),
+    ("Ernährung & Makros", "protein_g_per_kg", "Protein (g/kg Körpergewicht)", "g/kg", [("protein_g_per_kg", "Protein", "mediumseagreen")], "protein_g_per_kg_goal"),
+    ("Ernährung & Makros", "macros", "Makronährstoffe", "g", [("protein_g", "Protein", "mediumseagreen"), ("carbs_g", "Kohlenhydrate", "orange"), ("fat_g", "Fette", "gold")], None),
+    ("Körper & Kreislauf", "body_weight", "Körpergewicht", "kg", [("body_weight", "Körpergewicht", "gold")], None),
+    ("Körper & Kreislauf", "blood_pressure", "Blutdruck", "mmHg", [("bp_sys", "Systolisch", "red"), ("bp_dia", "Diastolisch", "blue")], None),
+    ("Wohlbefinden", "wellbeing", "Wohlbefinden", "Score (1-10)", [("energy", "Energie", "gold"), ("mood", "Stimmung", "dodgerblue"), ("motivation", "Motivation", "seagreen")], None),
+]
+PHASE_COLORS = {"Omnivor": "#6C757D", "Vegan": "#28A745"}
+# Kennzahlen im Boxplot-Überblick des Phasenvergleichs
+BOXPLOT_METRICS = 12
+
+@contextmanager
+def _stage(timings: dict, name: str):
+    """Misst eine Stufe des Berichts (ms) und trägt sie zusätzlich als Span in den Trace ein."""
+    started = time.perf_counter()
+    with span(f"study_report.{name}"):
+        yield
+    timings[name] = (time.perf_counter() - started) * 1000
+
+def _vegan_spans(dates: np.ndarray, phases: np.ndarray) -> list:
+    """Zusammenhängende Zeiträume der veganen Phase als (Start, Ende) für die Hinterlegung."""
+    vegan = phases == "Vegan"
+    if not vegan.any():
+        return []
+    edges = np.flatnonzero(np.diff(np.concatenate([[0], vegan.astype(np.int8), [0]])))
+    return [(dates[start], dates[end - 1]) for start, end in zip(edges[::2], edges[1::2])]
+
+def render_chart(task: dict) -> str:
+    """Zeichnet ein Diagramm als PNG nach task["path"] (läuft im Worker-Prozess)."""
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    fig, ax = plt.subplots(figsize=(8, 3.2), dpi=110)
+    if task["kind"] == "box":
+        columns = task["series"]
+        positions = np.arange(len(columns))
+        for offset, phase in [(-0.18, "Omnivor"), (0.18, "Vegan")]:
+            data = [values[task["phases"] == phase] for _, values, _ in columns]
+            data = [d[~np.isnan(d)] for d in data]
+            ax.boxplot(data, positions=positions + offset, widths=0.3, patch_artist=True, showfliers=False,
+                       boxprops={"facecolor": PHASE_COLORS[phase], "alpha": 0.7}, medianprops={"color": "black"})
+        ax.set_xticks(positions, [label for label, _, _ in columns], rotation=45, ha="right", fontsize=7)
+        ax.set_ylabel("z-Wert (standardisiert)")
+        ax.legend([plt.Rectangle((0, 0), 1, 1, color=c, alpha=0.7) for c in PHASE_COLORS.values()], PHASE_COLORS.keys(), fontsize=8)
+    else:
+        dates = task["dates"]
+        for start, end in _vegan_spans(dates, task["phases"]):
+            ax.axvspan(start, end, color=PHASE_COLORS["Vegan"], alpha=0.08, linewidth=0)
+        for label, values, color in task["series"]:
+            ax.plot(dates, values, label=label, color=color, linewidth=1.5)
+        if task.get("goal") is not None:
+            ax.axhline(task["goal"], color="gray", linestyle="--", linewidth=1, label="Ziel")
+        ax.set_ylabel(task["unit"])
+        if len(task["series"]) > 1 or task.get("goal") is not None:
+            ax.legend(fontsize=8)
+        fig.autofmt_xdate()
+    ax.set_title(task["title"], fontsize=11)
+    ax.grid(alpha=0.3)
+    fig.tight_layout()
+    fig.savefig(task["path"])
+    plt.close(fig)
+    return task["path"]
+
+def chart_tasks(daily_df: pd.DataFrame, goals: dict, out_dir: str) -> list:
+    """Zeichenaufträge mit den benötigten Spalten als Arrays (klein genug für den Versand an Worker)."""
+    from analysis import PHASE_COMPARISON_METRICS
+
+    df = daily_df.sort_values("date")
+    dates = pd.to_datetime(df["date"]).to_numpy()
+    phases = df["phase"].astype(str).to_numpy()
+    numeric = lambda col: pd.to_numeric(df[col], errors="coerce").to_numpy(dtype=float)
+    tasks = []
+    for section, name, title, unit, series, goal_key in REPORT_CHARTS:
+        present = [(label, numeric(col), color) for col, label, color in series if col in df.columns]
+        if not present or all(np.isnan(values).all() for _, values, _ in present):
+            continue
+        tasks.append({"kind": "line", "section": section, "title": title, "unit": unit, "dates": dates, "phases": phases,
+                      "series": present, "goal": goals.get(goal_key) if goal_key else None,
+                      "path": os.path.join(out_dir, f"{name}.png")})
+
+    # Phasenvergleich: standardisierte Werte, damit unterschiedliche Einheiten in ein Diagramm passen
+    box = []
+    for metric, title, _ in PHASE_COMPARISON_METRICS:
+        if metric in df.columns and len(box) < BOXPLOT_METRICS:
+            values = numeric(metric)
+            std = np.nanstd(values)
+            if np.isfinite(std) and std > 0:
+                box.append((title, (values - np.nanmean(values)) / std, None))
+    if box:
+        tasks.append({"kind": "box", "section": "Phasenvergleich", "title": "Omnivor vs. Vegan (Kernmetriken)",
+                      "unit": "", "phases": phases, "series": box, "path": os.path.join(out_dir, "phase_boxplots.png")})
+    return tasks
+
+@profiled
+def render_charts(tasks: list, workers: int = None) -> list:
+    """Zeichnet alle Diagramme; mit mehr als einem Worker parallel in eigenen Prozessen."""
+    from reporting import default_workers
+
+    workers = workers if workers is not None else default_workers()
+    if workers <= 1 or len(tasks) <= 1:
+        return [render_chart(task) for task in tasks]
+    # "spawn": auch aus dem Streamlit-Server heraus sicher
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        return list(pool.map(render_chart, tasks))
+
+def _fmt(value, digits: int = 2) -> str:
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return ""
+    if isinstance(value, (float, np.floating)):
+        return f"{value:.{digits}f}"
+    return str(value)
+
+def report_tables(daily_df: pd.DataFrame, sport_df: pd.DataFrame, settings: dict, snapshot=None) -> dict:
+    """Tabellen des Berichts als formatierte DataFrames (Titel -> Tabelle), leere Tabellen entfallen.
+
+    `snapshot` (snapshot.py): Stand für Phasen-Statistik, Blutwerte und Testkontext (Standard: gespeicherter Bestand).
+    """
+    from analysis import cached_phase_statistics, sport_progression, tests_with_daily_context, TEST_CONTEXT_METRICS
+    from reference_ranges import flag_blood_tests, flag_transitions, FLAG_LABELS
+
+    tables = {}
+    stats_df = cached_phase_statistics(snapshot)
+    if not stats_df.empty:
+        tables["Phasen-Statistik"] = pd.DataFrame({
+            "Metrik": stats_df["title"], "Einheit": stats_df["unit"],
+            "Ø Omnivor": stats_df["omnivor_mean"].map(_fmt), "Ø Vegan": stats_df["vegan_mean"].map(_fmt),
+            "Test": stats_df["test_name"], "p-Wert": stats_df["p_value"].map(lambda v: _fmt(v, 4)),
+            "Effekt": stats_df["effect_name"] + " = " + stats_df["effect_size"].map(lambda v: _fmt(v, 3)),
+        })
+
+    progression = sport_progression(sport_df)
+    if not progression.empty:
+        tables["Sporttests: Verlauf je Disziplin"] = pd.DataFrame({
+            "Disziplin": progression["title"], "Datum": progression["test_date"].astype(str),
+            "Testtyp": progression["test_type"], "Wert": progression["value"].map(lambda v: _fmt(v, 1)),
+            "Δ erster Test (%)": progression["change_first_pct"].map(lambda v: _fmt(v, 1)),
+            "Verbessert": progression["improved"].map({True: "ja", False: ""}),
+        })
+
+    flags = flag_blood_tests(settings.get("reference_sex", "m"), settings.get("reference_age", 35), snapshot)
+    if not flags.empty:
+        latest = flags.sort_values("test_date").drop_duplicates("measure", keep="last")
+        transitions = flag_transitions(flags).set_index("measure")
+        tables["Blutwerte: letzter Befund"] = pd.DataFrame({
+            "Marker": latest["measure"], "Datum": latest["test_date"].astype(str),
+            "Wert": latest["value"].map(lambda v: _fmt(v, 2)) + " " + latest["unit"].fillna(""),
+            "Bereich": latest["low"].map(lambda v: _fmt(v, 1)) + " – " + latest["high"].map(lambda v: _fmt(v, 1)),
+            "Bewertung": latest["flag"].map(FLAG_LABELS).str.split(" ", n=1).str[-1],
+            "Entwicklung": latest["measure"].map(transitions["status"]),
+        })
+
+    for kind, label in [("blood", "Bluttests"), ("sport", "Sporttests")]:
+        context = tests_with_daily_context(kind, snapshot=snapshot)
+        if context.empty:
+            continue
+        columns = {"test_date": "Datum", "test_type": "Testtyp", "days_28d": "Tage"}
+        columns.update({f"{m}_mean_28d": f"{t} ({u})" for m, t, u in TEST_CONTEXT_METRICS if f"{m}_mean_28d" in context.columns})
+        table = context[list(columns)].rename(columns=columns)
+        tables[f"{label}: Tageswerte der 28 Tage davor"] = table.apply(
+            lambda col: col.map(lambda v: _fmt(v, 1)) if col.dtype.kind == "f" else col.astype(str))
+    return tables
+
+def _pdf_table(df: pd.DataFrame, available_width: float):
+    from reportlab.platypus import Paragraph, Table
+    from reportlab.lib.styles import ParagraphStyle
+    from reporting import report_styles
+
+    styles = report_styles()
+    cell = ParagraphStyle("ReportCell", parent=styles["normal"], fontSize=7, leading=8.5, spaceAfter=0)
+    header = ParagraphStyle("ReportHeader", parent=cell, fontName="Helvetica-Bold", textColor="white")
+    # Zeilen spaltenweise formatieren statt per iterrows
+    rows = [[Paragraph(html.escape(str(c)), header) for c in df.columns]]
+    rows += [[Paragraph(html.escape(v), cell) for v in values] for values in zip(*(df[c].astype(str).to_numpy() for c in df.columns))]
+    table = Table(rows, colWidths=[available_width / len(df.columns)] * len(df.columns), repeatRows=1)
+    table.setStyle(styles["data_table"])
+    return table
+
+def write_pdf(path: str, title: str, charts: list, tables: dict, timings: dict) -> None:
+    """Setzt Titelseite, Diagramme je Abschnitt und Tabellen zu einem PDF zusammen."""
+    from reportlab.platypus import Paragraph, Spacer, Image, KeepTogether, PageBreak
+    from reportlab.lib.units import cm
+    from reporting import document, report_styles, title_flowables
+
+    styles = report_styles()
+    doc = document(path, title=title)
+    story = title_flowables(title)
+    section = None
+    for task in charts:
+        if task["section"] != section:
+            section = task["section"]
+            story.append(Paragraph(html.escape(section), styles["heading"]))
+        story.append(KeepTogether([Image(task["path"], width=doc.width, height=doc.width * 0.4), Spacer(1, 0.3*cm)]))
+    for name, table in tables.items():
+        story += [PageBreak() if name == next(iter(tables)) else Spacer(1, 0.5*cm),
+                  Paragraph(html.escape(name), styles["heading"]), _pdf_table(table, doc.width)]
+    story += [Spacer(1, 0.5*cm), Paragraph("Erstellungszeiten: " + ", ".join(f"{k} {v:.0f} ms" for k, v in timings.items()), styles["normal"])]
+    doc.build(story)
+
+HTML_STYLE = """
+body { font-family: Helvetica, Arial, sans-serif; max-width: 960px; margin: 2em auto; color: #222; }
+h1, h2 { color: #003366; } img { width: 100%; }
+table { border-collapse: collapse; font-size: 0.8em; width: 100%; margin-bottom: 1.5em; }
+th { background: #003366; color: white; text-align: left; } th, td { padding: 3px 6px; border: 1px solid #ccc; }
+tr:nth-child(even) td { background: #f2f2f2; } .meta { color: #666; font-size: 0.8em; }
+"""
+
+def write_html(path: str, title: str, charts: list, tables: dict, timings: dict) -> None:
+    """Eigenständige HTML-Datei (Diagramme als eingebettete PNG)."""
+    parts = [f"<!DOCTYPE html><html lang='de'><head><meta charset='utf-8'><title>{html.escape(title)}</title>",
+             f"<style>{HTML_STYLE}</style></head><body><h1>{html.escape(title)}</h1>",
+             f"<p class='meta'>Erstellt am: {datetime.now().strftime('%d.%m.%Y %H:%M')}</p>"]
+    section = None
+    for task in charts:
+        if task["section"] != section:
+            section = task["section"]
+            parts.append(f"<h2>{html.escape(section)}</h2>")
+        with open(task["path"], "rb") as f:
+            encoded = base64.b64encode(f.read()).decode("ascii")
+        parts.append(f"<img alt='{html.escape(task['title'])}' src='data:image/png;base64,{encoded}'>")
+    for name, table in tables.items():
+        parts.append(f"<h2>{html.escape(name)}</h2>" + table.to_html(index=False, border=0, na_rep=""))
+    parts.append("<p class='meta'>Erstellungszeiten: " + ", ".join(f"{k} {v:.0f} ms" for k, v in timings.items()) + "</p></body></html>")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("\n".join(parts))
+
+@profiled
+def build_study_report(path: str, fmt: str = None, workers: int = None) -> dict:
+    """Erstellt den Gesamtbericht als PDF oder HTML (Format aus der Dateiendung, falls nicht angegeben).
+
+    Gibt {"path", "charts", "tables", "timings"} zurück; timings enthält die Dauer jeder Stufe in ms.
+    """
+    from database import load_json
+    from snapshot import current_snapshot
+
+    fmt = (fmt or os.path.splitext(path)[1].lstrip(".") or "pdf").lower()
+    if fmt not in ("pdf", "html"):
+        raise ValueError(f"Unbekanntes Berichtsformat '{fmt}' (pdf oder html).")
+
+    timings = {}
+    with _stage(timings, "load"):
+        settings = load_json(SETTINGS_FILE, DEFAULT_SETTINGS)
+        goals = load_json(GOALS_FILE, DEFAULT_GOALS)
+        # Alle Tabellen aus einem Stand, auch wenn währenddessen gespeichert wird
+        snapshot = current_snapshot()
+        daily_df = snapshot.daily_metrics()
+        sport_df = snapshot.table("sport")
+    if daily_df.empty:
+        raise ValueError("Keine Tageswerte vorhanden – nichts zu berichten.")
+
+    with _stage(timings, "tables"):
+        tables = report_tables(daily_df, sport_df, settings, snapshot)
+
+    with tempfile.TemporaryDirectory() as chart_dir:
+        with _stage(timings, "charts"):
+            tasks = chart_tasks(daily_df, goals, chart_dir)
+            render_charts(tasks, workers)
+        first, last = pd.to_datetime(daily_df["date"]).agg(["min", "max"]).dt.strftime("%d.%m.%Y")
+        title = f"ABA Selbsttest – Studienbericht ({first} - {last})"
+        with _stage(timings, "assemble"):
+            (write_pdf if fmt == "pdf" else write_html)(path, title, tasks, tables, timings)
+    return {"path": path, "charts": len(tasks), "tables": len(tables), "timings": timings}
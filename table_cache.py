@@ -0,0 +1,125 @@
+# table_cache.py
+# Prozessübergreifende Ablage geladener Tabellen und abgeleiteter Auswertungen (snapshot.py)
+# unter data/cache/tables. Spalten mit festem NumPy-Typ (Zahlen, Wahrheitswerte, Zeitstempel)
+# liegen je als .npy-Datei und werden per mmap eingeblendet: alle Sitzungen und auch mehrere
+# Serverprozesse teilen sich diese Seiten über den Seitencache des Betriebssystems, statt die
+# CSV-Dateien jeweils neu zu parsen und eigene Kopien zu halten. Eingeblendet wird im
+# Copy-on-Write-Modus: Schreibzugriffe kopieren nur die betroffenen Seiten, die Dateien bleiben
+# unverändert. Übrige Spalten (Text, Datum
+# als date-Objekte, Int64 mit Lücken) liegen gemeinsam in einer pickle-Datei.
+# Jede Ablage gehört zu genau einem Datenstand; nach dem Speichern einer Tabelle passt sie nicht
+# mehr und wird beim nächsten Laden ersetzt. Das Verzeichnis kann jederzeit gelöscht werden.
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import tempfile
+import numpy as np
+import pandas as pd
+from config import TABLE_CACHE_DIR, ensure_directories
+from profiling import profiled
+
+# Erhöhen, wenn sich Ablage oder Ladefunktionen so ändern, dass alte Ablagen nicht mehr passen
+TABLE_CACHE_FORMAT = 1
+_META_FILE = "columns.json"
+_OBJECTS_FILE = "objects.pkl"
+_TMP_PREFIX = ".tmp-"
+
+def _entry_dir(name: str, version) -> str:
+    digest = hashlib.sha1(repr((TABLE_CACHE_FORMAT, version)).encode("utf-8")).hexdigest()[:16]
+    return os.path.join(TABLE_CACHE_DIR, name, digest)
+
+def _mappable(series: pd.Series) -> bool:
+    # Nur reine NumPy-Typen lassen sich ohne Umwandlung einblenden (keine Extension-Typen)
+    return isinstance(series.dtype, np.dtype) and series.dtype.kind in "biufcmM"
+
+def _read_entry(path: str):
+    try:
+        with open(os.path.join(path, _META_FILE), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        with open(os.path.join(path, _OBJECTS_FILE), "rb") as f:
+            objects = pickle.load(f)
+        columns = {
+            column: np.load(os.path.join(path, f"{pos}.npy"), mmap_mode="c") if column in meta["mapped"] else objects[column]
+            for pos, column in enumerate(meta["columns"])
+        }
+    except (FileNotFoundError, KeyError, ValueError, EOFError, pickle.UnpicklingError):
+        # Fehlend, unvollständig oder gerade ersetzt: neu laden
+        return None, None
+    index = objects.get(None, pd.RangeIndex(meta["rows"]))
+    # Spalten einzeln übernehmen (kein Zusammenfassen zu Blöcken, das würde kopieren)
+    df = pd.DataFrame(columns, index=index, copy=False)
+    df.attrs.update(meta.get("attrs", {}))
+    return meta, df
+
+@profiled
+def read(name: str, version):
+    """Abgelegte Tabelle zum Datenstand `version` oder None."""
+    return _read_entry(_entry_dir(name, version))[1]
+
+def read_latest(name: str):
+    """Zuletzt abgelegter Stand als (Datenstand, DataFrame), z.B. für inkrementelles Nachführen.
+
+    Der Datenstand wird nur geliefert, wenn er beim Ablegen JSON-fähig war; sonst (None, None).
+    """
+    parent = os.path.join(TABLE_CACHE_DIR, name)
+    try:
+        entries = [entry for entry in os.listdir(parent) if not entry.startswith(_TMP_PREFIX)]
+    except FileNotFoundError:
+        return None, None
+    for entry in entries:
+        meta, df = _read_entry(os.path.join(parent, entry))
+        if meta is not None and meta.get("version") is not None:
+            return meta["version"], df
+    return None, None
+
+@profiled
+def write(name: str, version, df: pd.DataFrame) -> bool:
+    """Legt `df` als Stand `version` ab und entfernt ältere Stände derselben Tabelle.
+
+    Gibt False zurück, wenn nicht abgelegt werden konnte (z.B. doppelte Spaltennamen).
+    """
+    if df.columns.has_duplicates:
+        return False
+    ensure_directories()
+    parent = os.path.join(TABLE_CACHE_DIR, name)
+    os.makedirs(parent, exist_ok=True)
+    target = _entry_dir(name, version)
+    if not os.path.exists(target):
+        # In ein temporäres Verzeichnis schreiben und erst vollständig umbenennen
+        tmp_dir = tempfile.mkdtemp(prefix=_TMP_PREFIX, dir=parent)
+        try:
+            mapped, objects = [], {}
+            for pos, column in enumerate(df.columns):
+                series = df[column]
+                if _mappable(series):
+                    np.save(os.path.join(tmp_dir, f"{pos}.npy"), series.to_numpy())
+                    mapped.append(column)
+                else:
+                    # Als Array (mit Typ, z.B. str oder Int64) statt Series: keine Ausrichtung am Index beim Laden
+                    objects[column] = series.array
+            if not (isinstance(df.index, pd.RangeIndex) and df.index.start == 0 and df.index.step == 1):
+                objects[None] = df.index
+            with open(os.path.join(tmp_dir, _OBJECTS_FILE), "wb") as f:
+                pickle.dump(objects, f, protocol=pickle.HIGHEST_PROTOCOL)
+            meta = {"format": TABLE_CACHE_FORMAT, "rows": len(df), "columns": list(df.columns), "mapped": mapped}
+            if df.attrs:
+                # z.B. Formelversionen der abgeleiteten Metriken (database.compute_metrics)
+                meta["attrs"] = df.attrs
+            if isinstance(version, list):
+                # Listen-Datenstände (JSON-fähig) für read_latest() mit ablegen
+                meta["version"] = version
+            with open(os.path.join(tmp_dir, _META_FILE), "w", encoding="utf-8") as f:
+                json.dump(meta, f)
+            os.rename(tmp_dir, target)
+        except OSError:
+            # z.B. gleichzeitig von einem anderen Prozess abgelegt
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            if not os.path.exists(target):
+                return False
+    # Ältere Stände entfernen; eingeblendete Dateien bleiben für laufende Prozesse gültig
+    for entry in os.listdir(parent):
+        if entry != os.path.basename(target) and not entry.startswith(_TMP_PREFIX):
+            shutil.rmtree(os.path.join(parent, entry), ignore_errors=True)
+    return True
@@ -1,16 +1,18 @@
 # ui_components.py
 import streamlit as st
 import pandas as pd
-import numpy as np
 import plotly.graph_objects as go
-import plotly.express as px
-from datetime import date, timedelta, datetime
+from datetime import date, timedelta
 from config import *
 from database import load_json, save_json, load_goals, save_goals, update_data, load_data, save_data, compute_metrics, load_nutrition_data, save_nutrition_data, update_nutrition_data, delete_nutrition_data, load_sport_tests_data, save_sport_tests_data, update_sport_tests_data, load_blood_tests_data, save_blood_tests_data, update_blood_tests_data
-import base64
-import io
 import os
-from scipy import stats
+from profiling import profiled, summarize, trace_file
+from analysis import PHASE_COMPARISON_METRICS, TEST_CONTEXT_METRICS, TEST_CONTEXT_WINDOWS, perform_statistical_tests, phase_comparison_frame, sport_progression, tests_with_daily_context
+from importer import read_csv_flexible, prepare_import_frame, merge_import
+from demo_data import generate_demo_data
+from reference_ranges import FLAG_LABELS, flag_blood_tests, flag_matrix, flag_transitions
+from lab_import import REVIEW_THRESHOLD, pending_jobs, load_review_queue, resolve_review_item
+from search_index import search
 
 # --- Definierte Farbpalette für Konsistenz ---
 COLORS = {
@@ -83,447 +85,6 @@ def load_demo_csv_bundle():
         st.error(f"Fehler beim Laden der Demo-Daten: {e}")
         return False
 
-def generate_demo_data():
-    nutrition_data = []  # Initialisierung für Demo-Ernährungsdaten
-
-    """Erzeugt synthetische Demodaten für alle Bereiche der App."""
-    # Parameter für die Demodaten
-    seed = 42
-    mode = "trend"  # "neutral" oder "trend"
-    trend_strength = 0.7  # 0.0 bis 1.0
-    
-    np.random.seed(seed)
-    
-    # Startdatum für die Demodaten
-    start_date = date.today() - timedelta(days=56)
-    
-    # 1. Tageswerte (56 Tage)
-    daily_data = []
-    
-    # Basiswerte für die omnivore Phase
-    base_body_weight = 75.0
-    base_bp_sys = 125
-    base_bp_dia = 80
-    base_energy = 7.0
-    base_mood = 7.0
-    base_motivation = 7.0
-    base_concentration = 7.0
-    
-    # Basiswerte für die vegane Phase (mit leichten Veränderungen)
-    vegan_body_weight_change = -1.0  # -1.0 kg
-    vegan_bp_sys_change = -5  # -5 mmHg
-    vegan_bp_dia_change = -3  # -3 mmHg
-    
-    # Nährstoffbasiswerte
-    base_intake_kcal = 2400
-    base_carbs_g = 250
-    base_protein_g = 120
-    base_fat_g = 80
-    base_water_ml = 2500
-
-    # --- Tageswerte synthetisch erzeugen (56 Tage) ---
-    for day in range(1, 57):
-        current_date = start_date + timedelta(days=day - 1)
-        is_vegan = day > 28
-        phase = "Vegan" if is_vegan else "Omnivor"
-
-        # Basis je Phase
-        body_weight = base_body_weight + (vegan_body_weight_change if is_vegan else 0.0) + np.random.normal(0, 0.2)
-        bp_sys = base_bp_sys + (vegan_bp_sys_change if is_vegan else 0) + np.random.normal(0, 2)
-        bp_dia = base_bp_dia + (vegan_bp_dia_change if is_vegan else 0) + np.random.normal(0, 2)
-
-        # Alltags-/Subjektivwerte
-        sleep_hours = np.clip(7.2 + np.random.normal(0, 0.6), 4.5, 9.5)
-        sleep_score = int(np.clip(78 + np.random.normal(0, 8), 40, 100))
-        total_steps = int(np.clip(8500 + np.random.normal(0, 1800), 1000, 25000))
-        total_kcal_burn = int(np.clip(2400 + np.random.normal(0, 250), 1200, 5000))
-
-        intake_kcal = int(np.clip(base_intake_kcal + (50 if is_vegan else 0) + np.random.normal(0, 150), 1200, 5000))
-        carbs_g = int(np.clip(base_carbs_g + (20 if is_vegan else 0) + np.random.normal(0, 25), 0, 800))
-        protein_g = int(np.clip(base_protein_g + (-10 if is_vegan else 0) + np.random.normal(0, 15), 0, 400))
-        fat_g = int(np.clip(base_fat_g + (-5 if is_vegan else 0) + np.random.normal(0, 10), 0, 300))
-        water_ml = int(np.clip(base_water_ml + np.random.normal(0, 300), 0, 10000))
-
-        hrv_sleep_avg = float(np.clip(45 + np.random.normal(0, 8), 15, 120))
-        rhr_sleep_avg = float(np.clip(55 + np.random.normal(0, 6), 35, 95))
-        rhr_sleep_min = float(np.clip(rhr_sleep_avg - abs(np.random.normal(4, 2)), 30, 90))
-        spo2_sleep_avg = float(np.clip(96 + np.random.normal(0, 1.0), 85, 100))
-        spo2_sleep_min = float(np.clip(spo2_sleep_avg - abs(np.random.normal(1.5, 0.8)), 80, 100))
-        deep_sleep_hours = float(np.clip(1.6 + np.random.normal(0, 0.3), 0.2, 3.5))
-        deep_sleep_percent = float(np.clip(20 + np.random.normal(0, 4), 5, 45))
-        awakenings = int(np.clip(2 + abs(np.random.normal(0, 1)), 0, 12))
-
-        morning_pulse = float(np.clip(58 + np.random.normal(0, 6), 35, 110))
-        hrv_day_avg = float(np.clip(hrv_sleep_avg + np.random.normal(0, 4), 10, 140))
-        spo2_day_avg = float(np.clip(96 + np.random.normal(0, 1.0), 85, 100))
-        stress_avg = float(np.clip(35 + np.random.normal(0, 10), 0, 100))
-        stress_peak = float(np.clip(stress_avg + abs(np.random.normal(15, 10)), 0, 100))
-
-        energy = float(np.clip(base_energy + (0.2 if is_vegan else 0) + np.random.normal(0, 0.7), 1, 10))
-        mood = float(np.clip(base_mood + np.random.normal(0, 0.7), 1, 10))
-        motivation = float(np.clip(base_motivation + np.random.normal(0, 0.8), 1, 10))
-        concentration = float(np.clip(base_concentration + np.random.normal(0, 0.7), 1, 10))
-
-        daily_row = {
-            "date": current_date,
-            "weekday": "",  # wird in compute_metrics gesetzt
-            "phase": phase,
-            "sleep_hours": round(float(sleep_hours), 1),
-            "sleep_score": int(sleep_score),
-            "hrv_sleep_avg": round(float(hrv_sleep_avg), 1),
-            "rhr_sleep_avg": round(float(rhr_sleep_avg), 1),
-            "rhr_sleep_min": round(float(rhr_sleep_min), 1),
-            "spo2_sleep_avg": round(float(spo2_sleep_avg), 1),
-            "spo2_sleep_min": round(float(spo2_sleep_min), 1),
-            "deep_sleep_hours": round(float(deep_sleep_hours), 2),
-            "deep_sleep_percent": round(float(deep_sleep_percent), 1),
-            "awakenings": int(awakenings),
-            "total_steps": int(total_steps),
-            "total_kcal_burn": int(total_kcal_burn),
-            "intake_kcal": int(intake_kcal),
-            "carbs_g": int(carbs_g),
-            "protein_g": int(protein_g),
-            "fat_g": int(fat_g),
-            "water_ml": int(water_ml),
-            "morning_pulse": round(float(morning_pulse), 1),
-            "hrv_day_avg": round(float(hrv_day_avg), 1),
-            "spo2_day_avg": round(float(spo2_day_avg), 1),
-            "bp_sys": int(round(float(bp_sys))),
-            "bp_dia": int(round(float(bp_dia))),
-            "body_weight": round(float(body_weight), 1),
-            "stress_avg": round(float(stress_avg), 1),
-            "stress_peak": round(float(stress_peak), 1),
-            "energy": round(float(energy), 1),
-            "mood": round(float(mood), 1),
-            "motivation": round(float(motivation), 1),
-            "concentration": round(float(concentration), 1),
-            "note": "DEMO (synthetisch) – Szenario nach Literatur, kein Messwert",
-            "last_modified": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-        }
-        daily_data.append(daily_row)
-
-    # Tageswerte speichern (inkl. berechneter Metriken)
-    daily_df = pd.DataFrame(daily_data)
-    daily_df = compute_metrics(daily_df)
-    save_data(daily_df)
-
-    
-    
-    # Mahlzeitentexte für omnivore Phase
-    omnivor_breakfast = [
-        "Haferflocken mit Milch und Beeren",
-        "Rührei mit Speck und Toast",
-        "Joghurt mit Müsli und Honig",
-        "Vollkornbrot mit Butter und Käse",
-    ]
-    omnivor_lunch = [
-        "Hühnerschnitzel mit Kartoffelsalat",
-        "Spaghetti Bolognese mit Parmesan",
-        "Schnitzel mit Pommes und Salat",
-        "Linsensuppe mit Wurst und Brot",
-    ]
-    omnivor_dinner = [
-        "Gebratenes Lachsfilet mit Reis und Gemüse",
-        "Schweinebraten mit Knödeln und Sauerkraut",
-        "Hähnchen-Curry mit Basmatireis",
-        "Rindersteak mit Kartoffeln und Kräuterbutter",
-    ]
-    
-    # Mahlzeitentexte für vegane Phase
-    vegan_breakfast = [
-        "Haferflocken mit Sojamilch und Beeren",
-        "Tofu-Rührei mit Vollkorntoast",
-        "Sojajoghurt mit Müsli und Ahornsirup",
-        "Vollkornbrot mit Avocado und Tomaten",
-    ]
-    vegan_lunch = [
-        "Linsen-Bolognese mit Vollkornnudeln",
-        "Kichererbsen-Curry mit Basmatireis",
-        "Gemüse-Eintopf mit Vollkornbrot",
-        "Burger mit Sojafrikadelle und Salat",
-    ]
-    vegan_dinner = [
-        "Gebratenes Tofu mit Reis und Gemüse",
-        "Veganes Chili mit Mais und Brot",
-        "Gemüse-Quinoa-Pfanne mit Avocado",
-        "Vegane Lasagne mit Tomatensauce",
-    ]
-    vegan_supplements = "Vitamin B12, DHA (Algenöl), Vitamin D3"
-    
-    for day in range(1, 57):
-        current_date = start_date + timedelta(days=day-1)
-
-        # Index (damit alle Listeneinträge vorkommen)
-        idx = (day - 1)
-
-        # Phase bestimmen + Mahlzeiten + Snacks
-        if day <= 28:
-            phase = "Omnivor"
-            breakfast = omnivor_breakfast[idx % len(omnivor_breakfast)]
-            lunch = omnivor_lunch[idx % len(omnivor_lunch)]
-            dinner = omnivor_dinner[idx % len(omnivor_dinner)]
-            supplements = "Multivitamin, Magnesium"
-
-            omnivor_snack_1 = ["Apfel und Nüsse", "Joghurt", "Banane", "Müsliriegel"]
-            omnivor_snack_2 = ["Vollkornbrot mit Käse", "Nüsse", "Topfen mit Beeren", "Butterbrot"]
-            snack_1 = omnivor_snack_1[idx % len(omnivor_snack_1)]
-            snack_2 = omnivor_snack_2[idx % len(omnivor_snack_2)]
-        else:
-            phase = "Vegan"
-            breakfast = vegan_breakfast[idx % len(vegan_breakfast)]
-            lunch = vegan_lunch[idx % len(vegan_lunch)]
-            dinner = vegan_dinner[idx % len(vegan_dinner)]
-            supplements = vegan_supplements
-
-            vegan_variants = [
-                {"snack_1": "Banane und Nüsse", "snack_2": "Vollkornbrot mit Hummus"},
-                {"snack_1": "Smoothie aus Banane, Haferdrink und Samen", "snack_2": "Sojajoghurt mit Nüssen"},
-            ]
-            variant = vegan_variants[(day - 29) % 2]
-            snack_1 = variant["snack_1"]
-            snack_2 = variant["snack_2"]
-
-        # Nährstoffwerte (aus den Tageswerten übernehmen)
-        daily_row = daily_df[daily_df["date"] == current_date].iloc[0]
-
-        nutrition_row = {
-            "date": current_date,
-            "phase": phase,
-            "breakfast": breakfast,
-            "snack_1": snack_1,
-            "lunch": lunch,
-            "snack_2": snack_2,
-            "dinner": dinner,
-            "supplements": supplements,
-            "nutrition_note": "DEMO (synthetisch) – Szenario nach Literatur, kein Messwert",
-            "intake_kcal": daily_row["intake_kcal"],
-            "carbs_g": daily_row["carbs_g"],
-            "protein_g": daily_row["protein_g"],
-            "fat_g": daily_row["fat_g"],
-            "water_ml": daily_row["water_ml"],
-            "last_modified": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        }
-
-        nutrition_data.append(nutrition_row)
-    
-    # Ernährungsdaten speichern
-    nutrition_df = pd.DataFrame(nutrition_data)
-    save_nutrition_data(nutrition_df)
-    
-    # 3. Bluttests (2 Tests)
-    blood_test_data = []
-    
-    # Baseline-Test (Tag 1)
-    baseline_date = start_date
-    baseline_row = {
-        "test_date": baseline_date,
-        "test_type": "Baseline (Omnivor)",
-        "notes": "DEMO (synthetisch) – Szenario nach Literatur, kein Messwert",
-        "pdf_file": "",
-        # Rotes & weißes Blutbild
-        "hemoglobin": 14.5 + np.random.normal(0, 0.3),
-        "erythrocytes": 4.8 + np.random.normal(0, 0.2),
-        "mcv": 90 + np.random.normal(0, 3),
-        "mch": 30 + np.random.normal(0, 1),
-        "thrombocytes": 250 + np.random.normal(0, 20),
-        "leukocytes": 6.5 + np.random.normal(0, 0.5),
-        "segment": 55 + np.random.normal(0, 3),
-        "monocytes": 6 + np.random.normal(0, 1),
-        "lymphocytes": 30 + np.random.normal(0, 2),
-        "basophils": 1 + np.random.normal(0, 0.2),
-        "eosinophils": 3 + np.random.normal(0, 0.5),
-        # Blutchemie
-        "alat": 25 + np.random.normal(0, 3),
-        "asat": 22 + np.random.normal(0, 3),
-        "creatinine": 0.9 + np.random.normal(0, 0.1),
-        "egfr": 95 + np.random.normal(0, 5),
-        "iron": 90 + np.random.normal(0, 10),
-        "transferrin_saturation": 30 + np.random.normal(0, 3),
-        "gamma_gt": 20 + np.random.normal(0, 3),
-        "ap": 65 + np.random.normal(0, 5),
-        "iron_saturation": 250 + np.random.normal(0, 20),
-        "ebk": 4.2 + np.random.normal(0, 0.2),
-        "ferritin": 80 + np.random.normal(0, 10),
-        "transferrin": 2.8 + np.random.normal(0, 0.2),
-        # Blutfette
-        "cholesterol": 210 + np.random.normal(0, 10),
-        "triglycerides": 120 + np.random.normal(0, 15),
-        "ldl_chol": 130 + np.random.normal(0, 10),
-        # Elektrolyte
-        "sodium": 140 + np.random.normal(0, 2),
-        "calcium": 2.4 + np.random.normal(0, 0.1),
-        "potassium": 4.2 + np.random.normal(0, 0.1),
-        # Schilddrüsenhormone
-        "tsh_basal": 1.8 + np.random.normal(0, 0.2),
-        # Harnbefund
-        "hk": 0.1 + np.random.normal(0, 0.02),
-        "last_modified": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    }
-    
-    blood_test_data.append(baseline_row)
-    
-    # Post-Vegan-Test (Tag 56)
-    post_vegan_date = start_date + timedelta(days=55)
-    post_vegan_row = {
-        "test_date": post_vegan_date,
-        "test_type": "Vegan-Test",
-        "notes": "DEMO (synthetisch) – Szenario nach Literatur, kein Messwert",
-        "pdf_file": "",
-        # Rotes & weißes Blutbild (kaum Veränderung)
-        "hemoglobin": 14.3 + np.random.normal(0, 0.3),
-        "erythrocytes": 4.7 + np.random.normal(0, 0.2),
-        "mcv": 90 + np.random.normal(0, 3),
-        "mch": 30 + np.random.normal(0, 1),
-        "thrombocytes": 245 + np.random.normal(0, 20),
-        "leukocytes": 6.3 + np.random.normal(0, 0.5),
-        "segment": 54 + np.random.normal(0, 3),
-        "monocytes": 6 + np.random.normal(0, 1),
-        "lymphocytes": 31 + np.random.normal(0, 2),
-        "basophils": 1 + np.random.normal(0, 0.2),
-        "eosinophils": 3 + np.random.normal(0, 0.5),
-        # Blutchemie
-        "alat": 23 + np.random.normal(0, 3),
-        "asat": 20 + np.random.normal(0, 3),
-        "creatinine": 0.9 + np.random.normal(0, 0.1),
-        "egfr": 96 + np.random.normal(0, 5),
-        "iron": 85 + np.random.normal(0, 10),
-        "transferrin_saturation": 28 + np.random.normal(0, 3),
-        "gamma_gt": 18 + np.random.normal(0, 3),
-        "ap": 62 + np.random.normal(0, 5),
-        "iron_saturation": 240 + np.random.normal(0, 20),
-        "ebk": 4.1 + np.random.normal(0, 0.2),
-        "ferritin": 75 + np.random.normal(0, 10),
-        "transferrin": 2.9 + np.random.normal(0, 0.2),
-        # Blutfette (moderate Veränderung)
-        "cholesterol": 190 + np.random.normal(0, 10),  # ↓
-        "triglycerides": 110 + np.random.normal(0, 15),  # ↓
-        "ldl_chol": 115 + np.random.normal(0, 10),  # ↓
-        # Elektrolyte
-        "sodium": 139 + np.random.normal(0, 2),
-        "calcium": 2.4 + np.random.normal(0, 0.1),
-        "potassium": 4.1 + np.random.normal(0, 0.1),
-        # Schilddrüsenhormone
-        "tsh_basal": 1.9 + np.random.normal(0, 0.2),
-        # Harnbefund
-        "hk": 0.1 + np.random.normal(0, 0.02),
-        "last_modified": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    }
-    
-    blood_test_data.append(post_vegan_row)
-    
-    # Bluttest-Daten speichern
-    blood_test_df = pd.DataFrame(blood_test_data)
-    save_blood_tests_data(blood_test_df)
-    
-    # 4. Sporttests (4 Tests)
-    sport_test_data = []
-    
-    # Baseline-Tests (Tag 1)
-    baseline_date = start_date
-    baseline_cooper = {
-        "test_date": baseline_date,
-        "test_type": "Baseline (Omnivor)",
-        "general_notes": "DEMO (synthetisch) – keine Aussage zur Leistungsfähigkeit",
-        # Cooper-Test
-        "cooper_distance": 2400 + np.random.normal(0, 50),
-        "cooper_avg_hr": 165 + np.random.normal(0, 5),
-        "cooper_max_hr": 180 + np.random.normal(0, 5),
-        "cooper_pace": 5.0 + np.random.normal(0, 0.2),
-        "cooper_kcal": 650 + np.random.normal(0, 20),
-        "cooper_warmup": 5 + np.random.normal(0, 1),
-        "cooper_aerob": 6 + np.random.normal(0, 1),
-        "cooper_anaerob": 1 + np.random.normal(0, 0.5),
-        "cooper_intensive": 0,
-        "cooper_photo": "",
-        # 5km-Lauf
-        "run5k_time": "25:30",
-        "run5k_avg_hr": 170 + np.random.normal(0, 5),
-        "run5k_max_hr": 185 + np.random.normal(0, 5),
-        "run5k_pace": 5.1 + np.random.normal(0, 0.2),
-        "run5k_kcal": 350 + np.random.normal(0, 20),
-        "run5k_warmup": 5 + np.random.normal(0, 1),
-        "run5k_aerob": 20 + np.random.normal(0, 2),
-        "run5k_anaerob": 5 + np.random.normal(0, 1),
-        "run5k_intensive": 0,
-        "run5k_photo": "",
-        # Liegestütze
-        "pushups_reps": 35 + np.random.normal(0, 3),
-        "pushups_avg_hr": 120 + np.random.normal(0, 5),
-        "pushups_max_hr": 140 + np.random.normal(0, 5),
-        "pushups_photo": "",
-        # Plank
-        "plank_time": "2:30",
-        "plank_avg_hr": 110 + np.random.normal(0, 5),
-        "plank_max_hr": 125 + np.random.normal(0, 5),
-        "plank_photo": "",
-        # Burpee-Test
-        "burpee_reps": 45 + np.random.normal(0, 3),
-        "burpee_avg_hr": 150 + np.random.normal(0, 5),
-        "burpee_max_hr": 170 + np.random.normal(0, 5),
-        "burpee_photo": "",
-        # VO2max-Test
-        "vo2max_value": 45 + np.random.normal(0, 2),
-        "vo2max_avg_hr": 175 + np.random.normal(0, 5),
-        "vo2max_max_hr": 190 + np.random.normal(0, 5),
-        "vo2max_duration": "12:00",
-        "vo2max_speed": "12.0 km/h",
-        "vo2max_photo": "",
-        "last_modified": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    }
-    
-    sport_test_data.append(baseline_cooper)
-    
-    # Mid-Omnivor-Test (Tag 14)
-    mid_omnivor_date = start_date + timedelta(days=13)
-    mid_omnivor_row = baseline_cooper.copy()
-    mid_omnivor_row["test_date"] = mid_omnivor_date
-    mid_omnivor_row["test_type"] = "Mid-Omnivor (2W)"
-    mid_omnivor_row["cooper_distance"] = 2450 + np.random.normal(0, 50)
-    mid_omnivor_row["run5k_time"] = "25:15"
-    mid_omnivor_row["pushups_reps"] = 36 + np.random.normal(0, 3)
-    mid_omnivor_row["plank_time"] = "2:35"
-    mid_omnivor_row["burpee_reps"] = 46 + np.random.normal(0, 3)
-    mid_omnivor_row["vo2max_value"] = 45.5 + np.random.normal(0, 2)
-    mid_omnivor_row["last_modified"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    
-    sport_test_data.append(mid_omnivor_row)
-    
-    # Early-Vegan-Test (Tag 42)
-    early_vegan_date = start_date + timedelta(days=41)
-    early_vegan_row = baseline_cooper.copy()
-    early_vegan_row["test_date"] = early_vegan_date
-    early_vegan_row["test_type"] = "Early-Vegan (2W)"
-    early_vegan_row["cooper_distance"] = 2420 + np.random.normal(0, 50)
-    early_vegan_row["run5k_time"] = "25:40"
-    early_vegan_row["pushups_reps"] = 34 + np.random.normal(0, 3)
-    early_vegan_row["plank_time"] = "2:25"
-    early_vegan_row["burpee_reps"] = 44 + np.random.normal(0, 3)
-    early_vegan_row["vo2max_value"] = 44.5 + np.random.normal(0, 2)
-    early_vegan_row["last_modified"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    
-    sport_test_data.append(early_vegan_row)
-    
-    # Post-Vegan-Test (Tag 56)
-    post_vegan_date = start_date + timedelta(days=55)
-    post_vegan_row = baseline_cooper.copy()
-    post_vegan_row["test_date"] = post_vegan_date
-    post_vegan_row["test_type"] = "Post-Vegan (4W)"
-    post_vegan_row["cooper_distance"] = 2380 + np.random.normal(0, 50)
-    post_vegan_row["run5k_time"] = "26:00"
-    post_vegan_row["pushups_reps"] = 33 + np.random.normal(0, 3)
-    post_vegan_row["plank_time"] = "2:20"
-    post_vegan_row["burpee_reps"] = 43 + np.random.normal(0, 3)
-    post_vegan_row["vo2max_value"] = 44 + np.random.normal(0, 2)
-    post_vegan_row["last_modified"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    
-    sport_test_data.append(post_vegan_row)
-    
-    # Sporttest-Daten speichern
-    sport_test_df = pd.DataFrame(sport_test_data)
-    save_sport_tests_data(sport_test_df)
-    
-    return True
-
 def render_csv_import_section():
     """Rendert den Bereich für den CSV-Import von Tageswerten."""
     st.subheader("📥 CSV-Import für Tageswerte")
@@ -537,45 +98,9 @@ def render_csv_import_section():
 
     if uploaded_file is not None:
         try:
-            # Versuche, die CSV mit verschiedenen Trennern zu lesen
-            import_df = None
-            for delimiter in [',', ';']:
-                try:
-                    # Versuche zuerst mit Komma als Trennzeichen
-                    import_df = pd.read_csv(uploaded_file, delimiter=delimiter, encoding='utf-8')
-                    # Wenn erfolgreich, prüfe auf Dezimalzeichen
-                    if '.' not in import_df.select_dtypes(include=[np.number]).columns.to_string():
-                        # Wenn kein Punkt in numerischen Spalten, versuche mit Komma als Dezimaltrennzeichen
-                        try:
-                            import_df = pd.read_csv(uploaded_file, delimiter=delimiter, decimal=',', encoding='utf-8')
-                        except:
-                            pass
-                    break
-                except:
-                    continue
-            
-            if import_df is None:
-                # Versuche mit verschiedenen Kodierungen
-                for encoding in ['utf-8', 'latin1', 'iso-8859-1']:
-                    try:
-                        for delimiter in [',', ';']:
-                            try:
-                                import_df = pd.read_csv(uploaded_file, delimiter=delimiter, encoding=encoding)
-                                # Wenn erfolgreich, prüfe auf Dezimalzeichen
-                                if '.' not in import_df.select_dtypes(include=[np.number]).columns.to_string():
-                                    # Wenn kein Punkt in numerischen Spalten, versuche mit Komma als Dezimaltrennzeichen
-                                    try:
-                                        import_df = pd.read_csv(uploaded_file, delimiter=delimiter, decimal=',', encoding=encoding)
-                                    except:
-                                        pass
-                                break
-                            except:
-                                continue
-                        if import_df is not None:
-                            break
-                    except:
-                        continue
-            
+            # Versuche, die CSV mit verschiedenen Trennern und Kodierungen zu lesen
+            import_df = read_csv_flexible(uploaded_file)
+
             if import_df is None:
                 st.error("Konnte die Datei nicht lesen. Überprüfe das Format und die Kodierung.")
                 return
@@ -609,79 +134,22 @@ def render_csv_import_section():
             overwrite = st.checkbox("Vorhandene Einträge (gleiches Datum & Phase) überschreiben?", value=False, help="Wenn aktiviert, werden bestehende Einträge mit den Daten aus der CSV-Datei aktualisiert.")
             
             if st.button("Import starten", type="primary"):
-                if not column_mapping.get("date") or not column_mapping.get("phase"):
-                    st.error("Die Zuordnung für 'Datum' und 'Phase' ist zwingend erforderlich!")
-                    return
-
-                # DataFrame für den Import vorbereiten
-                df_to_import = import_df[list(column_mapping.values())].copy()
-                df_to_import = df_to_import.rename(columns={v: k for k, v in column_mapping.items()})
-
                 # Datentypen bereinigen und konvertieren
                 try:
-                    # Versuche verschiedene Datumsformate
-                    date_col = column_mapping["date"]
-                    for date_format in ["%Y-%m-%d", "%d.%m.%Y", "%m/%d/%Y"]:
-                        try:
-                            df_to_import['date'] = pd.to_datetime(df_to_import['date'], format=date_format).dt.date
-                            break
-                        except:
-                            continue
-                    
-                    # Wenn kein Format passt, versuche es ohne Format
-                    if df_to_import['date'].dtype == 'object':
-                        df_to_import['date'] = pd.to_datetime(df_to_import['date'], errors='coerce').dt.date
-                    
-                    # Prüfe auf ungültige Daten
-                    if df_to_import['date'].isnull().any():
-                        st.warning("Einige Daten konnten nicht konvertiert werden und werden ignoriert.")
-                        df_to_import = df_to_import.dropna(subset=['date'])
-                    
+                    df_to_import, import_warnings = prepare_import_frame(import_df, column_mapping)
+                except ValueError as e:
+                    st.error(str(e))
+                    return
                 except Exception as e:
                     st.error(f"Fehler beim Konvertieren des Datums: {e}")
                     return
-                
-                # Phase validieren
-                df_to_import['phase'] = df_to_import['phase'].astype(str).str.title()
-                if not df_to_import['phase'].isin(['Omnivor', 'Vegan']).all():
-                    st.warning("Die Spalte 'Phase' enthält Werte, die nicht 'Omnivor' oder 'Vegan' sind. Diese werden ignoriert.")
-                    df_to_import = df_to_import[df_to_import['phase'].isin(['Omnivor', 'Vegan'])]
-
-                # Numerische Spalten konvertieren
-                numeric_cols = [col for col in COLUMNS if col not in ['date', 'phase', 'weekday', 'note', 'last_modified']]
-                for col in numeric_cols:
-                    if col in df_to_import.columns:
-                        df_to_import[col] = pd.to_numeric(df_to_import[col], errors='coerce')
+                for warning in import_warnings:
+                    st.warning(warning)
 
                 # Daten importieren
-                existing_df = load_data()
-                new_count = 0
-                updated_count = 0
-
                 with st.spinner("Daten werden verarbeitet..."):
-                    for index, row in df_to_import.iterrows():
-                        date_val = row['date']
-                        phase_val = row['phase']
-                        
-                        # Prüfen, ob Eintrag bereits existiert
-                        mask = (existing_df['date'] == date_val) & (existing_df['phase'] == phase_val)
-                        
-                        row_data = row.to_dict()
-                        row_data['last_modified'] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                    existing_df, new_count, updated_count = merge_import(load_data(), df_to_import, overwrite)
 
-                        if mask.any():
-                            if overwrite:
-                                # Update bestehenden Eintrag
-                                for key, value in row_data.items():
-                                    if key in existing_df.columns:
-                                        existing_df.loc[mask, key] = value
-                                updated_count += 1
-                        else:
-                            # Neuen Eintrag hinzufügen
-                            new_row_df = pd.DataFrame([row_data])
-                            existing_df = pd.concat([existing_df, new_row_df], ignore_index=True)
-                            new_count += 1
-                
                     # Metriken neu berechnen und speichern
                     try:
                         final_df = compute_metrics(existing_df)
@@ -730,6 +198,18 @@ def render_settings_expander(settings: dict, mapping: dict):
         settings["watch_folder"] = st.text_input("CSV-Ordner (iCloud/Health/Ring/Yazio)", value=settings.get("watch_folder", ""), key="watch_folder_input")
         settings["filename_glob"] = st.text_input("Dateimuster", value=settings.get("filename_glob", "*.csv"), key="filename_glob_input")
 
+        st.subheader("Profiling")
+        settings["profiling_enabled"] = st.checkbox("Profiling aktivieren (Zeitmessung pro Rerun)", value=settings.get("profiling_enabled", False), key="profiling_enabled_checkbox")
+        settings["profiling_dump"] = st.checkbox("Traces in Datei schreiben (JSON-Zeilen für Offline-Analyse)", value=settings.get("profiling_dump", False), key="profiling_dump_checkbox", disabled=not settings["profiling_enabled"])
+
+        st.subheader("Referenzbereiche (Bluttests)")
+        col1, col2 = st.columns(2)
+        sex_options = {"m": "männlich", "f": "weiblich"}
+        settings["reference_sex"] = col1.selectbox("Geschlecht", list(sex_options), format_func=sex_options.get,
+                                                   index=list(sex_options).index(settings.get("reference_sex", "m")), key="reference_sex_selectbox")
+        settings["reference_age"] = col2.number_input("Alter (Jahre)", min_value=18, max_value=120, step=1,
+                                                      value=int(settings.get("reference_age", 35)), key="reference_age_input")
+
         st.subheader("Datenmanagement")
         c1, c2 = st.columns(2)
         if c1.button("💣 Alle Daten löschen", key="delete_all_data_button"):
@@ -779,6 +259,33 @@ def render_settings_expander(settings: dict, mapping: dict):
                 save_goals(goals)
                 st.success("Ziele wurden gespeichert!")
 
+def render_profiling_panel(trace, dumped: bool = False):
+    """Zeigt die Zeitaufteilung des aktuellen Reruns (nur bei aktivem Profiling)."""
+    if trace is None:
+        return
+    with st.expander(f"⏱️ Profiling – dieser Rerun: {trace.total_ms:.0f} ms", expanded=False):
+        rows = summarize(trace)
+        if not rows:
+            st.info("Keine Messpunkte in diesem Rerun.")
+            return
+        summary_df = pd.DataFrame(rows)[["span", "calls", "total_ms", "mean_ms", "max_ms", "share_pct"]]
+        st.dataframe(
+            summary_df,
+            column_config={
+                "span": "Messpunkt",
+                "calls": "Aufrufe",
+                "total_ms": st.column_config.NumberColumn("Summe (ms)", format="%.1f"),
+                "mean_ms": st.column_config.NumberColumn("Ø (ms)", format="%.2f"),
+                "max_ms": st.column_config.NumberColumn("Max (ms)", format="%.1f"),
+                "share_pct": st.column_config.NumberColumn("Anteil (%)", format="%.1f"),
+            },
+            hide_index=True,
+            use_container_width=True,
+        )
+        st.caption("Verschachtelte Messpunkte (z.B. load_nutrition_data in compute_metrics) sind im Anteil des Aufrufers enthalten.")
+        if dumped:
+            st.caption(f"Trace gespeichert in: {trace_file()}")
+
 def render_daily_form():
     """Rendert das Tagesformular (ohne Training, mit Energie & Nährstoffen)."""
     with st.form(key="daily_form_key"):
@@ -980,6 +487,137 @@ def render_sport_tests_form():
     
     return ok, locals()
 
+def format_duration(seconds) -> str:
+    """Formatiert ganze Sekunden für die Anzeige als 'M:SS' bzw. 'H:MM:SS' (negativ mit Vorzeichen)."""
+    if seconds is None or pd.isna(seconds):
+        return ""
+    sign = "-" if seconds < 0 else ""
+    minutes, secs = divmod(int(round(abs(seconds))), 60)
+    hours, minutes = divmod(minutes, 60)
+    if hours:
+        return f"{sign}{hours}:{minutes:02d}:{secs:02d}"
+    return f"{sign}{minutes}:{secs:02d}"
+
+def format_sport_durations(df: pd.DataFrame) -> pd.DataFrame:
+    """Gibt eine Anzeige-Kopie zurück, in der die Dauer-Spalten der Sporttests als M:SS formatiert sind."""
+    display_df = df.copy(deep=False)
+    for col in SPORT_DURATION_COLUMNS:
+        if col in display_df.columns:
+            display_df[col] = display_df[col].map(format_duration)
+    return display_df
+
+def render_sport_progression(sport_df: pd.DataFrame):
+    """Zeigt den Verlauf der Hauptkennzahl je Testdisziplin (Veränderung zum Vortest und zum ersten Test)."""
+    progression = sport_progression(sport_df)
+    if progression.empty:
+        return
+    st.subheader("📈 Verlauf je Disziplin")
+    is_duration = progression["discipline"].map(lambda d: SPORT_PROGRESSION_METRICS[d][0] in SPORT_DURATION_COLUMNS)
+
+    def fmt(col, signed=False):
+        numbers = progression[col].map(lambda v: "" if pd.isna(v) else f"{round(v, 1):+g}" if signed else f"{round(v, 1):g}")
+        durations = progression[col].map(lambda v: ("+" if signed and v > 0 else "") + format_duration(v))
+        return numbers.where(~is_duration, durations)
+
+    st.dataframe(pd.DataFrame({
+        "Disziplin": progression["title"],
+        "Datum": progression["test_date"],
+        "Testtyp": progression["test_type"],
+        "Wert": fmt("value"),
+        "Δ Vortest": fmt("change_prev", signed=True),
+        "Δ erster Test": fmt("change_first", signed=True),
+        "Δ erster Test (%)": progression["change_first_pct"].round(1),
+        "Verbessert": progression["improved"].map({True: "✅", False: ""}),
+    }), use_container_width=True, hide_index=True)
+
+def render_search_section():
+    """Suchfeld über Notizen und Mahlzeiten aller Tabellen (Treffer mit Datum und Phase/Testtyp)."""
+    query = st.text_input("🔎 Suche in Notizen & Mahlzeiten", key="search_query_input",
+                          placeholder="z.B. Kopfschmerzen, Lachs, Magnesium ...")
+    if not query.strip():
+        return
+    results = search(query)
+    if results.empty:
+        st.info("Keine Treffer.")
+        return
+    st.caption(f"{len(results)} Treffer (neueste zuerst, höchstens 100).")
+    st.dataframe(
+        results[["date", "label", "key", "field", "text"]].rename(
+            columns={"date": "Datum", "label": "Bereich", "key": "Phase / Test", "field": "Feld", "text": "Text"}),
+        use_container_width=True, hide_index=True,
+    )
+
+def render_test_context(kind: str, snapshot=None):
+    """Zeigt je Test die Mittelwerte ausgewählter Tageswerte der Tage davor (Blut- bzw. Sporttests)."""
+    context = tests_with_daily_context(kind, snapshot=snapshot)
+    if context.empty:
+        return
+    st.subheader("🗓️ Tageswerte vor dem Test")
+    window = st.radio("Zeitraum vor dem Test", TEST_CONTEXT_WINDOWS, horizontal=True,
+                      format_func=lambda w: f"{w} Tage", key=f"{kind}_context_window")
+    columns = {"test_date": "Datum", "test_type": "Testtyp", f"days_{window}d": "Tage mit Einträgen"}
+    for metric, title, unit in TEST_CONTEXT_METRICS:
+        if f"{metric}_mean_{window}d" in context.columns:
+            columns[f"{metric}_mean_{window}d"] = f"{title} ({unit})"
+    st.caption("Mittelwerte der Tage vor dem Testtag (der Testtag selbst zählt nicht mit).")
+    st.dataframe(context[list(columns)].rename(columns=columns).round(1), use_container_width=True, hide_index=True)
+
+def render_blood_reference_section(settings: dict, snapshot=None):
+    """Zeigt die Bewertung aller Blutwerte gegen die Referenzbereiche und deren Verlauf über die Tests."""
+    flags = flag_blood_tests(settings.get("reference_sex", "m"), settings.get("reference_age", 35), snapshot)
+    if flags.empty:
+        return
+    st.subheader("🧪 Referenzbereiche")
+    st.caption("Richtwerte für Erwachsene (Geschlecht/Alter aus den Einstellungen) – ersetzen nicht den Befund des Labors.")
+
+    matrix = flag_matrix(flags).replace(FLAG_LABELS).fillna("")
+    matrix.columns = [str(c) for c in matrix.columns]
+    st.dataframe(matrix, use_container_width=True)
+
+    transitions = flag_transitions(flags)
+    noticeable = transitions[transitions["status"] != "unauffällig"]
+    if noticeable.empty:
+        st.success("Alle Werte liegen in allen Tests im Referenzbereich.")
+        return
+    st.dataframe(pd.DataFrame({
+        "Marker": noticeable["measure"],
+        "Erster Test": noticeable["first_date"].astype(str) + " – " + noticeable["first_flag"].map(FLAG_LABELS),
+        "Letzter Test": noticeable["last_date"].astype(str) + " – " + noticeable["last_flag"].map(FLAG_LABELS),
+        "Auffällig": noticeable["out_of_range"].astype(str) + " / " + noticeable["tests"].astype(str),
+        "Entwicklung": noticeable["status"],
+    }), use_container_width=True, hide_index=True)
+
+def render_lab_import_section(summaries: list):
+    """Zeigt Ergebnisse und laufende Auswertungen hochgeladener Laborbefunde sowie die Prüfliste unsicherer Werte."""
+    for summary in summaries:
+        name = os.path.basename(summary["file"])
+        if summary["error"]:
+            st.warning(f"Befund {name}: {summary['error']}")
+            continue
+        st.success(f"Befund {name}: {len(summary['applied'])} Werte übernommen, {summary['queued']} zur Prüfung vorgemerkt.")
+
+    running = pending_jobs()
+    if running:
+        st.info(f"⏳ {len(running)} Befund(e) werden ausgelesen: " + ", ".join(os.path.basename(f) for f in running))
+        st.button("Status aktualisieren", key="lab_import_refresh_button")
+
+    queue = load_review_queue()
+    if not queue:
+        return
+    st.subheader("🔎 Prüfliste Laborbefunde")
+    st.caption(f"Werte mit einer Sicherheit unter {REVIEW_THRESHOLD:.0%} oder Abweichung vom gespeicherten Wert werden nicht automatisch übernommen.")
+    for item in queue:
+        col1, col2, col3, col4 = st.columns([4, 2, 1, 1])
+        col1.markdown(f"**{item['measure']}** ({item['test_date']}, {item['test_type']})  \n"
+                      f"`{item['raw']}` – Sicherheit {item['confidence']:.0%}: {', '.join(item['reasons'])}")
+        value = col2.number_input(f"Wert ({item['unit'] or '-'})", value=float(item["value"]), key=f"lab_review_value_{item['id']}")
+        if col3.button("Übernehmen", key=f"lab_review_accept_{item['id']}"):
+            resolve_review_item(item["id"], accept=True, value=value)
+            st.rerun()
+        if col4.button("Verwerfen", key=f"lab_review_discard_{item['id']}"):
+            resolve_review_item(item["id"], accept=False)
+            st.rerun()
+
 def render_blood_tests_form():
     """Rendert das Bluttests-Formular."""
     with st.form(key="blood_tests_form_key"):
@@ -1011,7 +649,9 @@ def render_blood_tests_form():
         lymphocytes = col4.number_input("Lymphozyten (%)", min_value=0.0, step=0.1, format="%.1f", key="lymphocytes_input")
         basophils = col5.number_input("Basophile (%)", min_value=0.0, step=0.1, format="%.1f", key="basophils_input")
         
-        eosinophils = st.number_input("Eosinophile (%)", min_value=0.0, step=0.1, format="%.1f", key="eosinophils_input")
+        col1, col2 = st.columns(2)
+        eosinophils = col1.number_input("Eosinophile (%)", min_value=0.0, step=0.1, format="%.1f", key="eosinophils_input")
+        hk = col2.number_input("HK (l/l)", min_value=0.0, step=0.01, format="%.2f", key="hk_input")
         
         # Blutchemie
         st.markdown("---")
@@ -1055,29 +695,10 @@ def render_blood_tests_form():
         st.subheader("🟣 Schilddrüsenhormone")
         tsh_basal = st.number_input("TSH basal (uU/ml)", min_value=0.0, step=0.01, format="%.2f", key="tsh_basal_input")
         
-        # Harnbefund
-        st.markdown("---")
-        st.subheader("⚪ Harnbefund")
-        hk = st.number_input("HK (g/l)", min_value=0.0, step=0.1, format="%.1f", key="hk_input")
-        
         ok = st.form_submit_button("Bluttest speichern", key="blood_tests_save_button")
     
     return ok, locals()
 
-def save_uploaded_file(uploaded_file, directory, filename):
-    """Speichert eine hochgeladene Datei im angegebenen Verzeichnis."""
-    if uploaded_file is not None:
-        # Stelle sicher, dass das Verzeichnis existiert
-        os.makedirs(directory, exist_ok=True)
-        
-        # Speichere die Datei
-        file_path = os.path.join(directory, filename)
-        with open(file_path, "wb") as f:
-            f.write(uploaded_file.getbuffer())
-        
-        return file_path
-    return None
-
 def check_and_warn_for_empty_series(df, col_name):
     """Prüft, ob eine Serie leer ist und zeigt eine Warnung an."""
     if df[col_name].isnull().all():
@@ -1085,6 +706,7 @@ def check_and_warn_for_empty_series(df, col_name):
         return True
     return False
 
+@profiled
 def create_dual_axis_chart(df, x_col, y1_col, y2_col, title, y1_title, y2_title, y1_color_key, y2_color_key, y1_range, y2_range, show_diff_line=False, show_zero_ref=False, info_badge_text=None):
     """Erstellt ein wissenschaftlich korrektes Dual-Achsen-Diagramm mit Feinschliff."""
     if check_and_warn_for_empty_series(df, y1_col) or check_and_warn_for_empty_series(df, y2_col):
@@ -1154,6 +776,7 @@ def create_dual_axis_chart(df, x_col, y1_col, y2_col, title, y1_title, y2_title,
         
     return fig
 
+@profiled
 def create_single_axis_chart(df, x_col, y_col, title, y_title, color_key, y_range, goal_value=None):
     """Erstellt ein Einzellinien-Diagramm mit Feinschliff."""
     if check_and_warn_for_empty_series(df, y_col):
@@ -1184,6 +807,7 @@ def create_single_axis_chart(df, x_col, y_col, title, y_title, color_key, y_rang
     )
     return fig
 
+@profiled
 def create_multi_line_chart(df, x_col, y_cols, names, title, y_title, y_range):
     """Erstellt ein Mehrfachlinien-Diagramm (z.B. für Wohlbefinden)."""
     fig = go.Figure()
@@ -1210,11 +834,12 @@ def create_multi_line_chart(df, x_col, y_cols, names, title, y_title, y_range):
     )
     return fig
 
+@profiled
 def create_phase_comparison_chart(df, metric, title, unit, chart_type="line"):
     """Erstellt ein Phasenvergleichsdiagramm für eine Metrik."""
     # Daten nach Phase filtern
-    omnivor_df = df[df['phase'] == 'Omnivor'].copy()
-    vegan_df = df[df['phase'] == 'Vegan'].copy()
+    omnivor_df = df[df['phase'] == 'Omnivor']
+    vegan_df = df[df['phase'] == 'Vegan']
     
     fig = go.Figure()
     
@@ -1309,55 +934,6 @@ def create_phase_stats_cards(df, metric):
         else:
             st.info("Keine Daten für Vegan-Phase")
 
-def perform_statistical_tests(df, metric):
-    """Führt statistische Tests zwischen den Phasen durch und gibt die Ergebnisse zurück."""
-    omnivor_df = df[df['phase'] == 'Omnivor'][metric].dropna()
-    vegan_df = df[df['phase'] == 'Vegan'][metric].dropna()
-    
-    if omnivor_df.empty or vegan_df.empty:
-        return None
-    
-    # Normalverteilung prüfen (Shapiro-Wilk-Test)
-    omnivor_normal = stats.shapiro(omnivor_df)
-    vegan_normal = stats.shapiro(vegan_df)
-    
-    # Je nach Normalverteilung den passenden Test auswählen
-    if omnivor_normal.pvalue > 0.05 and vegan_normal.pvalue > 0.05:
-        # Beide Stichproben normalverteilt -> t-Test
-        test_result = stats.ttest_ind(omnivor_df, vegan_df)
-        test_name = "t-Test (unabhängige Stichproben)"
-    else:
-        # Mindestens eine Stichprobe nicht normalverteilt -> Mann-Whitney-U-Test
-        test_result = stats.mannwhitneyu(omnivor_df, vegan_df, alternative='two-sided')
-        test_name = "Mann-Whitney-U-Test"
-    
-    # Effektstärke berechnen (Cohen's d für t-Test, r für Mann-Whitney-U)
-    if test_name == "t-Test (unabhängige Stichproben)":
-        # Cohen's d
-        pooled_std = np.sqrt(((len(omnivor_df) - 1) * omnivor_df.var() + 
-                            (len(vegan_df) - 1) * vegan_df.var()) / 
-                            (len(omnivor_df) + len(vegan_df) - 2))
-        effect_size = (omnivor_df.mean() - vegan_df.mean()) / pooled_std
-        effect_name = "Cohen's d"
-    else:
-        # r für Mann-Whitney-U
-        n1, n2 = len(omnivor_df), len(vegan_df)
-        z_score = stats.norm.ppf(test_result.pvalue / 2) * np.sign(omnivor_df.mean() - vegan_df.mean())
-        effect_size = z_score / np.sqrt(n1 + n2)
-        effect_name = "Effektstärke r"
-    
-    return {
-        'test_name': test_name,
-        'statistic': test_result.statistic,
-        'p_value': test_result.pvalue,
-        'effect_size': effect_size,
-        'effect_name': effect_name,
-        'omnivor_mean': omnivor_df.mean(),
-        'vegan_mean': vegan_df.mean(),
-        'omnivor_normal': omnivor_normal.pvalue > 0.05,
-        'vegan_normal': vegan_normal.pvalue > 0.05
-    }
-
 def render_analysis_section_v2(df: pd.DataFrame, goals: dict):
     """Rendert den Analyse-Bereich mit gruppierten, feingeschliffenen Diagrammen."""
     st.subheader("📈 Analyse & Auswertung")
@@ -1374,7 +950,7 @@ def render_analysis_section_v2(df: pd.DataFrame, goals: dict):
 
 
     # Daten nach Zeitraum filtern
-    sel_df = df[(df["date"] >= start_date) & (df["date"] <= end_date)].copy()
+    sel_df = df[(df["date"] >= start_date) & (df["date"] <= end_date)]
     phase_comparison = st.checkbox("Phasenvergleich", value=False, key="phase_comparison_toggle")
 
     # Phasenvergleich-Modus
@@ -1390,44 +966,7 @@ def render_analysis_section_v2(df: pd.DataFrame, goals: dict):
         chart_type = st.radio("Darstellung", ["Linien", "Boxplot"], key="chart_type_radio")
         
         # Kernmetriken für Phasenvergleich
-        metrics = [
-            # Schlaf & Regeneration
-            ("sleep_hours", "Schlafdauer", "h"),
-            ("sleep_score", "Schlafqualität", "Score"),
-            ("hrv_sleep_avg", "HRV (Schlaf Ø)", "ms"),
-            ("rhr_sleep_avg", "Ruhepuls (Schlaf Ø)", "bpm"),
-            ("spo2_sleep_avg", "SpO₂ (Schlaf Ø)", "%"),
-            ("deep_sleep_percent", "Tiefschlaf (%)", "%"),
-            ("awakenings", "Aufwachhäufigkeit", "Anz."),
-
-            # Aktivität & Energie
-            ("total_steps", "Gesamtschritte", "Anz."),
-            ("total_kcal_burn", "Kalorienverbrauch", "kcal"),
-            ("intake_kcal", "Kalorienaufnahme", "kcal"),
-            ("energy_balance", "Energiebilanz (Aufnahme–Verbrauch)", "kcal"),
-
-            # Makros & Wasser (wie im Analyse-Tab)
-            ("protein_g_per_kg", "Protein (g/kg Körpergewicht)", "g/kg"),
-            ("protein_g", "Protein gesamt", "g"),
-            ("carbs_g", "Kohlenhydrate", "g"),
-            ("fat_g", "Fette", "g"),
-            ("water_ml", "Wasseraufnahme", "ml"),
-
-            # Körper & Kreislauf
-            ("body_weight", "Körpergewicht", "kg"),
-            ("bp_sys", "Blutdruck systolisch", "mmHg"),
-            ("bp_dia", "Blutdruck diastolisch", "mmHg"),
-
-            # Wohlbefinden (einzeln)
-            ("energy", "Energielevel", "Score (1–10)"),
-            ("mood", "Stimmung", "Score (1–10)"),
-            ("motivation", "Motivation", "Score (1–10)"),
-            ("concentration", "Konzentration", "Score (1–10)"),
-
-            # Stress
-            ("stress_avg", "Stress-Ø", "Score (0–100)"),
-            ("stress_peak", "Stress-Spitzenwert", "Score (0–100)")
-        ]
+        metrics = PHASE_COMPARISON_METRICS
 
 # Metrik-Auswahl
         selected_metric = st.selectbox(
@@ -1444,24 +983,11 @@ def render_analysis_section_v2(df: pd.DataFrame, goals: dict):
             metric, title, unit = metric_data
             
             # Filtere Daten basierend auf den Checkboxen
-            filtered_df = sel_df.copy()
-            # Zusatzmetrik: Energiebilanz (deskriptiv)
-            if metric == "energy_balance":
-                filtered_df = filtered_df.copy()
-                filtered_df["energy_balance"] = filtered_df["intake_kcal"] - filtered_df["total_kcal_burn"]
-
-            if not show_omnivor:
-                filtered_df = filtered_df[filtered_df['phase'] != 'Omnivor']
-            if not show_vegan:
-                filtered_df = filtered_df[filtered_df['phase'] != 'Vegan']
+            hidden_phases = [phase for phase, shown in (("Omnivor", show_omnivor), ("Vegan", show_vegan)) if not shown]
+            filtered_df = phase_comparison_frame(sel_df, hidden_phases)
             
             # Erstelle das Diagramm
             chart_type_value = "line" if chart_type == "Linien" else "box"
-
-            # Zusatzmetrik: Energiebilanz (deskriptiv)
-            if metric == "energy_balance":
-                filtered_df = filtered_df.copy()
-                filtered_df["energy_balance"] = filtered_df["intake_kcal"] - filtered_df["total_kcal_burn"]
             fig = create_phase_comparison_chart(filtered_df, metric, title, unit, chart_type_value)
             st.plotly_chart(fig, use_container_width=True)
             
@@ -0,0 +1,115 @@
+# write_queue.py
+# Speichern im Hintergrund für die Formulare der App: Schreibaufträge (vollständiger neuer Stand
+# einer Tabelle) landen in einer begrenzten Warteschlange und werden von einem Thread nacheinander
+# über database.py geschrieben. Aufeinanderfolgende Aufträge für dieselbe Tabelle werden
+# zusammengefasst – geschrieben wird nur der neueste Stand. Bis dahin liefern load() und snapshot()
+# diesen Stand (eigene Änderungen sind nach dem Rerun sofort sichtbar). Direkte Zugriffe über
+# database.py warten auf ausstehende Aufträge ihrer Tabelle; beim Beenden des Prozesses wird alles
+# noch geschrieben.
+import atexit
+import queue
+import threading
+import pandas as pd
+from database import load_data, save_data, load_nutrition_data, save_nutrition_data
+from profiling import span
+
+# Tabelle -> (Laden, Speichern)
+QUEUED_TABLES = {
+    "daily": (load_data, save_data),
+    "nutrition": (load_nutrition_data, save_nutrition_data),
+}
+# Höchstens so viele Aufträge warten; weitere submit()-Aufrufe blockieren bis ein Platz frei ist
+WRITE_QUEUE_SIZE = 8
+
+# Zustand auf Modulebene: gilt für alle Sitzungen des Streamlit-Prozesses
+_queue = queue.Queue(maxsize=WRITE_QUEUE_SIZE)
+_state = threading.Condition()
+_pending = {}   # Tabelle -> neuester, noch nicht begonnener Stand
+_writing = {}   # Tabelle -> Stand, der gerade geschrieben wird
+_errors = []
+_thread = None
+
+def _worker() -> None:
+    while True:
+        table = _queue.get()
+        with _state:
+            df = _pending.pop(table)
+            _writing[table] = df
+        try:
+            with span("write_queue.write", table=table, rows=len(df)):
+                QUEUED_TABLES[table][1](df)
+        except Exception as e:  # Fehler nicht verschlucken: die App zeigt sie beim nächsten Rerun an
+            with _state:
+                _errors.append((table, str(e)))
+        finally:
+            with _state:
+                del _writing[table]
+                _state.notify_all()
+            _queue.task_done()
+
+def _ensure_thread() -> None:
+    global _thread
+    if _thread is None or not _thread.is_alive():
+        _thread = threading.Thread(target=_worker, name="write_queue", daemon=True)
+        _thread.start()
+
+def submit(table: str, df: pd.DataFrame) -> None:
+    """Stellt den neuen vollständigen Stand einer Tabelle zum Speichern ein und kehrt sofort zurück.
+
+    Wartet bereits ein Auftrag für die Tabelle, ersetzt `df` dessen Stand (kein weiterer Auftrag).
+    """
+    with _state:
+        coalesced = table in _pending
+        _pending[table] = df
+        _ensure_thread()
+    if not coalesced:
+        _queue.put(table)
+
+def load(table: str) -> pd.DataFrame:
+    """Tabelle mit eigenen, noch nicht gespeicherten Änderungen (sonst wie database.load_*)."""
+    with _state:
+        df = _pending.get(table, _writing.get(table))
+    if df is not None:
+        return df.copy()
+    return QUEUED_TABLES[table][0]()
+
+def snapshot():
+    """Aktueller Snapshot aller Tabellen (snapshot.py) mit eigenen, noch nicht gespeicherten Änderungen."""
+    from snapshot import current_snapshot
+
+    with _state:
+        overlay = {table: _pending.get(table, _writing.get(table)) for table in set(_pending) | set(_writing)}
+    return current_snapshot(overlay)
+
+def pending_tables() -> list:
+    """Tabellen, deren Speichern noch aussteht oder gerade läuft."""
+    with _state:
+        return sorted(set(_pending) | set(_writing))
+
+def wait(table: str = None, timeout: float = None) -> bool:
+    """Wartet, bis alle Aufträge (bzw. die der Tabelle) geschrieben sind; False bei Zeitüberschreitung.
+
+    Im Schreib-Thread selbst kehrt die Funktion sofort zurück.
+    """
+    if threading.current_thread() is _thread:
+        return True
+    def done() -> bool:
+        busy = set(_pending) | set(_writing)
+        return not busy if table is None else table not in busy
+
+    with _state:
+        return _state.wait_for(done, timeout)
+
+def flush(timeout: float = None) -> bool:
+    """Schreibt alle ausstehenden Aufträge (z.B. vor dem Beenden)."""
+    return wait(timeout=timeout)
+
+def collect_errors() -> list:
+    """Fehlgeschlagene Aufträge seit dem letzten Aufruf als (Tabelle, Fehlermeldung)."""
+    with _state:
+        errors = list(_errors)
+        _errors.clear()
+    return errors
+
+# Beim Beenden des Prozesses nichts verlieren (läuft vor dem Abbruch des Daemon-Threads)
+atexit.register(flush)